@@ -7,17 +7,164 @@ This module provides a small, documented API to drive the Richlink-tech
 - 0x04 SHOW_COLON:        [0x04, on_off]
 
 Notes:
-- The module attempts to use either `i2c.send(buf, addr)` (pyboard-style)
-  or `i2c.writeto(addr, buf)` (common MicroPython API). If both fail an
-  error message is printed.
+- Writes go through a shared `epyI2CBus.I2CBus`, which resolves
+  `send` (pyboard-style) or `writeto` once and keeps per-address bus
+  statistics. All commands are written from one preallocated 3-byte
+  buffer. Failed writes are counted in `errors` instead of printing.
 - The display appears to accept numeric codes 0-9. The decimal point is set
   by OR'ing the digit value with 0x80 (e.g. value | 0x80).
 - The driver uses `0x0C` (12) as a degree-symbol placeholder because that
   value was present in the original implementation. If your module uses
   a different code for the degree symbol, change `DEGREE_SYMBOL`.
+- The driver keeps a shadow of the four digit codes and the colon and only
+  transmits positions that changed. Call refresh() to resend everything
+  (e.g. after the display was power-cycled).
 """
 
 import math
+import utime
+from epyI2CBus import as_bus
+
+try:
+    from micropython import schedule
+except ImportError:
+    schedule = None
+
+# Display codes. 0..15 show the hex digits 0-9, A-F (the original driver's
+# "degree symbol" 12 is the C of "24.1C"). BLANK and MINUS are the codes
+# this firmware uses for an empty position and '-'; like DEGREE_SYMBOL
+# they may differ between module versions.
+BLANK = 16
+MINUS = 17
+DOT = 0x80
+# 0xFF marks a character the display cannot show (rendered as BLANK)
+UNSUPPORTED = 0xFF
+
+
+def _make_char_codes():
+    table = bytearray(b'\xff' * 128)
+    for i in range(10):
+        table[48 + i] = i  # '0'..'9'
+    for i in range(6):
+        table[65 + i] = 10 + i  # 'A'..'F'
+        table[97 + i] = 10 + i  # 'a'..'f'
+    table[32] = BLANK
+    table[45] = MINUS
+    table[95] = BLANK  # '_'
+    return table
+
+
+# ASCII -> display code lookup table; patch entries with set_char_code()
+CHAR_CODES = _make_char_codes()
+
+
+def set_char_code(char, code):
+    """Teach the encoder the display code of an ASCII character."""
+    CHAR_CODES[ord(char) & 0x7F] = code
+
+
+def _char_code(c):
+    code = CHAR_CODES[c & 0x7F] if c < 128 else UNSUPPORTED
+    return BLANK if code == UNSUPPORTED else code
+
+
+def _encode(n, out, base, min_digits):
+    """Right-align abs(n) in `base` into out[0:4]; False if it overflows."""
+    neg = n < 0
+    if neg:
+        n = -n
+        if min_digits > 3:
+            min_digits = 3  # leave room for the sign
+    pos = 3
+    while True:
+        out[pos] = n % base
+        n //= base
+        pos -= 1
+        if pos < 0 or (n == 0 and 3 - pos >= min_digits):
+            break
+    if n or (neg and pos < 0):
+        for i in range(4):
+            out[i] = MINUS  # overflow: "----"
+        return False
+    if neg:
+        out[pos] = MINUS
+        pos -= 1
+    while pos >= 0:
+        out[pos] = BLANK
+        pos -= 1
+    return True
+
+
+def encode_int(n, out, base=10, zero_pad=False):
+    """Encode an int right aligned into 4 codes (negative gets '-').
+
+    base: 10 or 16; zero_pad shows leading zeros ("0042" / "-042")
+    Returns False (and "----") if the number does not fit.
+    """
+    return _encode(int(n), out, base, 4 if zero_pad else 1)
+
+
+def encode_float(x, out, precision=None):
+    """Encode a number with `precision` decimals, using the dot segment.
+
+    precision=None picks the most decimals that still fit with a digit
+    before the dot (up to 3, or 2 next to a minus sign). Raises ValueError
+    for an explicit precision that leaves no room for that digit.
+    """
+    neg = x < 0
+    room = 3 if neg else 4
+    if precision is None:
+        precision = room - 1
+        while precision and abs(x) * 10 ** precision + 0.5 >= 10 ** room:
+            precision -= 1
+    elif precision >= room:
+        raise ValueError('precision {} does not fit'.format(precision))
+    scaled = int(abs(x) * 10 ** precision + 0.5)
+    if not _encode(-scaled if neg else scaled, out, 10, precision + 1):
+        return False
+    if precision:
+        out[3 - precision] |= DOT
+    return True
+
+
+def encode_text(text, out, start=0):
+    """Encode text[start:] into 4 codes; '.' lights the previous dot.
+
+    text: str or bytes (bytes avoids per-character objects)
+    Returns the index after the last consumed character.
+    """
+    pos = 0
+    i = start
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if not isinstance(c, int):
+            c = ord(c)
+        if c == 46 and 0 < pos and not out[pos - 1] & DOT:  # '.'
+            out[pos - 1] |= DOT
+        else:
+            if pos == 4:
+                break
+            out[pos] = _char_code(c)
+            pos += 1
+        i += 1
+    while pos < 4:
+        out[pos] = BLANK
+        pos += 1
+    return i
+
+
+def text_codes(text):
+    """Return a bytearray with one display code per position of `text`."""
+    codes = bytearray()
+    for c in text:
+        if not isinstance(c, int):
+            c = ord(c)
+        if c == 46 and codes and not codes[-1] & DOT:
+            codes[-1] |= DOT
+        else:
+            codes.append(_char_code(c))
+    return codes
 
 
 class FourDigit:
@@ -30,6 +177,8 @@ class FourDigit:
     - show_temper(temperature)
     - show_time(hour, minute)
     - clear()
+    - refresh() / invalidate()
+    - show_codes(codes), show_int(), show_hex(), show_float(), show_text()
     """
 
     # Command bytes used by the device
@@ -47,40 +196,64 @@ class FourDigit:
         """Create a driver instance.
 
         i2c_port: an initialized I2C object from MicroPython port (has
-                  either `send` or `writeto` method)
+                  either `send` or `writeto` method) or a shared I2CBus
         i2c_addr: 7-bit I2C address of the display (default 0x3D)
         """
         self.i2c = i2c_port
         self.addr = i2c_addr
+        # shadow of what the display shows; -1 means unknown
+        self._digits = [-1, -1, -1, -1]
+        self._colon = -1
+        self._hour = -1
+        self._minute = -1
+        # transactions saved by the shadow diff
+        self.skipped = 0
+        self.bus = as_bus(i2c_port)
+        # every command is at most 3 bytes: one buffer serves all writes
+        self._buf = bytearray(3)
+        mv = memoryview(self._buf)
+        self._views = (mv[:0], mv[:1], mv[:2], mv)
+        self.writes = 0
+        self.errors = 0
+        self.last_error = 0
+        # scratch codes for the show_* encoders
+        self._codes = bytearray(4)
 
     def i2c_write(self, write_data):
-        """Write raw bytes to the device, with compatibility for common
-        MicroPython I2C implementations.
+        """Write raw bytes to the device.
 
-        write_data: an iterable of integers (0-255)
+        write_data: a sequence of integers (0-255); commands of up to
+                    three bytes reuse the preallocated buffer
+        Returns True when the device acknowledged the write. Failures are
+        counted in `errors` (last errno in `last_error`), not raised.
         """
-        buf = bytearray(write_data)
-        # Try pyboard-style send first, then fallback to writeto
-        try:
-            send = getattr(self.i2c, 'send', None)
-            if callable(send):
-                send(buf, self.addr)
-                return
-        except OSError:
-            # fall through to try writeto
-            pass
+        n = len(write_data)
+        if n > 3:
+            return self._send_buf(bytearray(write_data))
+        buf = self._buf
+        for i in range(n):
+            buf[i] = write_data[i]
+        return self._send_buf(self._views[n])
 
-        try:
-            writeto = getattr(self.i2c, 'writeto', None)
-            if callable(writeto):
-                writeto(self.addr, buf)
-                return
-        except OSError:
-            pass
+    def _write(self, cmd, a, b=-1):
+        """Send a 2 or 3 byte command from the preallocated buffer."""
+        buf = self._buf
+        buf[0] = cmd
+        buf[1] = a
+        if b < 0:
+            return self._send_buf(self._views[2])
+        buf[2] = b
+        return self._send_buf(buf)
 
-        # If neither method succeeded we show an error (no exception thrown
-        # to keep driver lightweight on microcontrollers)
-        print('I2C write failed to 0x{:02X}'.format(self.addr))
+    def _send_buf(self, buf):
+        try:
+            self.bus.write(self.addr, buf)
+        except OSError as e:
+            self.errors += 1
+            self.last_error = e.args[0] if e.args else -1
+            return False
+        self.writes += 1
+        return True
 
     def set_digit(self, position, value, dot=False):
         """Set a single digit on the display.
@@ -94,14 +267,28 @@ class FourDigit:
         val = int(value) & 0xFF
         if dot:
             val |= 0x80
-        self.i2c_write([FourDigit.SHOW_FOUR_DIGITAL, position, val])
+        digits = self._digits
+        if digits[position - 1] == val:
+            self.skipped += 1
+            return
+        # the device now shows digits, not the SHOW_TIME value
+        self._hour = -1
+        if self._write(FourDigit.SHOW_FOUR_DIGITAL, position, val):
+            digits[position - 1] = val
+        else:
+            digits[position - 1] = -1
 
     def set_colon(self, on):
         """Turn the colon on or off.
 
         on: truthy to enable, falsy to disable
         """
-        self.i2c_write([FourDigit.SHOW_COLON, 1 if on else 0])
+        on = 1 if on else 0
+        if self._colon == on:
+            self.skipped += 1
+            return
+        ok = self._write(FourDigit.SHOW_COLON, on)
+        self._colon = on if ok else -1
 
     def show4number(self, number):
         """Display an integer 0..9999 across the four digits.
@@ -145,8 +332,16 @@ class FourDigit:
         not strictly enforced here (driver trusts caller), but a caller
         should provide 0<=hr<24 and 0<=minute<60.
         """
-        self.i2c_write([FourDigit.SHOW_TIME, int(hr)
-                       & 0xFF, int(minute) & 0xFF])
+        hr = int(hr) & 0xFF
+        minute = int(minute) & 0xFF
+        if self._hour == hr and self._minute == minute:
+            self.skipped += 1
+        else:
+            # the device renders the digits itself: their codes are unknown
+            self._digits[:] = (-1, -1, -1, -1)
+            ok = self._write(FourDigit.SHOW_TIME, hr, minute)
+            self._hour = hr if ok else -1
+            self._minute = minute
         # Suggest device will control colon when using SHOW_TIME, but
         # keep explicit behaviour compatible with original driver.
         self.set_colon(True)
@@ -157,6 +352,156 @@ class FourDigit:
             self.set_digit(pos, 0)
         self.set_colon(False)
 
+    def show_codes(self, codes, offset=0, colon=False):
+        """Show the 4 display codes codes[offset:offset + 4] (diffed)."""
+        for pos in (1, 2, 3, 4):
+            self.set_digit(pos, codes[offset + pos - 1])
+        self.set_colon(colon)
+
+    def show_int(self, n, base=10, zero_pad=False):
+        """Show an int (negative, or hex with base=16); "----" if too big."""
+        ok = encode_int(n, self._codes, base, zero_pad)
+        self.show_codes(self._codes)
+        return ok
+
+    def show_hex(self, n):
+        return self.show_int(n, 16, True)
+
+    def show_float(self, x, precision=None):
+        """Show a number with `precision` decimals (None: as many as fit)."""
+        ok = encode_float(x, self._codes, precision)
+        self.show_codes(self._codes)
+        return ok
+
+    def show_text(self, text):
+        """Show the first 4 characters of text ('.' uses the dot)."""
+        encode_text(text, self._codes)
+        self.show_codes(self._codes)
+
+    def invalidate(self):
+        """Forget the shadow so the next update sends every position."""
+        self._digits[:] = (-1, -1, -1, -1)
+        self._colon = -1
+        self._hour = -1
+
+    def refresh(self):
+        """Force a full refresh: resend everything the display should show."""
+        digits = tuple(self._digits)
+        colon = self._colon
+        hour, minute = self._hour, self._minute
+        self.invalidate()
+        if hour >= 0:
+            self.show_time(hour, minute)
+        else:
+            for pos in (1, 2, 3, 4):
+                if digits[pos - 1] >= 0:
+                    self.set_digit(pos, digits[pos - 1])
+        if colon >= 0:
+            self.set_colon(colon)
+
+
+class Marquee:
+    """Scroll text across a FourDigit, one position per step.
+
+    The code sequence is built once; each step shows a 4-code window
+    through the display's shadow diff, so blank runs cost no bus traffic.
+
+    display: a FourDigit
+    text: str or bytes; '.' lights the dot of the previous character
+    step_ms: scroll period used by update() and start(timer)
+    loop: keep scrolling; otherwise the text leaves the display and stops
+    gap: blank positions between repetitions when looping
+    """
+
+    def __init__(self, display, text, step_ms=300, loop=True, gap=4):
+        self.display = display
+        self.step_ms = step_ms
+        self.loop = loop
+        codes = text_codes(text)
+        blank = bytes([BLANK])
+        if loop:
+            cycle = codes + blank * gap
+            self.frames = len(cycle)
+            self.seq = cycle + (cycle * 4)[:3]
+        else:
+            # enter from the right, leave to the left
+            self.seq = blank * 3 + codes + blank * 3
+            self.frames = len(self.seq) - 3
+        self.pos = 0
+        self.running = False
+        self._next = 0
+        self._timer = None
+        # bound once: scheduling from the timer IRQ allocates nothing
+        self._step_ref = self.step
+        self._irq_ref = self._irq
+
+    def step(self, _=None):
+        """Show the current window and advance; False once finished."""
+        if not self.running:
+            return False
+        self.display.show_codes(self.seq, self.pos)
+        self.pos += 1
+        if self.pos >= self.frames:
+            if self.loop:
+                self.pos = 0
+            else:
+                self.stop()
+        return True
+
+    def _irq(self, timer):
+        # I2C is not allowed in IRQ context: run the step from the VM
+        try:
+            schedule(self._step_ref, 0)
+        except RuntimeError:
+            pass  # queue full: this step is dropped, the next one catches up
+
+    def _poll(self, _):
+        self.update()
+
+    def start(self, timer=None):
+        """Start scrolling.
+
+        timer: optional machine.Timer to drive the scroll; without one,
+               call update() from the main loop. Timer frequencies are
+               whole Hz, so a step_ms that does not divide 1000 runs the
+               timer at 100 Hz and steps on update()'s ticks_ms grid.
+        """
+        self.pos = 0
+        self.running = True
+        self._next = utime.ticks_ms()
+        if timer is not None:
+            self._timer = timer
+            if 1000 % self.step_ms == 0:
+                timer.init(freq=1000 // self.step_ms)
+                self._step_ref = self.step
+            else:
+                timer.init(freq=100)
+                self._step_ref = self._poll
+            if schedule is None:
+                timer.callback(lambda t: self._step_ref(0))
+            else:
+                timer.callback(self._irq_ref)
+
+    def stop(self):
+        self.running = False
+        if self._timer is not None:
+            self._timer.callback(None)
+            self._timer = None
+
+    def update(self):
+        """Non-blocking main-loop driver; returns ms until the next step."""
+        if not self.running:
+            return self.step_ms
+        now = utime.ticks_ms()
+        wait = utime.ticks_diff(self._next, now)
+        if wait > 0:
+            return wait
+        self.step()
+        self._next = utime.ticks_add(self._next, self.step_ms)
+        if utime.ticks_diff(self._next, now) <= 0:
+            self._next = utime.ticks_add(now, self.step_ms)  # fell behind
+        return utime.ticks_diff(self._next, now)
+
 
 if __name__ == '__main__':
     # Simple sanity example (runs on MicroPython ports). Wrapped in try/except
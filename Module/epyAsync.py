@@ -0,0 +1,163 @@
+"""Cooperative asyncio runtime for the ePy modules.
+
+One event loop replaces the playback thread of Music, the busy loop of
+RGBModeDisplay.run() and the blocking sensor reads: every module already
+has a non-blocking step (Music.update(), HTU21DSampler.update(),
+RGBModeDisplay.render(), SSD1306.show(), CommandChannel.poll()), and
+the coroutines below call it and then sleep until the next absolute
+deadline. uasyncio keeps sleeping tasks in a queue sorted by wake-up
+time, so whichever job is due first runs first and nothing busy-waits
+(command_poll() checks the UART at a fixed rate).
+
+Periodic jobs run on a fixed ticks_ms grid (Periodic) that does not
+drift with the time spent in each step; a job that falls a whole period
+behind skips the missed slots and counts them as dropped frames.
+
+Runs on uasyncio on the device and on asyncio on a PC.
+
+Usage (MicroPython):
+	import uasyncio as asyncio
+	from epyAsync import Periodic, led_frames, music_playback, \\
+		sensor_sampling, refresh, run_for
+	muz = Music(Timer(0), thread=False)
+	leds = RGBModeDisplay()
+	fps = Periodic(leds.fill_interval_ms)
+
+	def draw(oled):
+		oled.fill(0)
+		oled.text('{} C'.format(sampler.temperature.last() / 100), 0, 0)
+
+	muz.play(song, loop=True)
+	asyncio.run(run_for(60000, led_frames(leds, fps), music_playback(muz),
+	                    sensor_sampling(sampler),
+	                    refresh(oled, draw, Periodic(250))))
+	print(fps.frames, fps.dropped, fps.late_max)
+"""
+
+import utime
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# longest sleep of music_playback(); bounds play()/stop()/beep() latency
+MUSIC_SLICE_MS = 5
+
+
+def sleep_ms(ms):
+    """Awaitable sleep in ms on uasyncio and asyncio."""
+    if hasattr(asyncio, 'sleep_ms'):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms / 1000)
+
+
+async def sleep_until(deadline):
+    """Sleep until ticks_ms() reaches `deadline`."""
+    wait = utime.ticks_diff(deadline, utime.ticks_ms())
+    while wait > 0:
+        await sleep_ms(wait)
+        wait = utime.ticks_diff(deadline, utime.ticks_ms())
+
+
+class Periodic:
+    """Fixed-rate deadline grid with frame statistics.
+
+    period_ms: frame period
+    frames: frames run; dropped: grid slots skipped because a frame was
+    more than a period late; late_max: worst start lateness in ms
+    """
+
+    def __init__(self, period_ms):
+        self.period_ms = int(period_ms)
+        self.frames = 0
+        self.dropped = 0
+        self.late_max = 0
+        self.restart()
+
+    def restart(self):
+        """Put the next frame at now, e.g. after the job was paused."""
+        self.next = utime.ticks_ms()
+
+    async def wait(self):
+        """Sleep until the next slot; return how late it started (ms)."""
+        await sleep_until(self.next)
+        period = self.period_ms
+        late = utime.ticks_diff(utime.ticks_ms(), self.next)
+        if late > self.late_max:
+            self.late_max = late
+        skipped = late // period
+        self.dropped += skipped
+        self.next = utime.ticks_add(self.next, (skipped + 1) * period)
+        self.frames += 1
+        return late
+
+
+async def led_frames(disp, periodic=None):
+    """Render and write RGBModeDisplay frames.
+
+    Frames follow `periodic` (default: the display's update_hz), or the
+    beats of disp.beat_clock when one is set (see set_beat_clock).
+    """
+    if periodic is None:
+        periodic = Periodic(disp.fill_interval_ms)
+    while True:
+        clock = disp.beat_clock
+        if clock is None:
+            await periodic.wait()
+            disp.render()
+        elif not disp.fill_if_due():
+            step = disp.ticks_per_frame
+            wait = utime.ticks_diff(
+                clock.deadline((clock.tick_at() // step + 1) * step),
+                utime.ticks_ms())
+            # starting a song restarts the clock: look again every period
+            await sleep_ms(wait if wait < periodic.period_ms
+                           else periodic.period_ms)
+            periodic.restart()
+            continue
+        disp.write_request = True
+        disp.update_leds()
+
+
+async def music_playback(music):
+    """Drive Music playback; create the Music with thread=False."""
+    while True:
+        wait = music.update()
+        await sleep_ms(wait if wait < MUSIC_SLICE_MS else MUSIC_SLICE_MS)
+
+
+async def sensor_sampling(sampler):
+    """Run an HTU21DSampler; conversions are awaited, not waited on."""
+    while True:
+        await sleep_ms(sampler.update())
+
+
+async def refresh(display, draw, periodic):
+    """Call draw(display) and display.show() on every `periodic` slot."""
+    while True:
+        await periodic.wait()
+        draw(display)
+        display.show()
+
+
+async def command_poll(channel, period_ms=20):
+    """Poll an epyCommand.CommandChannel every `period_ms`."""
+    while True:
+        channel.poll()
+        await sleep_ms(period_ms)
+
+
+async def run_for(ms, *coros):
+    """Run coroutines as tasks for `ms`, then cancel them (None: forever)."""
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    if ms is None:
+        await asyncio.gather(*tasks)
+        return
+    await sleep_ms(ms)
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,66 @@
+"""Beat clock shared by Music playback and LED effects.
+
+Positions are counted in ticks (`ticks_per_beat` per beat) and turned into
+absolute ``utime.ticks_ms()`` deadlines measured from one origin, so
+rounding never accumulates: tick n always lands on
+``origin + n * 60000 // (bpm * ticks_per_beat)`` no matter how long the
+song runs or how late a caller is. All arithmetic uses ticks_add/ticks_diff
+and therefore survives the ticks_ms() wraparound.
+
+Usage:
+    clock = BeatClock(bpm=120, ticks_per_beat=4)
+    deadline = clock.deadline(8)     # ticks_ms() value of tick 8 (beat 2)
+    beat = clock.beat_at()           # current beat number
+"""
+
+import utime
+
+
+class BeatClock:
+    """Map tick positions to ticks_ms() deadlines and back."""
+
+    def __init__(self, bpm=120, ticks_per_beat=4, origin=None):
+        self.restart(origin, bpm, ticks_per_beat)
+
+    def restart(self, origin=None, bpm=None, ticks_per_beat=None):
+        """Make tick 0 happen at `origin` (default: now)."""
+        if bpm is not None:
+            self.bpm = int(bpm)
+        if ticks_per_beat is not None:
+            self.ticks_per_beat = int(ticks_per_beat)
+        # ticks per minute; one minute of ticks is exactly 60000 ms
+        self._den = self.bpm * self.ticks_per_beat
+        self._origin = utime.ticks_ms() if origin is None else origin
+        self._base = 0
+
+    def _fold(self):
+        # move the origin forward by whole minutes so the products below
+        # stay small ints on the device
+        self._origin = utime.ticks_add(self._origin, 60000)
+        self._base += self._den
+
+    def deadline(self, tick):
+        """Return the ticks_ms() value at which `tick` starts."""
+        local = tick - self._base
+        while local >= 2 * self._den:
+            self._fold()
+            local -= self._den
+        return utime.ticks_add(self._origin, local * 60000 // self._den)
+
+    def tick_at(self, now=None):
+        """Return the tick number current at ticks_ms() value `now`."""
+        if now is None:
+            now = utime.ticks_ms()
+        elapsed = utime.ticks_diff(now, self._origin)
+        while elapsed >= 120000:
+            self._fold()
+            elapsed -= 60000
+        return self._base + elapsed * self._den // 60000
+
+    def beat_at(self, now=None):
+        """Return the beat number current at `now`."""
+        return self.tick_at(now) // self.ticks_per_beat
+
+    def ms_per_tick(self):
+        """Nominal tick length in ms (float, for display only)."""
+        return 60000 / self._den
@@ -0,0 +1,228 @@
+"""Compact binary trace of I2C/SPI bus transactions.
+
+BusTrace logs every transaction of an epyI2CBus.I2CBus (attach()) or of
+an SPI bus wrapped with spi() into one preallocated buffer: kind,
+address, payload length, microseconds since the previous transaction
+and the first `head` payload bytes (the SSD1306 control byte and
+command, the HTU21D command, the FourDigit register). Nothing is
+allocated per transaction; when the buffer is full further transactions
+are only counted in `dropped`, so a trace is always a gapless prefix.
+
+The buffer starts with the file header, so data() can be written to
+flash (save()) or a UART as is. On a PC tests/trace_replay.py parses
+traces, replays them against the emulated devices and compares bytes and
+transactions per device between two traces, e.g. the same scenario with
+two driver versions.
+
+Trace layout:
+	0  b'eT'  magic
+	2  u8     format version (1)
+	3  u8     head: payload bytes kept per write
+	4  records, each:
+		u8      kind << 6 | error << 5 | dc << 4 | n_head
+		u8      address (I2C address, or the id given to spi())
+		varint  us since the previous record (LEB128)
+		varint  payload length
+		n_head  first payload bytes (READ_MEM: the register)
+Kinds are the epyI2CBus WRITE, READ and READ_MEM, and SPI_WRITE; dc is
+the D/C pin level of an SPI write. Times are taken when a transaction
+has finished.
+
+Usage (MicroPython):
+	from epyBusTrace import BusTrace
+	trace = BusTrace(size=8192)
+	trace.attach(bus)                   # the I2CBus shared by the drivers
+	oled = SSD1306_SPI(128, 64, trace.spi(spi, 1, dc), dc, res, cs)
+	trace.start()
+	...
+	trace.stop()
+	trace.save('/flash/bus.trc')
+"""
+
+import utime
+from epyI2CBus import READ, READ_MEM, WRITE
+
+MAGIC = b'eT'
+VERSION = 1
+HEADER_SIZE = 4
+SPI_WRITE = 3
+# kind/flags byte, address, two varints of up to 5 and 3 bytes
+_MAX_FIXED = 10
+
+
+def _put_varint(buf, p, v):
+    while v >= 0x80:
+        buf[p] = (v & 0x7F) | 0x80
+        v >>= 7
+        p += 1
+    buf[p] = v
+    return p + 1
+
+
+class BusTrace:
+    """Record bus transactions into a fixed buffer.
+
+    size: buffer size in bytes, header included (about 6 bytes per
+          transaction with head=2)
+    head: payload bytes kept per write, 0..15
+    """
+
+    def __init__(self, size=4096, head=2):
+        if not 0 <= head <= 15:
+            raise ValueError('head must be 0..15')
+        self.head = head
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._buf[0:2] = MAGIC
+        self._buf[2] = VERSION
+        self._buf[3] = head
+        self.active = False
+        self._last = 0
+        self.clear()
+
+    def clear(self):
+        """Drop all records."""
+        self._n = HEADER_SIZE
+        self.records = 0
+        self.dropped = 0
+        self.full = False
+
+    def attach(self, bus):
+        """Trace every transaction of an epyI2CBus.I2CBus."""
+        bus.trace = self
+
+    def detach(self, bus):
+        bus.trace = None
+
+    def spi(self, spi, addr=0, dc=None):
+        """Return `spi` wrapped so its writes are traced under `addr`;
+        dc: the D/C pin, whose level is kept with every write."""
+        return TracedSPI(spi, self, addr, dc)
+
+    def start(self):
+        """Start (or resume) recording; times count from now."""
+        self._last = utime.ticks_us()
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def record(self, kind, addr, buf, ok=True, reg=-1, dc=0):
+        """Log one finished transaction (called by the bus wrappers)."""
+        if not self.active:
+            return
+        if kind == READ_MEM:
+            nhead = 1
+        elif kind == READ:
+            nhead = 0
+        else:
+            nhead = min(len(buf), self.head)
+        p = self._n
+        if self.full or p + _MAX_FIXED + nhead > len(self._buf):
+            self.full = True
+            self.dropped += 1
+            return
+        now = utime.ticks_us()
+        dt = utime.ticks_diff(now, self._last)
+        self._last = now
+        out = self._buf
+        out[p] = kind << 6 | (0 if ok else 0x20) | (0x10 if dc else 0) | \
+            nhead
+        out[p + 1] = addr
+        p = _put_varint(out, p + 2, dt if dt > 0 else 0)
+        p = _put_varint(out, p, len(buf))
+        if kind == READ_MEM:
+            out[p] = reg
+            p += 1
+        else:
+            for i in range(nhead):
+                out[p + i] = buf[i]
+            p += nhead
+        self._n = p
+        self.records += 1
+
+    def used(self):
+        """Bytes in the trace, header included."""
+        return self._n
+
+    def data(self):
+        """The trace (header and records) as a memoryview, not copied."""
+        return self._mv[0:self._n]
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.data())
+        return self._n
+
+
+class TracedSPI:
+    """SPI bus that passes everything on and traces write() (see
+    BusTrace.spi())."""
+
+    def __init__(self, spi, trace, addr=0, dc=None):
+        self.spi = spi
+        self.trace = trace
+        self.addr = addr
+        self.dc = dc
+
+    def init(self, *args, **kwargs):
+        return self.spi.init(*args, **kwargs)
+
+    def deinit(self):
+        return self.spi.deinit()
+
+    def read(self, nbytes, write=0x00):
+        return self.spi.read(nbytes, write)
+
+    def readinto(self, buf, write=0x00):
+        return self.spi.readinto(buf, write)
+
+    def write_readinto(self, write_buf, read_buf):
+        return self.spi.write_readinto(write_buf, read_buf)
+
+    def write(self, buf):
+        r = self.spi.write(buf)
+        dc = self.dc
+        self.trace.record(SPI_WRITE, self.addr, buf, True, -1,
+                          dc.value() if dc is not None else 0)
+        return r
+
+
+def _varint(data, p):
+    v = 0
+    shift = 0
+    while True:
+        b = data[p]
+        p += 1
+        v |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return v, p
+        shift += 7
+
+
+def parse(data):
+    """Yield (t_us, kind, addr, nbytes, ok, dc, head) for each record of
+    a trace; t_us counts from start(). A record cut short at the end is
+    ignored."""
+    if len(data) < HEADER_SIZE or bytes(data[0:2]) != MAGIC:
+        raise ValueError('not a bus trace')
+    if data[2] != VERSION:
+        raise ValueError('unsupported trace version')
+    end = len(data)
+    p = HEADER_SIZE
+    t = 0
+    while p < end:
+        try:
+            flags = data[p]
+            addr = data[p + 1]
+            dt, q = _varint(data, p + 2)
+            n, q = _varint(data, q)
+        except IndexError:
+            return
+        nhead = flags & 0x0F
+        if q + nhead > end:
+            return
+        t += dt
+        yield (t, flags >> 6, addr, n, not flags & 0x20,
+               (flags >> 4) & 1, bytes(data[q:q + nhead]))
+        p = q + nhead
@@ -1,29 +1,121 @@
 from machine import Pin, Timer
 import utime
+from epyBeatClock import BeatClock
+from epySongBank import (NOTE_OFFSETS, SongReader, compile_notes,
+                         compile_text, note_freq, note_number)
 try:
     import _thread
 except Exception:
     _thread = None
 
+# poll interval of the playback thread while nothing is playing
+IDLE_MS = 10
+# longest the playback thread sleeps; bounds play()/stop()/beep() latency
+SLICE_MS = 5
+# capacity of the note queue and of the priority beep queue
+QUEUE_SIZE = 32
+BEEP_QUEUE_SIZE = 4
+# a note this late (thread starved, long GC) restarts the clock instead of
+# rushing through the missed notes to catch up
+RESYNC_LATE_MS = 250
+
+
+class NoteQueue:
+    """Fixed-size ring of (frequency Hz, duration ms) notes, 4 bytes each.
+
+    One producer (the caller) and one consumer (the playback loop) can use
+    it without locks. pop() stores the note in `freq`/`ms` instead of
+    returning a tuple, so the playback path does not allocate.
+    """
+
+    def __init__(self, size):
+        self._size = size + 1  # one slot stays empty to tell full/empty
+        self._buf = bytearray(4 * self._size)
+        self._head = 0
+        self._tail = 0
+        self.freq = 0
+        self.ms = 0
+
+    def __len__(self):
+        return (self._tail - self._head) % self._size
+
+    def free(self):
+        return self._size - 1 - len(self)
+
+    def put(self, freq, ms):
+        """Append a note; return False if the queue is full.
+
+        Durations longer than 65535 ms are split into several entries of
+        the same frequency, all or none of them queued.
+        """
+        freq = int(freq)
+        ms = int(ms)
+        if ms > 0xFFFF and self.free() < (ms + 0xFFFE) // 0xFFFF:
+            return False
+        while ms > 0xFFFF:
+            self._put(freq, 0xFFFF)
+            ms -= 0xFFFF
+        return self._put(freq, ms)
+
+    def _put(self, freq, ms):
+        tail = self._tail
+        nxt = tail + 1
+        if nxt == self._size:
+            nxt = 0
+        if nxt == self._head:
+            return False
+        buf = self._buf
+        p = 4 * tail
+        buf[p] = freq & 0xFF
+        buf[p + 1] = (freq >> 8) & 0xFF
+        buf[p + 2] = ms & 0xFF
+        buf[p + 3] = (ms >> 8) & 0xFF
+        self._tail = nxt
+        return True
+
+    def pop(self):
+        """Load the oldest note into `freq`/`ms`; False if empty."""
+        head = self._head
+        if head == self._tail:
+            return False
+        buf = self._buf
+        p = 4 * head
+        self.freq = buf[p] | (buf[p + 1] << 8)
+        self.ms = buf[p + 2] | (buf[p + 3] << 8)
+        head += 1
+        self._head = 0 if head == self._size else head
+        return True
+
+    def clear(self):
+        self._head = self._tail
+
 
 class Music:
     """Play simple note sequences on a buzzer pin using a hardware Timer when
-    available. Includes a precomputed note->frequency lookup cache for speed.
+    available.
+
+    Songs can be given as legacy note lists (``["E4:2", "E", ...]``), RTTTL
+    or MML text, or as compiled binary songs (see epySongBank) in a
+    ``bytes`` object or an open binary file; binary songs are streamed note
+    by note during playback.
+
+    Notes are scheduled against absolute deadlines on a BeatClock (`clock`),
+    so per-note setup time never accumulates as tempo drift and LED effects
+    can follow the same beat (see RGBModeDisplay.set_beat_clock).
+
+    Besides the background song there is a note queue (enqueue()) for sound
+    effects and a priority queue for UI beeps (beep()). Beeps cut the
+    current song or queued note and play back to back; queued notes take
+    over from the song at the next note boundary. play(), stop(),
+    enqueue() and beep() only set flags and return immediately; the
+    playback loop picks them up within SLICE_MS.
     """
 
-    def __init__(self, tim: Timer, pin=Pin.epy.P9):
-        # semitone offsets relative to A (A is 0)
-        self.tone_idx = {
-            'R': 0, 'A': 0, 'Ab': -1, 'G#': -1, 'G': -2, 'Gb': -3,
-            'F#': -3, 'F': -4, 'E': -5, 'Eb': -6, 'D#': -6, 'D': -7,
-            'Db': -8, 'C#': -8, 'C': -9, 'B': 2, 'Bb': 1, 'A#': 1
-        }
-
-        # reference
-        self._freqA4 = 440.0
-        # ratio per semitone (float)
-        self._semitone_ratio = 2 ** (1 / 12)
+    # semitone offsets relative to A (A is 0); one table shared with
+    # epySongBank instead of a dict per instance
+    tone_idx = NOTE_OFFSETS
 
+    def __init__(self, tim: Timer, pin=Pin.epy.P9, thread=True):
         self._buzzer_pin = Pin(pin, Pin.OUT)
         self._timer = tim
 
@@ -36,14 +128,22 @@ class Music:
         # playback state
         self._state = 'STOP'
         self.loop = False
-        self.music = []
-
-        # frequency cache and prebuild common octaves
-        self._freq_cache = {}
-        self._build_freq_table(0, 8)
-
-        # try to run playback thread if threading available
-        if _thread:
+        self.music = None  # SongReader of the current song
+        self.clock = BeatClock(self.bpm, self.ticks)
+        self._pos = 0  # song position (ticks) at the end of current note
+        self._deadline = 0  # ticks_ms() at which the current note ends
+        self._sounding = False
+        self._source = None  # queue the sounding note came from
+        self.queue = NoteQueue(QUEUE_SIZE)
+        self._beeps = NoteQueue(BEEP_QUEUE_SIZE)
+        # requests from the caller, handled by update()
+        self._pending = None  # song replacing the current one
+        self._cut = False  # silence the sounding note now
+        self._sync = False  # playFreq() owns the timer
+
+        # try to run playback thread if threading available; pass
+        # thread=False when another scheduler calls update() (epyAsync)
+        if thread and _thread:
             try:
                 _thread.start_new_thread(self.play_music, ())
             except Exception:
@@ -51,82 +151,99 @@ class Music:
 
     def play_music(self):
         while True:
-            if self._state != 'START':
-                utime.sleep_ms(10)
-                continue
-            for play_t in self.music:  # avoid creating new list
-                if self._state == 'STOP':
-                    break
-
-                # manual parse to avoid split() creating list
-                colon_pos = play_t.find(":")
-                if colon_pos != -1:
-                    token = play_t[:colon_pos]
-                    duration_part = play_t[colon_pos + 1:]
-                else:
-                    token = play_t
-                    duration_part = ""
-
-                # rest
-                if token.startswith('R'):
-                    playFreq = 0
-                else:
-                    # parse note name and optional octave digit at end
-                    if len(token) >= 2 and token[1] in ('#', 'b'):
-                        name = token[0:2]
-                        tail = token[2:]
-                    else:
-                        name = token[0]
-                        tail = token[1:]
-
-                    octave = self._lv
-                    if tail and tail[-1].isdigit():
-                        octave = int(tail[-1])
-                        self._lv = octave
-
-                    playFreq = self._get_freq_from_cache(name, octave)
-
-                # duration (ms)
-                if duration_part and duration_part.isdigit():
-                    duration = int(duration_part) * \
-                        int(60000 / (self.bpm * self.ticks))
-                else:
-                    duration = self._ticks
-
-                self._playFreq(playFreq, int(duration))
-
-            if self.loop and self._state != 'STOP':
-                continue
+            wait = self.update()
+            utime.sleep_ms(wait if wait < SLICE_MS else SLICE_MS)
+
+    def update(self):
+        """Advance playback and return ms until the next note boundary.
+
+        Called in a loop by the playback thread; without threads any other
+        scheduler can call it instead. Song notes end at
+        ``clock.deadline(position)``, computed from the song start rather
+        than from when the note actually started; queued notes are chained
+        the same way from the previous deadline.
+        """
+        if self._sync:
+            return IDLE_MS
+        if self._cut:
+            self._cut = False
+            if self._sounding:
+                self._silence()
+            pending = self._pending
+            if pending is not None:
+                self._pending = None
+                self.music = pending
+        if self._state != 'START':
+            if self._sounding:
+                self._silence()
+            self.music = None
+            return IDLE_MS
+
+        now = utime.ticks_ms()
+        late = 0
+        if self._sounding:
+            late = utime.ticks_diff(now, self._deadline)
+            if late < 0 and not (len(self._beeps) and
+                                 self._source is not self._beeps):
+                return -late
+            if late < 0:
+                # a priority beep preempts the current note; beeps
+                # themselves chain like queued notes
+                late = RESYNC_LATE_MS + 1
+
+        q = self._beeps if len(self._beeps) else self.queue
+        if q.pop():
+            if self._source is q and late <= RESYNC_LATE_MS:
+                self._deadline = utime.ticks_add(self._deadline, q.ms)
+            else:
+                self._deadline = utime.ticks_add(now, q.ms)
+            self._source = q
+            return self._start(q.freq)
+
+        song = self.music
+        v = song.read() if song is not None else -1
+        if v < 0 and self.loop and song is not None:
+            song.rewind()
+            v = song.read()
+        if v < 0:
+            self._silence()
             self._state = 'STOP'
-            self.music = []
+            self.music = None
+            return IDLE_MS
+
+        if self._source is not song or late > RESYNC_LATE_MS:
+            # first note, back from the queue, or hopelessly late:
+            # anchor the clock at now
+            self.clock.restart(now, song.bpm, song.ticks)
+            self._pos = 0
+        self._source = song
+        self._pos += v & 0xFF
+        self._deadline = self.clock.deadline(self._pos)
+        note = v >> 8
+        return self._start(note_freq(note) if note else 0)
+
+    def _start(self, playFreq):
+        """Sound `playFreq` until self._deadline; return ms left."""
+        self._sounding = True
+        if not self._tone(playFreq):
+            # no usable timer: toggle the pin in software until the deadline
+            self._soft_tone(self._deadline)
+        wait = utime.ticks_diff(self._deadline, utime.ticks_ms())
+        return wait if wait > 0 else 0
 
     def tempo(self, ticks=4, bpm=120):
         self.ticks = ticks
         self.bpm = bpm
         self._ticks = int(60000 / (self.bpm * self.ticks))
 
-    def _build_freq_table(self, min_oct=0, max_oct=8):
-        """Precompute note->frequency for a range of octaves."""
-        for octv in range(min_oct, max_oct + 1):
-            for name, offset in self.tone_idx.items():
-                key = "{}{}".format(name, octv)
-                if name == 'R':
-                    self._freq_cache[key] = 0
-                    continue
-                steps = offset + 12 * (octv - 4)
-                self._freq_cache[key] = self._freqA4 * \
-                    (self._semitone_ratio ** steps)
-
     def _get_freq_from_cache(self, name, octave):
-        key = "{}{}".format(name, octave)
-        if key in self._freq_cache:
-            return self._freq_cache[key]
-        # compute and cache
+        # songs are compiled to MIDI notes (epySongBank), so nothing calls
+        # this on the playback path; computed on demand instead of from a
+        # table of ~160 formatted keys built per instance
+        if name == 'R':
+            return 0
         try:
-            steps = self.tone_idx[name] + 12 * (octave - 4)
-            freq = self._freqA4 * (self._semitone_ratio ** steps)
-            self._freq_cache[key] = freq
-            return freq
+            return note_freq(note_number(name, octave))
         except Exception:
             return 0
 
@@ -135,52 +252,133 @@ class Music:
         self._buzzer_pin.value(~self._buzzer_pin.value() & 0x1)
 
     def stop(self):
+        """Stop playback and drop queued notes; does not wait."""
+        self._pending = None
+        self.queue.clear()
+        self._beeps.clear()
         self._state = 'STOP'
-        # wait until current playlist cleared
-        while self.music:
-            utime.sleep_ms(5)
+        self._cut = True
 
     def getState(self):
         return self._state
 
+    def _open_song(self, music):
+        """Return a SongReader for any supported song representation."""
+        if isinstance(music, SongReader):
+            return music
+        if isinstance(music, str):
+            return SongReader(compile_text(music))
+        if isinstance(music, (list, tuple)):
+            return SongReader(compile_notes(music, self.ticks, self.bpm,
+                                            self._lv))
+        # bytes/bytearray/memoryview or binary file
+        return SongReader(music)
+
     def play(self, music, loop=False):
-        if self._state == 'START':
-            self.stop()
-        self.music = music
+        """Replace the background song (and queued notes) with `music`."""
+        song = self._open_song(music)
+        self.queue.clear()
         self.loop = loop
+        self._pending = song
+        self._state = 'START'
+        self._cut = True
+
+    def enqueue(self, music, interrupt=False):
+        """Queue the notes of `music` (any form play() accepts).
+
+        Queued notes play before the background song continues. With
+        `interrupt` the queue is emptied and the sounding note is cut
+        first. Returns the number of notes queued, which is less than the
+        song length when the queue fills up.
+        """
+        song = self._open_song(music)
+        if interrupt:
+            self.queue.clear()
+        den = song.bpm * song.ticks
+        pos = 0
+        n = 0
+        for note, ticks in song:
+            # ms from the running tick position so rounding does not add up
+            start = pos * 60000 // den
+            pos += ticks
+            freq = int(note_freq(note) + 0.5) if note else 0
+            if not self.queue.put(freq, pos * 60000 // den - start):
+                break
+            n += 1
+        if interrupt:
+            self._cut = True
         self._state = 'START'
+        return n
+
+    def beep(self, freq, ms=50):
+        """Play a priority beep, cutting the current note.
+
+        Returns False if the beep queue is full.
+        """
+        if not self._beeps.put(freq, ms):
+            return False
+        self._state = 'START'
+        return True
 
     def playFreq(self, playFreq, playtime_ms):
         # convenience sync play of a single frequency
         if self._state == 'STOP':
+            self._sync = True
             self._state = 'START'
-            self._playFreq(playFreq, playtime_ms)
-            self._state = 'STOP'
+            try:
+                self._playFreq(playFreq, playtime_ms)
+            finally:
+                self._state = 'STOP'
+                self._sync = False
+
+    def _tone(self, playFreq):
+        """Start (or for 0 stop) the tone; False if the timer is unusable."""
+        try:
+            if playFreq <= 0:
+                self._timer.callback(None)
+            else:
+                self._timer.init(freq=int(playFreq * 2))
+                self._timer.callback(self._buzzer_toggle)
+        except Exception:
+            return playFreq <= 0
+        return True
+
+    def _silence(self):
+        self._sounding = False
+        self._source = None
+        try:
+            self._timer.callback(None)
+        except Exception:
+            pass
+
+    def _soft_tone(self, deadline):
+        # fallback: toggle pin in software until the deadline
+        while utime.ticks_diff(deadline, utime.ticks_ms()) > 0:
+            self._buzzer_pin.value(1)
+            utime.sleep_ms(1)
+            self._buzzer_pin.value(0)
+            utime.sleep_ms(1)
+
+    def _sleep_until(self, deadline):
+        wait = utime.ticks_diff(deadline, utime.ticks_ms())
+        while wait > 0:
+            utime.sleep_ms(wait)
+            wait = utime.ticks_diff(deadline, utime.ticks_ms())
 
     def _playFreq(self, playFreq, playtime_ms):
+        deadline = utime.ticks_add(utime.ticks_ms(), playtime_ms)
         # rest: just sleep
         if playFreq <= 0:
-            utime.sleep_ms(playtime_ms)
+            self._sleep_until(deadline)
             return
 
         # attempt hardware timer approach
-        try:
-            self._timer.init(freq=int(playFreq * 2))
-            self._timer.callback(self._buzzer_toggle)
-        except Exception:
-            # fallback: toggle pin in software
-            start = utime.ticks_ms()
-            while (utime.ticks_ms() - start) < playtime_ms:
-                self._buzzer_pin.value(1)
-                utime.sleep_ms(1)
-                self._buzzer_pin.value(0)
-                utime.sleep_ms(1)
+        if not self._tone(playFreq):
+            self._soft_tone(deadline)
             return
 
         # wait duration
-        start = utime.ticks_ms()
-        while (utime.ticks_ms() - start) < playtime_ms:
-            utime.sleep_ms(1)
+        self._sleep_until(deadline)
 
         # stop timer callback
         try:
@@ -0,0 +1,207 @@
+"""Non-blocking command channel over a (BLE) UART.
+
+poll() moves what any() says the UART has received into a preallocated
+chunk buffer with readinto() and feeds it byte by byte to a state
+machine, so a half-received command just waits for the next poll:
+nothing blocks like readline() (or readinto() on an empty UART) with its
+timeout, and nothing is allocated per byte.
+Call poll() from the main loop or run epyAsync.command_poll().
+
+Two framings are accepted on the same stream:
+	text:   <cmd>[ <args>]\\n      e.g. "M rainbow", "S 4", "B 880 50"
+	binary: 0xA5 cmd seq len args[len] crc8
+The binary form is the epyTelemetry frame (CRC8 of htu21d over cmd,
+seq, len and args) with the command letter as frame type, for clients
+that want checked commands. Either way the handler registered for the
+command byte is called with the arguments as a memoryview that is only
+valid during the call.
+
+Usage (MicroPython):
+	from machine import UART
+	from epyCommand import CommandChannel, bind_leds, bind_music, bind_text
+	ch = CommandChannel(UART(1, 115200, read_buf_len=128), ack=True)
+	bind_leds(ch, leds)
+	bind_music(ch, music)
+	bind_text(ch, four_digit.show_text)
+	while True:
+		ch.poll()
+		...
+"""
+
+from htu21d import CRC8_TABLE
+
+SYNC = 0xA5
+# parser states
+_IDLE = 0
+_LINE = 1
+_SKIP = 2  # overlong line: drop up to the newline
+_CMD = 3
+_SEQ = 4
+_LEN = 5
+_ARGS = 6
+_CRC = 7
+_DROP = 8  # binary command too long: skip its args and CRC
+
+
+class CommandChannel:
+    """Incremental command parser and dispatcher.
+
+    uart: anything with readinto(buf) returning a count or None
+    max_len: longest argument string; longer commands are dropped
+    chunk: bytes moved per readinto() call
+    ack: reply b'OK\\n' / b'ERR\\n' after every command
+    """
+
+    def __init__(self, uart, max_len=64, chunk=32, ack=False):
+        self.uart = uart
+        self.ack = ack
+        self._rx = bytearray(chunk)
+        self._args = bytearray(max_len)
+        self._mv = memoryview(self._args)
+        self._handlers = {}
+        self._state = _IDLE
+        self._cmd = 0
+        self._n = 0
+        self._len = 0
+        self._crc = 0
+        self.commands = 0
+        self.errors = 0  # unknown commands and failing handlers
+        self.dropped = 0  # overlong commands and bad CRCs
+        self.last_error = None
+
+    def register(self, cmd, handler):
+        """Call handler(args) for command `cmd` (one character or byte)."""
+        if isinstance(cmd, str):
+            cmd = ord(cmd)
+        self._handlers[cmd] = handler
+
+    def poll(self, max_reads=4):
+        """Parse what has arrived; returns the commands dispatched."""
+        done = self.commands + self.errors
+        uart = self.uart
+        rx = self._rx
+        for _ in range(max_reads):
+            # readinto() waits the UART timeout for a first byte: only
+            # read what any() says has arrived
+            n = uart.any()
+            if not n:
+                break
+            n = uart.readinto(rx, n if n < len(rx) else len(rx))
+            if not n:
+                break
+            for i in range(n):
+                self._byte(rx[i])
+            if n < len(rx):
+                break
+        return self.commands + self.errors - done
+
+    def _byte(self, b):
+        state = self._state
+        if state == _LINE:
+            if b == 10 or b == 13:
+                self._state = _IDLE
+                self._dispatch(self._n)
+            elif self._n < len(self._args):
+                # spaces between command and arguments are dropped
+                if self._n or b != 32:
+                    self._args[self._n] = b
+                    self._n += 1
+            else:
+                self._state = _SKIP
+        elif state == _IDLE:
+            if b == SYNC:
+                self._state = _CMD
+                self._crc = 0
+            elif b != 10 and b != 13 and b != 32:
+                self._cmd = b
+                self._n = 0
+                self._state = _LINE
+        elif state == _SKIP:
+            if b == 10 or b == 13:
+                self.dropped += 1
+                self._state = _IDLE
+        else:
+            self._binary(state, b)
+
+    def _binary(self, state, b):
+        if state == _DROP:
+            self._len -= 1
+            if not self._len:
+                self._state = _IDLE
+            return
+        if state == _CRC:
+            self._state = _IDLE
+            if b == self._crc:
+                self._dispatch(self._n)
+            else:
+                self.dropped += 1
+            return
+        self._crc = CRC8_TABLE[self._crc ^ b]
+        if state == _CMD:
+            self._cmd = b
+            self._state = _SEQ
+        elif state == _SEQ:
+            self._state = _LEN
+        elif state == _LEN:
+            if b > len(self._args):
+                self.dropped += 1
+                self._len = b + 1
+                self._state = _DROP
+                return
+            self._len = b
+            self._n = 0
+            self._state = _ARGS if b else _CRC
+        else:
+            self._args[self._n] = b
+            self._n += 1
+            if self._n == self._len:
+                self._state = _CRC
+
+    def _dispatch(self, n):
+        handler = self._handlers.get(self._cmd)
+        ok = False
+        if handler is not None:
+            try:
+                handler(self._mv[0:n])
+                ok = True
+            except Exception as e:
+                self.last_error = e
+        if ok:
+            self.commands += 1
+        else:
+            self.errors += 1
+        if self.ack:
+            self.uart.write(b'OK\n' if ok else b'ERR\n')
+
+
+def text(args):
+    """Arguments as str."""
+    return bytes(args).decode()
+
+
+def ints(args):
+    """Space separated integer arguments as a list."""
+    return [int(v) for v in bytes(args).split()]
+
+
+def bind_leds(channel, disp):
+    """M <mode name>, S <speed>, F <update Hz> for an RGBModeDisplay."""
+    channel.register('M', lambda a: disp.set_mode(text(a)))
+    channel.register('S', lambda a: disp.set_speed(ints(a)[0]))
+    channel.register('F', lambda a: disp.set_update_hz(ints(a)[0]))
+
+
+def bind_music(channel, music):
+    """P <song> (play), L <song> (play looped), Q <song> (enqueue),
+    B <Hz> [ms] (beep) and X (stop) for a Music player; songs are
+    RTTTL or MML text."""
+    channel.register('P', lambda a: music.play(text(a)))
+    channel.register('L', lambda a: music.play(text(a), loop=True))
+    channel.register('Q', lambda a: music.enqueue(text(a)))
+    channel.register('B', lambda a: music.beep(*ints(a)))
+    channel.register('X', lambda a: music.stop())
+
+
+def bind_text(channel, show, cmd='T'):
+    """T <text>: call show(str), e.g. FourDigit.show_text."""
+    channel.register(cmd, lambda a: show(text(a)))
@@ -0,0 +1,209 @@
+"""Change-driven sensor-to-display pipeline.
+
+Readings flow from a source (usually the newest sample of an
+epySensorSampler ring) through a filter to one or more display sinks.
+A sink is only called when the value shown at display precision
+changes. A Deadband holds the shown value until the reading has moved
+half a display step plus some hysteresis, so noise around a rounding
+boundary does not make digits flicker. Sinks then redraw only their own
+digits or screen region. With a steady sensor the bus stays quiet apart
+from the sensor reads themselves.
+
+Values are fixed-point ints like the sampler's (centi-units), shown
+values are ints in display steps (tenths of a degree for step=10).
+
+Usage (MicroPython):
+	from epyDashboard import Dashboard, Deadband, Field, OledText, \\
+		digits_temperature
+	dash = Dashboard(sampler)
+	dash.add(Field(sampler.temperature.last, Deadband(10, 3),
+	               digits_temperature(four_digit),
+	               OledText(oled, 0, 0, 'T {} C', 1, 10)))
+	dash.add(Field(sampler.humidity.last, Deadband(100, 30),
+	               OledText(oled, 0, 10, 'RH {} %', 0, 10)))
+	while True:
+		utime.sleep_ms(dash.update())
+"""
+
+
+class Deadband:
+    """Quantise readings to display steps, with hysteresis.
+
+    step: reading units per display step (10 centi-degrees = 0.1 degC)
+    hysteresis: extra reading units beyond half a step before the shown
+                value follows the reading
+    """
+
+    def __init__(self, step=10, hysteresis=3):
+        self.step = step
+        self.hysteresis = hysteresis
+        self.shown = None
+
+    def update(self, value):
+        """Feed a reading; True if the shown value changed."""
+        step = self.step
+        q = (value + step // 2) // step
+        shown = self.shown
+        if shown is not None:
+            if q == shown:
+                return False
+            band = step // 2 + self.hysteresis
+            if -band < value - shown * step < band:
+                return False
+        self.shown = q
+        return True
+
+    def reset(self):
+        self.shown = None
+
+
+class Threshold:
+    """Alarm state with hysteresis: on at >= high, off again below low.
+
+    shown is 1 while the alarm is on, 0 while off.
+    """
+
+    def __init__(self, high, low=None):
+        self.high = high
+        self.low = high if low is None else low
+        self.shown = None
+
+    def update(self, value):
+        """Feed a reading; True if the alarm state changed."""
+        shown = self.shown
+        if shown:
+            on = value >= self.low
+        else:
+            on = value >= self.high
+        on = 1 if on else 0
+        if on == shown:
+            return False
+        self.shown = on
+        return True
+
+    def reset(self):
+        self.shown = None
+
+
+class Field:
+    """One displayed quantity: source -> filter -> sinks.
+
+    source: callable returning the reading (int) or raising IndexError /
+            returning None while there is none yet
+    sinks: callables taking the filter's new shown value
+    """
+
+    def __init__(self, source, filt, *sinks):
+        self.source = source
+        self.filter = filt
+        self.sinks = sinks
+        self.pushes = 0
+        self.skipped = 0
+
+    def update(self):
+        """Pull one reading; True if it was pushed to the sinks."""
+        try:
+            value = self.source()
+        except IndexError:
+            return False
+        if value is None:
+            return False
+        if not self.filter.update(value):
+            self.skipped += 1
+            return False
+        shown = self.filter.shown
+        for sink in self.sinks:
+            sink(shown)
+        self.pushes += 1
+        return True
+
+    def invalidate(self):
+        """Push the next reading even if the shown value is unchanged."""
+        self.filter.reset()
+
+
+def fixed(shown, decimals):
+    """Format an int in units of 10**-decimals as text ('-1.5')."""
+    if not decimals:
+        return str(shown)
+    scale = 10 ** decimals
+    sign = '-' if shown < 0 else ''
+    shown = abs(shown)
+    frac = str(shown % scale)
+    return '{}{}.{}{}'.format(sign, shown // scale,
+                              '0' * (decimals - len(frac)), frac)
+
+
+def digits_temperature(display):
+    """Sink showing tenths of a degree on a FourDigit (show_temper).
+
+    FourDigit diffs against its shadow, so only changed digits are sent.
+    """
+    return lambda tenths: display.show_temper(tenths / 10)
+
+
+class OledText:
+    """Sink drawing a formatted value into its own area of an SSD1306.
+
+    The area is `chars` 8-pixel cells wide at x, y; each change clears
+    and redraws only that area and sends it with show_region().
+
+    fmt: format string with one {} for the value
+    decimals: the shown value is in units of 10**-decimals
+    chars: width of the area in characters
+    """
+
+    def __init__(self, oled, x, y, fmt='{}', decimals=0, chars=8):
+        self.oled = oled
+        self.x = x
+        self.y = y
+        self.fmt = fmt
+        self.decimals = decimals
+        self.w = 8 * chars
+        self.bytes_sent = 0
+
+    def __call__(self, shown):
+        oled = self.oled
+        oled.fill_rect(self.x, self.y, self.w, 8, 0)
+        oled.text(self.fmt.format(fixed(shown, self.decimals)),
+                  self.x, self.y, 1)
+        self.bytes_sent += oled.show_region(self.x, self.y, self.w, 8)
+
+
+class Dashboard:
+    """Drive fields from a sampler: fields update once per new sample.
+
+    sampler: an HTU21DSampler (or anything with update() returning ms to
+             wait and a `samples` count); None to call poll() yourself
+    """
+
+    def __init__(self, sampler=None):
+        self.sampler = sampler
+        self.fields = []
+        self._seen = -1
+
+    def add(self, field):
+        self.fields.append(field)
+        return field
+
+    def poll(self):
+        """Update every field; returns how many pushed a change."""
+        n = 0
+        for field in self.fields:
+            if field.update():
+                n += 1
+        return n
+
+    def update(self):
+        """Advance the sampler and push changes; returns ms to wait."""
+        sampler = self.sampler
+        wait = sampler.update()
+        if sampler.samples != self._seen:
+            self._seen = sampler.samples
+            self.poll()
+        return wait
+
+    def invalidate(self):
+        """Redraw every field on the next sample (e.g. after a clear)."""
+        for field in self.fields:
+            field.invalidate()
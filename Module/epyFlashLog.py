@@ -0,0 +1,248 @@
+"""Compact binary sample logger for flash with file rotation.
+
+Samples are fixed-size binary records (a u32 timestamp followed by a
+fixed number of int16 channels, e.g. HTU21D centi-degC and centi-%RH) that
+are packed into a preallocated RAM block and written to flash one whole
+block at a time. The log rotates over a bounded set of files, so it never
+fills the filesystem, and records() streams ranges back block by block
+without loading whole files.
+
+File layout (little endian):
+    0  b'eL'  magic
+    2  u8     format version (1)
+    3  u8     channels per record
+    4  u32    generation (increases with every new file)
+    8  records, each: u32 timestamp, channels * i16
+
+A record cut short by a power loss is ignored on reading, and the log
+starts a fresh file instead of appending behind it.
+
+Usage (MicroPython):
+	from epyFlashLog import FlashLog
+	log = FlashLog('/flash/th', files=4, file_size=16384)
+	vals = [0, 0]
+	while True:
+		if sensor.update():
+			vals[0] = sensor.temperature_centi
+			vals[1] = sensor.humidity_centi
+			log.append(utime.time(), vals)
+	...
+	for ts, t_c, rh_c in log.records(start=utime.time() - 3600):
+		print(ts, t_c, rh_c)
+"""
+
+try:
+    import uos as os
+except ImportError:
+    import os
+
+MAGIC = b'eL'
+VERSION = 1
+HEADER_SIZE = 8
+
+
+def _u32(buf, o):
+    return buf[o] | buf[o + 1] << 8 | buf[o + 2] << 16 | buf[o + 3] << 24
+
+
+class FlashLog:
+    """Block-buffered binary logger rotating over `files` files.
+
+    path: file name prefix; files are <path>0.bin .. <path><files-1>.bin
+    files: number of files kept (the oldest is overwritten)
+    file_size: max bytes per file, header included
+    block_size: RAM buffer size, written to flash in one call when full
+    channels: int16 values per record
+    """
+
+    def __init__(self, path='log', files=4, file_size=16384, block_size=512,
+                 channels=2):
+        self.path = path
+        self.files = files
+        self.channels = channels
+        self.record_size = 4 + 2 * channels
+        self.per_file = (file_size - HEADER_SIZE) // self.record_size
+        self.per_block = max(1, block_size // self.record_size)
+        if self.per_file < self.per_block:
+            raise ValueError('file_size smaller than one block')
+        self._buf = bytearray(self.per_block * self.record_size)
+        self._mv = memoryview(self._buf)
+        self._header = bytearray(HEADER_SIZE)
+        self._pending = 0  # records in _buf
+        self._file = None
+        self._index = 0  # current file number
+        self._generation = 0
+        self._count = 0  # records in the current file, buffered included
+        # statistics for write-amplification measurements
+        self.records_written = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self._resume()
+
+    def _name(self, index):
+        return '{}{}.bin'.format(self.path, index)
+
+    def _read_header(self, index):
+        """Return (generation, records) of a log file or None."""
+        try:
+            with open(self._name(index), 'rb') as f:
+                head = f.read(HEADER_SIZE)
+                size = os.stat(self._name(index))[6]
+        except OSError:
+            return None
+        if len(head) < HEADER_SIZE or head[0:2] != MAGIC or \
+                head[2] != VERSION or head[3] != self.channels:
+            return None
+        body = size - HEADER_SIZE
+        if body % self.record_size:
+            return _u32(head, 4), -1  # torn tail: do not append behind it
+        return _u32(head, 4), body // self.record_size
+
+    def _order(self):
+        """File numbers holding log data, oldest first."""
+        found = []
+        for i in range(self.files):
+            info = self._read_header(i)
+            if info is not None:
+                found.append((info[0], i))
+        found.sort()
+        return [i for _, i in found]
+
+    def _resume(self):
+        newest = None
+        for i in range(self.files):
+            info = self._read_header(i)
+            if info is not None and (newest is None or info[0] > newest[0]):
+                newest = (info[0], i, info[1])
+        if newest is None:
+            self._index = self.files - 1  # _rotate() starts at file 0
+            self._rotate()
+            return
+        self._generation, self._index, count = newest
+        if count < 0 or count >= self.per_file:
+            self._rotate()
+        else:
+            self._file = open(self._name(self._index), 'ab')
+            self._count = count
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._index = (self._index + 1) % self.files
+        self._generation += 1
+        head = self._header
+        head[0:2] = MAGIC
+        head[2] = VERSION
+        head[3] = self.channels
+        g = self._generation
+        head[4] = g & 0xFF
+        head[5] = (g >> 8) & 0xFF
+        head[6] = (g >> 16) & 0xFF
+        head[7] = (g >> 24) & 0xFF
+        self._file = open(self._name(self._index), 'wb')
+        self._file.write(head)
+        self._count = 0
+        self.writes += 1
+        self.bytes_written += HEADER_SIZE
+
+    def append(self, ts, values):
+        """Buffer one record; writes a block to flash when it is full.
+
+        ts: u32 timestamp (e.g. utime.time())
+        values: `channels` ints in -32768..32767 (a reused list or array
+                keeps the call allocation-free)
+        """
+        if self._count >= self.per_file:
+            self.flush()
+            self._rotate()
+        buf = self._buf
+        o = self._pending * self.record_size
+        buf[o] = ts & 0xFF
+        buf[o + 1] = (ts >> 8) & 0xFF
+        buf[o + 2] = (ts >> 16) & 0xFF
+        buf[o + 3] = (ts >> 24) & 0xFF
+        o += 4
+        for i in range(self.channels):
+            v = values[i]
+            buf[o] = v & 0xFF
+            buf[o + 1] = (v >> 8) & 0xFF
+            o += 2
+        self._pending += 1
+        self._count += 1
+        self.records_written += 1
+        if self._pending == self.per_block:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to flash (a partial block if needed)."""
+        if not self._pending:
+            return
+        n = self._pending * self.record_size
+        self._file.write(self._mv[0:n])
+        self._file.flush()
+        self._pending = 0
+        self.writes += 1
+        self.bytes_written += n
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _decode(self, buf, o):
+        rec = [_u32(buf, o)]
+        o += 4
+        for _ in range(self.channels):
+            v = buf[o] | buf[o + 1] << 8
+            rec.append(v - 0x10000 if v & 0x8000 else v)
+            o += 2
+        return tuple(rec)
+
+    def records(self, start=None, end=None):
+        """Yield (ts, value, ...) tuples oldest first, start <= ts < end.
+
+        Files are read one block at a time; records still in the RAM
+        buffer are included. Timestamps are assumed to be non-decreasing,
+        so whole files before `start` are skipped after reading one record.
+        """
+        size = self.record_size
+        chunk = bytearray(self.per_block * size)
+        order = self._order()
+        for pos, index in enumerate(order):
+            if start is not None and pos + 1 < len(order):
+                first = self._first_ts(order[pos + 1])
+                if first is not None and first <= start:
+                    continue
+            try:
+                f = open(self._name(index), 'rb')
+            except OSError:
+                continue
+            with f:
+                f.seek(HEADER_SIZE)
+                while True:
+                    n = f.readinto(chunk)
+                    if not n:
+                        break
+                    for o in range(0, n - n % size, size):
+                        ts = _u32(chunk, o)
+                        if end is not None and ts >= end:
+                            return
+                        if start is None or ts >= start:
+                            yield self._decode(chunk, o)
+        buf = self._buf
+        for o in range(0, self._pending * size, size):
+            ts = _u32(buf, o)
+            if end is not None and ts >= end:
+                return
+            if start is None or ts >= start:
+                yield self._decode(buf, o)
+
+    def _first_ts(self, index):
+        try:
+            with open(self._name(index), 'rb') as f:
+                f.seek(HEADER_SIZE)
+                head = f.read(4)
+        except OSError:
+            return None
+        return _u32(head, 0) if len(head) == 4 else None
@@ -0,0 +1,182 @@
+"""Shared I2C bus wrapper for the ePy drivers.
+
+ePy Lite's I2C has the pyboard-style ``send``/``recv``/``mem_read`` API,
+other MicroPython ports the ``writeto``/``readfrom_into`` family. I2CBus
+resolves the native methods once and gives every driver the same small
+set of zero-copy primitives:
+
+- write(addr, buf)                 one write transaction
+- readinto(addr, buf)              read len(buf) bytes into buf
+- read_mem_into(addr, reg, buf)    register read into buf
+- batch(addr, control)             combine small writes (see WriteBatch)
+
+Per-address counters (transactions, bytes, errors, microseconds on the
+bus) are kept for every transaction, so the cost of each device can be
+measured on the target. Errors are counted and then raised as OSError,
+exactly as the native bus would. Setting `trace` (an epyBusTrace.BusTrace)
+also logs every transaction for replay on a PC.
+
+Usage (MicroPython):
+	from machine import I2C
+	from epyI2CBus import I2CBus
+	bus = I2CBus(I2C(0, I2C.MASTER, baudrate=400000))
+	oled = SSD1306_I2C(128, 64, bus)
+	sensor = HTU21D(bus)
+	...
+	print(bus.stats())
+"""
+
+import utime
+
+# indexes into the per-address counter lists
+TRANSACTIONS = 0
+BYTES = 1
+ERRORS = 2
+TIME_US = 3
+# transaction kinds passed to a trace (see epyBusTrace)
+WRITE = 0
+READ = 1
+READ_MEM = 2
+
+
+def as_bus(i2c):
+    """Return `i2c` if it already is an I2CBus, else wrap it."""
+    return i2c if isinstance(i2c, I2CBus) else I2CBus(i2c)
+
+
+class I2CBus:
+    """I2C wrapper with cached dispatch and per-address statistics.
+
+    i2c: an initialized ePy/pyb or machine I2C object
+    timing: measure bus time per transaction with ticks_us
+    """
+
+    def __init__(self, i2c, timing=True):
+        self.i2c = i2c
+        self.timing = timing
+        # resolve the native methods once; prefer the ePy names
+        send = getattr(i2c, 'send', None)
+        if callable(send):
+            self._send = send
+            self._writeto = None
+        else:
+            self._send = None
+            self._writeto = i2c.writeto
+        self._readfrom_into = getattr(i2c, 'readfrom_into', None)
+        self._recv = getattr(i2c, 'recv', None)
+        self._readfrom_mem_into = getattr(i2c, 'readfrom_mem_into', None)
+        self._mem_read = getattr(i2c, 'mem_read', None)
+        self._stats = {}
+        self.trace = None
+
+    def _count(self, addr, buf, t0, ok, kind, reg=-1):
+        rec = self._stats.get(addr)
+        if rec is None:
+            rec = self._stats[addr] = [0, 0, 0, 0]
+        rec[TRANSACTIONS] += 1
+        if ok:
+            rec[BYTES] += len(buf)
+        else:
+            rec[ERRORS] += 1
+        if self.timing:
+            rec[TIME_US] += utime.ticks_diff(utime.ticks_us(), t0)
+        if self.trace is not None:
+            self.trace.record(kind, addr, buf, ok, reg)
+
+    def write(self, addr, buf):
+        """Write buf (any buffer, not copied) in one transaction."""
+        t0 = utime.ticks_us() if self.timing else 0
+        try:
+            if self._send is not None:
+                self._send(buf, addr)
+            else:
+                self._writeto(addr, buf)
+        except OSError:
+            self._count(addr, buf, t0, False, WRITE)
+            raise
+        self._count(addr, buf, t0, True, WRITE)
+
+    def readinto(self, addr, buf):
+        """Read len(buf) bytes from addr into buf."""
+        t0 = utime.ticks_us() if self.timing else 0
+        try:
+            if self._readfrom_into is not None:
+                self._readfrom_into(addr, buf)
+            else:
+                self._recv(buf, addr)
+        except OSError:
+            self._count(addr, buf, t0, False, READ)
+            raise
+        self._count(addr, buf, t0, True, READ)
+        return buf
+
+    def read_mem_into(self, addr, reg, buf):
+        """Read len(buf) bytes of register `reg` into buf."""
+        t0 = utime.ticks_us() if self.timing else 0
+        try:
+            if self._readfrom_mem_into is not None:
+                self._readfrom_mem_into(addr, reg, buf)
+            else:
+                self._mem_read(buf, addr, reg)
+        except OSError:
+            self._count(addr, buf, t0, False, READ_MEM, reg)
+            raise
+        self._count(addr, buf, t0, True, READ_MEM, reg)
+        return buf
+
+    def batch(self, addr, control=None, size=32):
+        """Return a WriteBatch collecting bytes for one transaction."""
+        return WriteBatch(self, addr, control, size)
+
+    def scan(self):
+        return self.i2c.scan()
+
+    # --- statistics ---
+    def stats(self, addr=None):
+        """Counters as dicts: one address, or {addr: {...}} for all."""
+        if addr is not None:
+            rec = self._stats.get(addr, (0, 0, 0, 0))
+            return {'transactions': rec[TRANSACTIONS], 'bytes': rec[BYTES],
+                    'errors': rec[ERRORS], 'time_us': rec[TIME_US]}
+        return {a: self.stats(a) for a in self._stats}
+
+    def reset_stats(self):
+        self._stats.clear()
+
+
+class WriteBatch:
+    """Combine consecutive small writes to one address into one transaction.
+
+    Only for protocols where a single write may carry several items, e.g.
+    SSD1306 commands after a 0x00 control byte. Bytes are collected in a
+    preallocated buffer; flush() sends them (automatically when full).
+
+    control: optional byte sent first in every transaction
+    """
+
+    def __init__(self, bus, addr, control=None, size=32):
+        self.bus = bus
+        self.addr = addr
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._start = 0
+        if control is not None:
+            self._buf[0] = control
+            self._start = 1
+        self._n = self._start
+
+    def add(self, byte):
+        if self._n == len(self._buf):
+            self.flush()
+        self._buf[self._n] = byte
+        self._n += 1
+
+    def extend(self, data):
+        for byte in data:
+            self.add(byte)
+
+    def flush(self):
+        if self._n > self._start:
+            n = self._n
+            self._n = self._start
+            self.bus.write(self.addr, self._mv[0:n])
@@ -0,0 +1,210 @@
+"""Hot-path instrumentation for the ePy drivers.
+
+Profiler wraps driver methods at run time to record ticks_us spans into
+fixed-size log2 histograms; nothing is patched until instrument() or
+install() is called, so a build that never imports this module carries
+no probe code at all, and uninstall() restores the original methods.
+Each probe is one preallocated array: recording a span only does
+small-int arithmetic on it and allocates nothing (methods wrapped with
+more than two arguments take a *args tuple per call).
+
+dump() writes one text line per probe, counter and I2C device, to the
+REPL or a UART; tests/profile_report.py turns a dump into a per-
+subsystem CPU and bus time table on a PC.
+
+Usage (MicroPython):
+	import epyProfile
+	prof = epyProfile.Profiler()
+	prof.install()              # the default probes of loaded drivers
+	prof.add_bus(bus, {0x3c: 'display', 0x40: 'sensor', 0x3d: 'digits'})
+	...
+	prof.dump()                 # to the REPL
+	prof.dump(lambda line: uart.write(line + '\\n'))
+
+Dump format (one record per line):
+	T <ms since reset()>
+	P <name> <count> <total_ms> <rem_us> <max_us> <h0,h1,..>
+	C <name> <count>
+	B <name> <addr> <transactions> <bytes> <errors> <time_us>
+Histogram bucket 0 counts 0 us spans, bucket i >= 1 spans of
+2**(i-1) .. 2**i - 1 us, and the last bucket everything longer.
+"""
+
+import sys
+from array import array
+import utime
+
+BUCKETS = 16
+# probe record layout
+COUNT = 0
+TOTAL_MS = 1
+REM_US = 2
+MAX_US = 3
+HIST = 4
+
+
+def _zeros(size):
+    return array('L', (0 for _ in range(size)))
+
+
+# (module, class, method, probe name, extra args) of install()
+DEFAULT_PROBES = (
+    ('ssd1306', 'SSD1306', 'show', 'display.show', 0),
+    ('ePy4Digit', 'FourDigit', '_send_buf', 'digits.i2c_write', 1),
+    ('htu21d', 'HTU21D', 'read_temperature', 'sensor.read_temperature', 0),
+    ('htu21d', 'HTU21D', 'read_humidity', 'sensor.read_humidity', 0),
+    ('htu21d', 'HTU21D', 'update', 'sensor.update', 0),
+    ('epyRGB_MutilMode', 'RGBModeDisplay', 'fill_if_due',
+     'leds.fill_if_due', 0),
+    ('epyRGB_MutilMode', 'RGBModeDisplay', 'update_leds',
+     'leds.update_leds', 0),
+    ('epyBuzzerMusic', 'Music', '_playFreq', 'music._playFreq', 2),
+    ('epyBuzzerMusic', 'Music', 'update', 'music.update', 0),
+)
+
+
+class Profiler:
+    """Span probes, counters and I2C bus statistics in one dump."""
+
+    def __init__(self):
+        self._names = []
+        self._probes = []
+        self._counter_names = []
+        self._counters = array('L')
+        self._buses = []
+        self._patched = []
+        self._t0 = utime.ticks_ms()
+
+    # --- probes ---
+    def probe(self, name):
+        """Return the slot of probe `name`, creating it if needed."""
+        if name in self._names:
+            return self._names.index(name)
+        self._names.append(name)
+        self._probes.append(_zeros(HIST + BUCKETS))
+        return len(self._names) - 1
+
+    def record(self, slot, t0):
+        """Close the span of `slot` that started at ticks_us() `t0`."""
+        dt = utime.ticks_diff(utime.ticks_us(), t0)
+        rec = self._probes[slot]
+        rec[COUNT] += 1
+        rem = rec[REM_US] + dt
+        if rem >= 1000:
+            rec[TOTAL_MS] += rem // 1000
+            rem %= 1000
+        rec[REM_US] = rem
+        if dt > rec[MAX_US]:
+            rec[MAX_US] = dt
+        b = 0
+        while dt and b < BUCKETS - 1:
+            dt >>= 1
+            b += 1
+        rec[HIST + b] += 1
+
+    def counter(self, name):
+        """Return the slot of counter `name` for count()."""
+        if name in self._counter_names:
+            return self._counter_names.index(name)
+        self._counter_names.append(name)
+        self._counters.append(0)
+        return len(self._counter_names) - 1
+
+    def count(self, slot, n=1):
+        self._counters[slot] += n
+
+    def add_bus(self, bus, names=None):
+        """Include an epyI2CBus.I2CBus; names maps addresses to labels."""
+        self._buses.append((bus, names or {}))
+
+    # --- patching ---
+    def instrument(self, cls, method, name=None, nargs=0):
+        """Record every call of cls.method as probe `name`.
+
+        nargs: positional arguments after self; 0..2 get a wrapper that
+               allocates nothing per call
+        """
+        orig = getattr(cls, method)
+        slot = self.probe(name or cls.__name__ + '.' + method)
+        record = self.record
+        ticks_us = utime.ticks_us
+        if nargs == 0:
+            def wrapper(obj):
+                t0 = ticks_us()
+                try:
+                    return orig(obj)
+                finally:
+                    record(slot, t0)
+        elif nargs == 1:
+            def wrapper(obj, a):
+                t0 = ticks_us()
+                try:
+                    return orig(obj, a)
+                finally:
+                    record(slot, t0)
+        elif nargs == 2:
+            def wrapper(obj, a, b):
+                t0 = ticks_us()
+                try:
+                    return orig(obj, a, b)
+                finally:
+                    record(slot, t0)
+        else:
+            def wrapper(obj, *args):
+                t0 = ticks_us()
+                try:
+                    return orig(obj, *args)
+                finally:
+                    record(slot, t0)
+        self._patched.append((cls, method, orig))
+        setattr(cls, method, wrapper)
+        return slot
+
+    def install(self, probes=DEFAULT_PROBES):
+        """Instrument the default hot paths of driver modules already
+        imported (nothing is imported just to be profiled)."""
+        n = 0
+        for module, cls, method, name, nargs in probes:
+            mod = sys.modules.get(module)
+            if mod is None or not hasattr(mod, cls):
+                continue
+            self.instrument(getattr(mod, cls), method, name, nargs)
+            n += 1
+        return n
+
+    def uninstall(self):
+        """Put the original methods back."""
+        while self._patched:
+            cls, method, orig = self._patched.pop()
+            setattr(cls, method, orig)
+
+    # --- output ---
+    def reset(self):
+        for rec in self._probes:
+            for i in range(len(rec)):
+                rec[i] = 0
+        for i in range(len(self._counters)):
+            self._counters[i] = 0
+        for bus, _ in self._buses:
+            bus.reset_stats()
+        self._t0 = utime.ticks_ms()
+
+    def lines(self):
+        """Yield the dump lines (see the module docstring)."""
+        yield 'T {}'.format(utime.ticks_diff(utime.ticks_ms(), self._t0))
+        for name, rec in zip(self._names, self._probes):
+            yield 'P {} {} {} {} {} {}'.format(
+                name, rec[COUNT], rec[TOTAL_MS], rec[REM_US], rec[MAX_US],
+                ','.join(str(v) for v in rec[HIST:]))
+        for name, value in zip(self._counter_names, self._counters):
+            yield 'C {} {}'.format(name, value)
+        for bus, names in self._buses:
+            for addr, st in sorted(bus.stats().items()):
+                yield 'B {} {} {} {} {} {}'.format(
+                    names.get(addr, 'i2c'), addr, st['transactions'],
+                    st['bytes'], st['errors'], st['time_us'])
+
+    def dump(self, write=print):
+        """Write the dump one line at a time, e.g. to print or a UART."""
+        for line in self.lines():
+            write(line)
@@ -1,5 +1,5 @@
 from machine import LED
-from utime import sleep_ms, ticks_ms, ticks_diff
+from utime import sleep_ms, ticks_ms, ticks_diff, ticks_add
 import urandom as random  # MicroPython urandom
 
 # --- Configuration (centralized constants) ---
@@ -10,6 +10,64 @@ DEFAULT_WRITE_HZ = 30  # hardware write frequency (Hz)
 DEFAULT_SPEED = 8  # how many wheel-steps to advance each buffer update
 MAIN_LOOP_SLEEP_MS = 1
 
+# registered mode names and their methods; looked up by set_mode() instead
+# of a dict of bound methods built per instance
+MODES = (
+    ('rainbow', 'rainbow_mode'),
+    ('solid', 'solid_color_mode'),
+    ('primary_cycle', 'primary_cycle_mode'),
+    ('random_flash', 'random_flash_mode'),
+    ('chase', 'chase_mode'),
+    ('breathing', 'breathing_mode'),
+    ('color_wipe', 'color_wipe_mode'),
+    ('gradient', 'gradient_mode'),
+    ('theater_chase', 'theater_chase_mode'),
+    ('twinkle', 'twinkle_mode'),
+    # extra modes
+    ('sparkle', 'sparkle_mode'),
+    ('meteor', 'meteor_mode'),
+    ('strobe', 'strobe_mode'),
+    ('scanner', 'scanner_mode'),
+    ('confetti', 'confetti_mode'),
+    ('fire', 'fire_mode'),
+    ('rainbow_cycle', 'rainbow_cycle_mode'),
+    ('color_chase', 'color_chase_mode'),
+    ('pulse', 'pulse_mode'),
+    ('gradient_shift', 'gradient_shift_mode'),
+)
+
+_palette = None
+
+
+def wheel(pos):
+    """Colour wheel: 0..255 -> (r, g, b) going red, blue, green."""
+    if pos < 0 or pos > 255:
+        r = g = b = 0
+    elif pos < 85:
+        r = int(pos * 3)
+        g = int(255 - pos * 3)
+        b = 0
+    elif pos < 170:
+        pos -= 85
+        r = int(255 - pos * 3)
+        g = 0
+        b = int(pos * 3)
+    else:
+        pos -= 170
+        r = 0
+        g = int(pos * 3)
+        b = int(255 - pos * 3)
+    return (r, g, b)
+
+
+def palette():
+    """The 256-entry wheel palette, built on first use and shared by all
+    displays (it is read-only)."""
+    global _palette
+    if _palette is None:
+        _palette = tuple(wheel(i) for i in range(256))
+    return _palette
+
 
 class RGBModeDisplay:
     def __init__(self, num_leds=NUM_LEDS, brightness=BRIGHTNESS,
@@ -28,17 +86,18 @@ class RGBModeDisplay:
         self.write_request = False
         # state for original modes
         self.chase_pos = 0
-        self.twinkle_counters = [0] * self.num_leds
+        # counters and heat are 0..255: one byte per LED
+        self.twinkle_counters = bytearray(self.num_leds)
         self.twinkle_colors = [(0, 0, 0)] * self.num_leds
         # additional state for extra modes
-        self.sparkle_counters = [0] * self.num_leds
+        self.sparkle_counters = bytearray(self.num_leds)
         self.sparkle_colors = [(0, 0, 0)] * self.num_leds
         self.meteor_pos = 0
         self.meteor_size = max(3, self.num_leds // 8)
         self.scanner_pos = 0
         self.scanner_dir = 1
         self.strobe_on = False
-        self.fire_heat = [0] * self.num_leds
+        self.fire_heat = bytearray(self.num_leds)
         self.confetti_decay = 20
         self.color_chase_offset = 0
         # intervals in ms
@@ -47,55 +106,20 @@ class RGBModeDisplay:
 
         self.last_fill_time = ticks_ms()
         self.last_update_time = ticks_ms()
+        # optional shared BeatClock (see set_beat_clock)
+        self.beat_clock = None
+        self.ticks_per_frame = 1
+        self._last_frame = None
 
-        # mode can be a callable or a name mapping. register available modes
+        # mode can be a callable or the name of one of MODES
         self.mode = self.rainbow_mode
-        self._modes = {
-            'rainbow': self.rainbow_mode,
-            'solid': self.solid_color_mode,
-            'primary_cycle': self.primary_cycle_mode,
-            'random_flash': self.random_flash_mode,
-            'chase': self.chase_mode,
-            'breathing': self.breathing_mode,
-            'color_wipe': self.color_wipe_mode,
-            'gradient': self.gradient_mode,
-            'theater_chase': self.theater_chase_mode,
-            'twinkle': self.twinkle_mode,
-            # extra modes
-            'sparkle': self.sparkle_mode,
-            'meteor': self.meteor_mode,
-            'strobe': self.strobe_mode,
-            'scanner': self.scanner_mode,
-            'confetti': self.confetti_mode,
-            'fire': self.fire_mode,
-            'rainbow_cycle': self.rainbow_cycle_mode,
-            'color_chase': self.color_chase_mode,
-            'pulse': self.pulse_mode,
-            'gradient_shift': self.gradient_shift_mode,
-        }
-        # precompute a 256-entry palette to avoid repeated wheel calculations
-        self.palette = [self.wheel(i) for i in range(256)]
+        # 256-entry palette to avoid repeated wheel calculations
+        self.palette = palette()
         self.running = False
 
     # color wheel helper
     def wheel(self, pos):
-        if pos < 0 or pos > 255:
-            r = g = b = 0
-        elif pos < 85:
-            r = int(pos * 3)
-            g = int(255 - pos * 3)
-            b = 0
-        elif pos < 170:
-            pos -= 85
-            r = int(255 - pos * 3)
-            g = 0
-            b = int(pos * 3)
-        else:
-            pos -= 170
-            r = 0
-            g = int(pos * 3)
-            b = int(255 - pos * 3)
-        return (r, g, b)
+        return wheel(pos)
 
     # small helpers to reduce duplicated code
     def set_all(self, color):
@@ -254,7 +278,7 @@ class RGBModeDisplay:
                 if random.getrandbits(8) % 30 == 0:
                     c = self.palette[random.getrandbits(8) & 255]
                     self.sparkle_colors[i] = c
-                    self.sparkle_counters[i] = self.confetti_decay
+                    self.sparkle_counters[i] = min(255, self.confetti_decay)
                     self.led_buffer[i] = c
                 else:
                     self.led_buffer[i] = (0, 0, 0)
@@ -316,12 +340,13 @@ class RGBModeDisplay:
         if callable(mode):
             self.mode = mode
         elif isinstance(mode, str):
-            # lookup named modes from the registry
-            if mode in self._modes:
-                self.mode = self._modes[mode]
-            else:
-                # unknown string -> default to rainbow
-                self.mode = self.rainbow_mode
+            # lookup named modes from the registry; unknown -> rainbow
+            method = 'rainbow_mode'
+            for name, attr in MODES:
+                if name == mode:
+                    method = attr
+                    break
+            self.mode = getattr(self, method)
         else:
             self.mode = self.rainbow_mode
 
@@ -336,18 +361,47 @@ class RGBModeDisplay:
         self.write_hz = hz
         self.update_interval_ms = max(1, int(1000.0 / self.write_hz))
 
+    def set_beat_clock(self, clock, ticks_per_frame=1):
+        """Update the buffer on a shared BeatClock (e.g. Music.clock).
+
+        One frame is rendered every `ticks_per_frame` clock ticks, so the
+        effect stays locked to the music. Pass None to go back to update_hz.
+        """
+        self.beat_clock = clock
+        self.ticks_per_frame = max(1, int(ticks_per_frame))
+        self._last_frame = None
+
     def fill_if_due(self):
+        """Render a frame if one is due; return True if it did."""
         now = ticks_ms()
-        if ticks_diff(now, self.last_fill_time) >= self.fill_interval_ms:
-            # call current mode to fill buffer
-            try:
-                self.mode()
-            except Exception:
-                # fallback to rainbow
-                self.rainbow_mode()
-            # advance phase
-            self.phase = (self.phase + self.speed) % 256
-            self.last_fill_time = now
+        clock = self.beat_clock
+        if clock is not None:
+            frame = clock.tick_at(now) // self.ticks_per_frame
+            if frame == self._last_frame:
+                return False
+            self._last_frame = frame
+        elif ticks_diff(now, self.last_fill_time) >= self.fill_interval_ms:
+            # advance on a fixed grid so frame time does not drift; resync
+            # if we fell more than a frame behind
+            self.last_fill_time = ticks_add(self.last_fill_time,
+                                            self.fill_interval_ms)
+            if ticks_diff(now, self.last_fill_time) >= self.fill_interval_ms:
+                self.last_fill_time = now
+        else:
+            return False
+        self.render()
+        return True
+
+    def render(self):
+        """Fill the buffer with the next frame of the current mode."""
+        # call current mode to fill buffer
+        try:
+            self.mode()
+        except Exception:
+            # fallback to rainbow
+            self.rainbow_mode()
+        # advance phase
+        self.phase = (self.phase + self.speed) % 256
 
     def update_if_due(self):
         now = ticks_ms()
@@ -382,7 +436,7 @@ class RGBModeDisplay:
 
 if __name__ == '__main__':
     disp = RGBModeDisplay()
-    mode_names = list(disp._modes.keys())
+    mode_names = [name for name, _ in MODES]
     show_seconds = 10
     try:
         for name in mode_names:
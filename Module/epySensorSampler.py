@@ -0,0 +1,221 @@
+"""Fixed-rate sampling engine for the HTU21D with streaming statistics.
+
+Samples are stored as fixed-point centi-units (0.01 degC / 0.01 %RH) in
+preallocated ``array('h')`` rings, so days of sampling never grow or
+fragment the heap. Every aggregate is maintained incrementally in O(1)
+(amortised for window min/max) per sample, and consumers read the history
+in place through get() or segments() instead of copying it.
+
+Usage (MicroPython):
+	from machine import I2C
+	from htu21d import HTU21D
+	from epySensorSampler import HTU21DSampler
+	sampler = HTU21DSampler(HTU21D(I2C(0, I2C.MASTER, baudrate=100000)),
+	                        period_ms=1000, size=120)
+	while True:
+		sampler.update()
+		t = sampler.temperature
+		print(t.last(), t.mean(), t.min(), t.max(), t.ema())
+"""
+
+from array import array
+import utime
+
+
+def _zeros(typecode, size):
+    return array(typecode, (0 for _ in range(size)))
+
+
+class RingStats:
+    """Ring of int16 samples with running window statistics.
+
+    size: number of samples kept (the statistics window)
+    ema_shift: EMA smoothing factor is 1 / 2**ema_shift
+    """
+
+    # EMA keeps EMA_FRAC extra fraction bits to avoid rounding stalls
+    EMA_FRAC = 4
+
+    def __init__(self, size, ema_shift=3):
+        self.size = size
+        self.ema_shift = ema_shift
+        self.buf = _zeros('h', size)
+        # monotonic queues of ring positions for window min and max
+        self._minq = _zeros('H', size)
+        self._maxq = _zeros('H', size)
+        self.reset()
+
+    def reset(self):
+        self.head = 0  # next write position
+        self.count = 0
+        self._sum = 0
+        # squares are summed relative to the first sample so they stay
+        # small ints on the device even for long windows
+        self._ref = 0
+        self._sumsq = 0
+        self._sumd = 0
+        self._ema = 0
+        self._min_h = self._min_n = 0
+        self._max_h = self._max_n = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, value):
+        """Add a sample (int in -32768..32767), evicting the oldest."""
+        buf = self.buf
+        size = self.size
+        pos = self.head
+        if self.count == size:
+            old = buf[pos]
+            self._sum -= old
+            d = old - self._ref
+            self._sumd -= d
+            self._sumsq -= d * d
+            # the evicted sample leaves the min/max queues if at the front
+            if self._min_n and self._minq[self._min_h] == pos:
+                self._min_h = (self._min_h + 1) % size
+                self._min_n -= 1
+            if self._max_n and self._maxq[self._max_h] == pos:
+                self._max_h = (self._max_h + 1) % size
+                self._max_n -= 1
+        else:
+            if self.count == 0:
+                self._ref = value
+                self._ema = value << self.EMA_FRAC
+            self.count += 1
+
+        buf[pos] = value
+        self._sum += value
+        d = value - self._ref
+        self._sumd += d
+        self._sumsq += d * d
+        self._ema += ((value << self.EMA_FRAC) - self._ema) >> self.ema_shift
+
+        # drop queue tails that can never be the min/max again
+        q = self._minq
+        while self._min_n and \
+                buf[q[(self._min_h + self._min_n - 1) % size]] >= value:
+            self._min_n -= 1
+        q[(self._min_h + self._min_n) % size] = pos
+        self._min_n += 1
+        q = self._maxq
+        while self._max_n and \
+                buf[q[(self._max_h + self._max_n - 1) % size]] <= value:
+            self._max_n -= 1
+        q[(self._max_h + self._max_n) % size] = pos
+        self._max_n += 1
+
+        self.head = pos + 1 if pos + 1 < size else 0
+
+    # --- aggregates (window = the last `count` samples) ---
+    def last(self):
+        return self.get(0)
+
+    def get(self, age):
+        """Sample `age` steps back (0 = newest); IndexError if too old."""
+        if not 0 <= age < self.count:
+            raise IndexError('sample not in window')
+        return self.buf[(self.head - 1 - age) % self.size]
+
+    def mean(self):
+        """Window mean, rounded to the nearest unit (None if empty)."""
+        n = self.count
+        if not n:
+            return None
+        return (2 * self._sum + n) // (2 * n)
+
+    def variance(self):
+        """Population variance of the window in units^2 (None if empty)."""
+        n = self.count
+        if not n:
+            return None
+        return (self._sumsq - self._sumd * self._sumd // n) // n
+
+    def min(self):
+        return self.buf[self._minq[self._min_h]] if self.count else None
+
+    def max(self):
+        return self.buf[self._maxq[self._max_h]] if self.count else None
+
+    def ema(self):
+        """Exponential moving average, rounded (None if empty)."""
+        if not self.count:
+            return None
+        return (self._ema + (1 << (self.EMA_FRAC - 1))) >> self.EMA_FRAC
+
+    def sum_last(self, n):
+        """Sum of the newest n samples, read in place (O(n))."""
+        n = min(n, self.count)
+        buf = self.buf
+        size = self.size
+        pos = self.head
+        total = 0
+        for _ in range(n):
+            pos = pos - 1 if pos else size - 1
+            total += buf[pos]
+        return total
+
+    def segments(self):
+        """Two memoryviews covering the window oldest -> newest.
+
+        Valid until the next push(); no samples are copied.
+        """
+        mv = memoryview(self.buf)
+        if self.count < self.size:
+            return mv[0:self.head], mv[0:0]
+        return mv[self.head:], mv[0:self.head]
+
+
+class HTU21DSampler:
+    """Read an HTU21D at a fixed rate into RingStats histories.
+
+    sensor: an HTU21D instance (its non-blocking update() is used)
+    period_ms: sample period; samples start on a fixed grid
+    size: samples kept per quantity
+    """
+
+    def __init__(self, sensor, period_ms=1000, size=60, ema_shift=3):
+        self.sensor = sensor
+        self.period_ms = int(period_ms)
+        self.temperature = RingStats(size, ema_shift)
+        self.humidity = RingStats(size, ema_shift)
+        self.samples = 0
+        self.missed = 0  # periods skipped because we fell behind
+        self.errors = 0  # CRC failures after the driver's retries, bus errors
+        self._next = utime.ticks_ms()
+        self._busy = False
+
+    def update(self):
+        """Advance sampling; never blocks. Returns ms until due again."""
+        now = utime.ticks_ms()
+        sensor = self.sensor
+        if not self._busy:
+            wait = utime.ticks_diff(self._next, now)
+            if wait > 0:
+                return wait
+            self._next = utime.ticks_add(self._next, self.period_ms)
+            late = utime.ticks_diff(now, self._next)
+            if late >= 0:
+                # more than a period behind: skip to the next slot
+                skipped = late // self.period_ms + 1
+                self.missed += skipped
+                self._next = utime.ticks_add(self._next,
+                                             skipped * self.period_ms)
+            self._busy = True
+        try:
+            done = sensor.update()
+        except (OSError, ValueError):
+            # CRC failures or a NACKed trigger: drop this sample and
+            # start over at the next slot
+            self.errors += 1
+            self._busy = False
+            sensor.state = sensor.IDLE
+            return max(0, utime.ticks_diff(self._next, utime.ticks_ms()))
+        if not done:
+            return sensor.time_until_ready()
+        self._busy = False
+        self.temperature.push(sensor.temperature_centi)
+        self.humidity.push(sensor.humidity_centi)
+        self.samples += 1
+        return max(0, utime.ticks_diff(self._next, utime.ticks_ms()))
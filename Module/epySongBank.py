@@ -0,0 +1,516 @@
+"""Compact binary song format for epyBuzzerMusic.
+
+Songs written as RTTTL, MML or the legacy ``["E4:2", "E", ...]`` note
+lists are compiled into a small binary format (2 bytes per note) that can
+be streamed from a ``bytes`` object or an open file during playback, so a
+song library does not have to live in RAM as Python strings.
+
+Song layout (little endian):
+    0  b'eS'  magic
+    2  u8     format version (1)
+    3  u8     ticks per beat
+    4  u16    tempo in beats per minute
+    6  u16    number of notes
+    8  notes  2 bytes each: MIDI note number (0 = rest), duration in ticks
+
+A bank bundles several songs in one file:
+    0  b'eB'  magic
+    2  u8     format version (1)
+    3  u8     number of songs
+    4  index  per song: u8 name length, name (ascii), u32 offset
+    ..  songs concatenated, offsets relative to the start of the bank
+
+Usage (host side converter):
+    python epySongBank.py -o songs.bin intro.rtttl theme.mml
+"""
+
+SONG_MAGIC = b'eS'
+BANK_MAGIC = b'eB'
+VERSION = 1
+HEADER_SIZE = 8
+
+# ticks per beat used for RTTTL/MML (a beat is a quarter note, so one tick
+# is a 64th note and dotted 32nds are still exact)
+TEXT_TICKS = 16
+
+# semitone offsets relative to A of the same octave (same table as Music)
+NOTE_OFFSETS = {
+    'R': 0, 'A': 0, 'Ab': -1, 'G#': -1, 'G': -2, 'Gb': -3,
+    'F#': -3, 'F': -4, 'E': -5, 'Eb': -6, 'D#': -6, 'D': -7,
+    'Db': -8, 'C#': -8, 'C': -9, 'B': 2, 'Bb': 1, 'A#': 1
+}
+
+# semitones above C for plain letters (RTTTL 'h' is the german B)
+_LETTER_SEMI = {'c': 0, 'd': 2, 'e': 4, 'f': 5, 'g': 7, 'a': 9, 'b': 11,
+                'h': 11}
+
+
+def note_freq(note):
+    """Return the frequency in Hz of MIDI note `note` (0 means rest)."""
+    if note <= 0:
+        return 0
+    return 440.0 * 2 ** ((note - 69) / 12)
+
+
+def note_number(name, octave):
+    """Return the MIDI note for a legacy note name ('C#', 'Bb', ...)."""
+    return 69 + NOTE_OFFSETS[name] + 12 * (octave - 4)
+
+
+# --- encoding ---
+def _put_note(out, note, ticks):
+    """Append one note, splitting durations longer than 255 ticks."""
+    if ticks <= 0:
+        return
+    while ticks > 255:
+        out.append(note)
+        out.append(255)
+        ticks -= 255
+    out.append(note)
+    out.append(ticks)
+
+
+def _pack(notes, ticks, bpm):
+    """Build a song blob from the bytearray of (note, ticks) pairs."""
+    if not 1 <= ticks <= 255:
+        raise ValueError('ticks per beat must be 1..255')
+    if not 1 <= bpm <= 0xFFFF:
+        raise ValueError('bpm must be 1..65535')
+    count = len(notes) // 2
+    if count > 0xFFFF:
+        raise ValueError('song too long')
+    hdr = bytearray(SONG_MAGIC)
+    hdr.append(VERSION)
+    hdr.append(ticks)
+    hdr.append(bpm & 0xFF)
+    hdr.append(bpm >> 8)
+    hdr.append(count & 0xFF)
+    hdr.append(count >> 8)
+    return bytes(hdr + notes)
+
+
+def compile_notes(music, ticks=4, bpm=120, octave=4):
+    """Compile a legacy note list (``"E4:2"``, ``"R:1"``, ``"C"``).
+
+    Omitted octaves reuse the previous one and omitted durations are one
+    tick, matching the original Music parser.
+    """
+    out = bytearray()
+    for play_t in music:
+        colon_pos = play_t.find(':')
+        if colon_pos != -1:
+            token = play_t[:colon_pos]
+            duration_part = play_t[colon_pos + 1:]
+        else:
+            token = play_t
+            duration_part = ''
+
+        if duration_part and duration_part.isdigit():
+            dur = int(duration_part)
+        else:
+            dur = 1
+
+        if token.startswith('R'):
+            _put_note(out, 0, dur)
+            continue
+        if len(token) >= 2 and token[1] in ('#', 'b'):
+            name = token[0:2]
+            tail = token[2:]
+        else:
+            name = token[0]
+            tail = token[1:]
+        if tail and tail[-1].isdigit():
+            octave = int(tail[-1])
+        if name not in NOTE_OFFSETS:
+            raise ValueError('unknown note: {}'.format(play_t))
+        _put_note(out, note_number(name, octave), dur)
+    return _pack(out, ticks, bpm)
+
+
+def _length_ticks(length, dots):
+    """Ticks of a 1/length note with `dots` dots at TEXT_TICKS per beat."""
+    base = (TEXT_TICKS * 4 + length // 2) // length
+    total = base
+    while dots:
+        base //= 2
+        total += base
+        dots -= 1
+    return total
+
+
+def compile_rtttl(text):
+    """Compile an RTTTL string (``name:d=4,o=5,b=100:8e6,p,...``).
+
+    Returns ``(name, song_bytes)``.
+    """
+    parts = text.strip().split(':')
+    if len(parts) != 3:
+        raise ValueError('RTTTL needs name:settings:notes')
+    name = parts[0].strip()
+    d, o, b = 4, 6, 63
+    for item in parts[1].split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        key, _, val = item.partition('=')
+        if key == 'd':
+            d = int(val)
+        elif key == 'o':
+            o = int(val)
+        elif key == 'b':
+            b = int(val)
+        else:
+            raise ValueError('unknown RTTTL setting: {}'.format(item))
+
+    out = bytearray()
+    for tok in parts[2].split(','):
+        tok = tok.strip().lower()
+        if not tok:
+            continue
+        i = 0
+        n = len(tok)
+        while i < n and tok[i].isdigit():
+            i += 1
+        length = int(tok[:i]) if i else d
+        if i >= n:
+            raise ValueError('bad RTTTL note: {}'.format(tok))
+        letter = tok[i]
+        i += 1
+        sharp = i < n and tok[i] == '#'
+        if sharp:
+            i += 1
+        dots = 0
+        if i < n and tok[i] == '.':
+            dots += 1
+            i += 1
+        octave = o
+        if i < n and tok[i].isdigit():
+            octave = int(tok[i])
+            i += 1
+        if i < n and tok[i] == '.':
+            dots += 1
+            i += 1
+        if i != n:
+            raise ValueError('bad RTTTL note: {}'.format(tok))
+        ticks = _length_ticks(length, dots)
+        if letter == 'p':
+            _put_note(out, 0, ticks)
+        elif letter in _LETTER_SEMI:
+            note = 12 * (octave + 1) + _LETTER_SEMI[letter] + (1 if sharp else 0)
+            _put_note(out, note, ticks)
+        else:
+            raise ValueError('bad RTTTL note: {}'.format(tok))
+    return name, _pack(out, TEXT_TICKS, b)
+
+
+def compile_mml(text):
+    """Compile an MML string (``T120 L8 O4 C D E4. R <B >C&C``).
+
+    Supported commands: notes ``A``-``G`` with ``+``/``#``/``-``, ``R``/``P``
+    rests, lengths and dots, ``&`` ties, ``L``, ``O``, ``<``, ``>``, ``T``
+    and ``V`` (ignored). A later ``T`` scales the following durations so the
+    whole song keeps the tempo stored in the header.
+    """
+    s = text.upper()
+    n = len(s)
+    i = 0
+    bpm = None
+    cur_bpm = 120
+    length = 4
+    octave = 4
+    out = bytearray()
+    tie = False
+
+    def number(i):
+        j = i
+        while j < n and s[j].isdigit():
+            j += 1
+        return (int(s[i:j]) if j > i else None), j
+
+    while i < n:
+        c = s[i]
+        i += 1
+        if c in ' \t\r\n|;':
+            continue
+        if c in 'ABCDEFGRP':
+            semi = 0
+            if c not in 'RP':
+                semi = _LETTER_SEMI[c.lower()]
+                while i < n and s[i] in '+#-':
+                    semi += -1 if s[i] == '-' else 1
+                    i += 1
+            val, i = number(i)
+            dots = 0
+            while i < n and s[i] == '.':
+                dots += 1
+                i += 1
+            ticks = _length_ticks(val or length, dots)
+            if bpm is None:
+                bpm = cur_bpm
+            elif cur_bpm != bpm:
+                ticks = (ticks * bpm + cur_bpm // 2) // cur_bpm
+            note = 0 if c in 'RP' else 12 * (octave + 1) + semi
+            if tie and len(out) >= 2 and out[-2] == note:
+                # extend the previous note instead of retriggering it
+                ticks += out[-1]
+                del out[-2:]
+            _put_note(out, note, ticks)
+            tie = False
+        elif c == '&':
+            tie = True
+        elif c == 'L':
+            val, i = number(i)
+            if not val:
+                raise ValueError('MML: L needs a length')
+            length = val
+        elif c == 'O':
+            val, i = number(i)
+            if val is None:
+                raise ValueError('MML: O needs an octave')
+            octave = val
+        elif c == '<':
+            octave -= 1
+        elif c == '>':
+            octave += 1
+        elif c == 'T':
+            val, i = number(i)
+            if not val:
+                raise ValueError('MML: T needs a tempo')
+            cur_bpm = val
+        elif c == 'V':
+            _, i = number(i)
+        else:
+            raise ValueError('MML: unexpected {!r}'.format(c))
+    return _pack(out, TEXT_TICKS, bpm or cur_bpm)
+
+
+def compile_text(text):
+    """Compile RTTTL (``name:settings:notes``) or otherwise MML text."""
+    if text.count(':') == 2:
+        return compile_rtttl(text)[1]
+    return compile_mml(text)
+
+
+# --- streaming ---
+class SongReader:
+    """Stream notes from a compiled song without loading it into RAM.
+
+    src: ``bytes``/``bytearray``/``memoryview`` holding the song, or a file
+         opened in binary mode (``readinto`` and ``seek`` are used)
+    offset: byte offset of the song inside `src` (for banks)
+    """
+
+    CHUNK = 32  # bytes read from a file at a time (16 notes)
+
+    def __init__(self, src, offset=0):
+        self._offset = offset
+        if hasattr(src, 'readinto'):
+            self._file = src
+            self._mv = None
+            self._buf = bytearray(self.CHUNK)
+            src.seek(offset)
+            hdr = bytearray(HEADER_SIZE)
+            if src.readinto(hdr) != HEADER_SIZE:
+                raise ValueError('truncated song header')
+        else:
+            self._file = None
+            self._mv = memoryview(src)
+            self._buf = self._mv
+            hdr = self._mv[offset:offset + HEADER_SIZE]
+        if len(hdr) < HEADER_SIZE or bytes(hdr[0:2]) != SONG_MAGIC:
+            raise ValueError('not a song')
+        if hdr[2] != VERSION:
+            raise ValueError('unsupported song version')
+        self.ticks = hdr[3]
+        self.bpm = hdr[4] | (hdr[5] << 8)
+        self.count = hdr[6] | (hdr[7] << 8)
+        self.rewind()
+
+    def rewind(self):
+        """Restart streaming at the first note."""
+        self._index = 0
+        if self._file is not None:
+            self._file.seek(self._offset + HEADER_SIZE)
+            self._pos = 0
+            self._end = 0
+        else:
+            self._pos = self._offset + HEADER_SIZE
+
+    def read(self):
+        """Return the next note packed as ``note << 8 | ticks``, or -1.
+
+        A packed small int avoids allocating a tuple per note.
+        """
+        if self._index >= self.count:
+            return -1
+        self._index += 1
+        if self._file is not None and self._pos >= self._end:
+            want = min(self.CHUNK, 2 * (self.count - self._index + 1))
+            got = self._file.readinto(memoryview(self._buf)[:want])
+            if not got or got < 2:
+                self._index = self.count
+                return -1
+            self._pos = 0
+            self._end = got
+        buf = self._buf
+        p = self._pos
+        self._pos = p + 2
+        return (buf[p] << 8) | buf[p + 1]
+
+    def __iter__(self):
+        self.rewind()
+        return self
+
+    def __next__(self):
+        v = self.read()
+        if v < 0:
+            raise StopIteration
+        return v >> 8, v & 0xFF
+
+    def duration_ms(self):
+        """Total song length in milliseconds (rewinds the reader)."""
+        total = 0
+        for _, ticks in self:
+            total += ticks
+        self.rewind()
+        return total * 60000 // (self.bpm * self.ticks)
+
+
+class SongBank:
+    """Look up named songs in a bank (``bytes`` or binary file)."""
+
+    def __init__(self, src):
+        self._src = src
+        self._index = {}
+        if hasattr(src, 'readinto'):
+            src.seek(0)
+            head = src.read(4)
+        else:
+            head = bytes(memoryview(src)[0:4])
+        if len(head) < 4 or head[0:2] != BANK_MAGIC:
+            raise ValueError('not a song bank')
+        if head[2] != VERSION:
+            raise ValueError('unsupported bank version')
+        pos = 4
+        for _ in range(head[3]):
+            if hasattr(src, 'readinto'):
+                ln = src.read(1)[0]
+                name = src.read(ln)
+                off = src.read(4)
+            else:
+                mv = memoryview(src)
+                ln = mv[pos]
+                name = bytes(mv[pos + 1:pos + 1 + ln])
+                off = mv[pos + 1 + ln:pos + 5 + ln]
+            pos += 5 + ln
+            self._index[name.decode()] = (off[0] | (off[1] << 8) |
+                                          (off[2] << 16) | (off[3] << 24))
+
+    def names(self):
+        return list(self._index)
+
+    def song(self, name):
+        """Return a SongReader for song `name` (KeyError if missing)."""
+        return SongReader(self._src, self._index[name])
+
+
+def build_bank(songs):
+    """Build a bank from ``[(name, song_bytes), ...]``."""
+    if len(songs) > 255:
+        raise ValueError('too many songs')
+    index = bytearray(BANK_MAGIC)
+    index.append(VERSION)
+    index.append(len(songs))
+    index_len = 4
+    for name, _ in songs:
+        index_len += 5 + len(name.encode())
+    off = index_len
+    for name, blob in songs:
+        raw = name.encode()
+        if len(raw) > 255:
+            raise ValueError('song name too long')
+        index.append(len(raw))
+        index.extend(raw)
+        for shift in (0, 8, 16, 24):
+            index.append((off >> shift) & 0xFF)
+        off += len(blob)
+    for _, blob in songs:
+        index.extend(blob)
+    return bytes(index)
+
+
+# --- decoding (host side / tests) ---
+def decode(src, offset=0):
+    """Return ``(ticks, bpm, [(note, ticks), ...])`` for a song."""
+    r = SongReader(src, offset)
+    return r.ticks, r.bpm, list(r)
+
+
+def to_mml(src, offset=0):
+    """Render a compiled song back to MML text.
+
+    Durations are written as tied power-of-two lengths at TEXT_TICKS per
+    beat. When the song's tick rate does not divide TEXT_TICKS, note ends
+    are rounded down and the remainder is carried to the next note, so
+    the song keeps its length to within one text tick. Raises ValueError
+    for a note that rounds to no text tick at all.
+    """
+    r = SongReader(src, offset)
+    lengths = (1, 2, 4, 8, 16, 32, 64)
+    parts = ['T{}'.format(r.bpm)]
+    octave = None
+    names = ('C', 'C+', 'D', 'D+', 'E', 'F', 'F+', 'G', 'G+', 'A', 'A+', 'B')
+    pos = 0  # song ticks so far
+    done = 0  # text ticks written so far
+    for note, ticks in r:
+        # MML text is always compiled at TEXT_TICKS per beat
+        pos += ticks
+        end = pos * TEXT_TICKS // r.ticks
+        ticks = end - done
+        done = end
+        if not ticks:
+            raise ValueError('note shorter than 1/{} beat'.format(TEXT_TICKS))
+        if note:
+            o = note // 12 - 1
+            if o != octave:
+                parts.append('O{}'.format(o))
+                octave = o
+            name = names[note % 12]
+        else:
+            name = 'R'
+        pieces = []
+        for ln in lengths:
+            size = TEXT_TICKS * 4 // ln
+            while ticks >= size:
+                pieces.append('{}{}'.format(name, ln))
+                ticks -= size
+        parts.append('&'.join(pieces))
+    return ' '.join(parts)
+
+if __name__ == '__main__':
+    # host side converter: compile RTTTL/MML text files into a song bank
+    import sys
+
+    args = sys.argv[1:]
+    if '-o' not in args or args.index('-o') + 1 >= len(args):
+        print('usage: python epySongBank.py -o out.bin song1.txt [song2.txt ...]')
+        sys.exit(2)
+    k = args.index('-o')
+    out_path = args[k + 1]
+    inputs = args[:k] + args[k + 2:]
+    songs = []
+    for path in inputs:
+        with open(path) as f:
+            text = f.read()
+        stem = path.replace('\\', '/').split('/')[-1].rsplit('.', 1)[0]
+        if text.count(':') == 2:
+            name, blob = compile_rtttl(text)
+            name = name or stem
+        else:
+            name, blob = stem, compile_mml(text)
+        songs.append((name, blob))
+        print('{}: {} notes, {} bytes'.format(name, (len(blob) - HEADER_SIZE) // 2,
+                                              len(blob)))
+    with open(out_path, 'wb') as f:
+        f.write(build_bank(songs))
+    print('wrote', out_path)
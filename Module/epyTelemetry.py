@@ -0,0 +1,274 @@
+"""Batched binary telemetry frames for the BLE UART.
+
+Samples and runtime stats are packed into CRC-checked frames in one
+preallocated buffer, and the buffer goes out in a single UART.write()
+once the next frame would not fit or `max_delay_ms` has passed. The
+buffer size is the write size, so pick it to suit the link (the RL62M
+BLE module on UART1 forwards whatever it gets at 115200 baud).
+
+Frame (little endian):
+	0xA5 type seq len payload[len] crc8
+crc8 is the HTU21D CRC (poly 0x31) over type, seq, len and payload; seq
+counts frames modulo 256 so the receiver can count lost ones.
+
+	SAMPLES (0x01): ts_ms u32, then per sample dt_ms u16, t i16, rh u16
+	STAT    (0x02): key u8, value i32
+
+Consecutive samples share one SAMPLES frame (up to 41 of them, while
+dt_ms fits), so a sample costs 6 bytes on the wire instead of a text
+line of about 20. Values are the fixed-point centi-units of htu21d and
+epySensorSampler.
+
+Usage (MicroPython):
+	from machine import UART
+	tel = Telemetry(UART(1, 115200), size=128)
+	tel.sample(sensor.temperature_centi, sensor.humidity_centi)
+	tel.stat(STAT_FREE, gc.mem_free())
+	tel.update()                # from the main loop: flushes when due
+
+FrameDecoder is the receiving side (PC or another board).
+"""
+
+import utime
+from htu21d import CRC8_TABLE
+
+SYNC = 0xA5
+SAMPLES = 0x01
+STAT = 0x02
+HEADER_SIZE = 4
+# SAMPLES payload: base timestamp + 6 bytes per sample, len is one byte
+SAMPLE_SIZE = 6
+MAX_SAMPLES = (255 - 4) // SAMPLE_SIZE
+# suggested STAT keys; any byte value may be used
+STAT_FREE = 1
+STAT_LOOP_US = 2
+STAT_ERRORS = 3
+
+
+def _put16(buf, p, v):
+    buf[p] = v & 0xFF
+    buf[p + 1] = (v >> 8) & 0xFF
+
+
+def _put32(buf, p, v):
+    buf[p] = v & 0xFF
+    buf[p + 1] = (v >> 8) & 0xFF
+    buf[p + 2] = (v >> 16) & 0xFF
+    buf[p + 3] = (v >> 24) & 0xFF
+
+
+def _crc(buf, start, end):
+    table = CRC8_TABLE
+    crc = 0
+    for i in range(start, end):
+        crc = table[crc ^ buf[i]]
+    return crc
+
+
+class Telemetry:
+    """Pack telemetry frames into a buffer and write it in bulk.
+
+    uart: anything with write(buf) (machine.UART)
+    size: buffer size = largest write; at least 16 bytes
+    max_delay_ms: longest a frame waits in the buffer (update())
+    """
+
+    def __init__(self, uart, size=128, max_delay_ms=1000):
+        if size < 16:
+            raise ValueError('size must be >= 16')
+        self.uart = uart
+        self.size = size
+        self.max_delay_ms = max_delay_ms
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._n = 0
+        self._open = -1  # start of the open SAMPLES frame
+        self._open_ts = 0
+        self._count = 0  # samples in the open frame
+        self._since = utime.ticks_ms()  # oldest unsent data
+        self.seq = 0
+        self.frames = 0
+        self.samples = 0
+        self.writes = 0
+        self.bytes_sent = 0
+        self.short_writes = 0
+        self.errors = 0
+
+    def _begin(self, ftype, payload, extra=0):
+        """Start a frame with room for `extra` more payload bytes; returns
+        the payload offset (flushes first if the buffer is full)."""
+        need = HEADER_SIZE + payload + extra + 1
+        if self._n + need > self.size:
+            self.flush()
+            if self._n + need > self.size:
+                # the link is stalled: drop what it did not take
+                self._n = 0
+                self.errors += 1
+        if not self._n:
+            self._since = utime.ticks_ms()
+        buf = self._buf
+        p = self._n
+        buf[p] = SYNC
+        buf[p + 1] = ftype
+        buf[p + 2] = self.seq
+        buf[p + 3] = payload
+        self.seq = (self.seq + 1) & 0xFF
+        self._n = p + HEADER_SIZE + payload
+        return p + HEADER_SIZE
+
+    def _end(self, start):
+        buf = self._buf
+        n = self._n
+        buf[n] = _crc(buf, start + 1, n)
+        self._n = n + 1
+        self.frames += 1
+
+    def _close(self):
+        if self._open >= 0:
+            self._buf[self._open + 3] = 4 + SAMPLE_SIZE * self._count
+            self._end(self._open)
+            self._open = -1
+
+    def sample(self, t_centi, rh_centi, ts=None):
+        """Add one temperature/humidity sample taken at ticks_ms() `ts`."""
+        if ts is None:
+            ts = utime.ticks_ms()
+        if self._open >= 0:
+            dt = utime.ticks_diff(ts, self._open_ts)
+            if not (0 <= dt < 0x10000 and self._count < MAX_SAMPLES and
+                    self._n + SAMPLE_SIZE + 1 <= self.size):
+                self._close()
+        if self._open < 0:
+            p = self._begin(SAMPLES, 4, SAMPLE_SIZE)
+            self._open = p - HEADER_SIZE
+            self._open_ts = ts
+            self._count = 0
+            _put32(self._buf, p, ts)
+            dt = 0
+        buf = self._buf
+        p = self._n
+        _put16(buf, p, dt)
+        _put16(buf, p + 2, t_centi)
+        _put16(buf, p + 4, rh_centi)
+        self._n = p + SAMPLE_SIZE
+        self._count += 1
+        self.samples += 1
+
+    def stat(self, key, value):
+        """Add a runtime statistic (key 0..255, value int32)."""
+        self._close()
+        p = self._begin(STAT, 5)
+        self._buf[p] = key
+        _put32(self._buf, p + 1, value)
+        self._end(p - HEADER_SIZE)
+
+    def pending(self):
+        """Bytes waiting in the buffer (the open frame without its CRC)."""
+        return self._n
+
+    def flush(self):
+        """Close the open frame and write the buffer in one call.
+
+        Returns the bytes written. A write cut short by the UART timeout
+        (None or fewer bytes) is counted in `short_writes` and the rest
+        stays buffered for the next flush, max_delay_ms later or when
+        the buffer fills.
+        """
+        self._close()
+        n = self._n
+        if not n:
+            return 0
+        try:
+            sent = self.uart.write(self._mv[0:n])
+        except OSError:
+            self._n = 0
+            self.errors += 1
+            return 0
+        if sent is None:
+            sent = 0
+        self.writes += 1
+        self.bytes_sent += sent
+        if sent < n:
+            self.short_writes += 1
+            self._buf[0:n - sent] = self._mv[sent:n]
+            self._since = utime.ticks_ms()
+        self._n = n - sent
+        return sent
+
+    def update(self):
+        """Flush if data has waited max_delay_ms; returns ms until due."""
+        if not self._n:
+            return self.max_delay_ms
+        wait = self.max_delay_ms - utime.ticks_diff(utime.ticks_ms(),
+                                                    self._since)
+        if wait <= 0:
+            self.flush()
+            return self.max_delay_ms
+        return wait
+
+
+def _s16(v):
+    return v - 0x10000 if v & 0x8000 else v
+
+
+class FrameDecoder:
+    """Incremental decoder for the frames of Telemetry.
+
+    feed() returns the records completed by the new bytes:
+    ('sample', seq, ts_ms, t_centi, rh_centi) and ('stat', seq, key,
+    value). Bad CRCs are counted in `crc_errors` and skipped by resyncing
+    on the next 0xA5; `lost` counts frames missing from the seq numbers.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._seq = -1
+        self.frames = 0
+        self.crc_errors = 0
+        self.lost = 0
+
+    def feed(self, data):
+        buf = self._buf
+        buf.extend(data)
+        out = []
+        i = 0
+        n = len(buf)
+        while True:
+            while i < n and buf[i] != SYNC:
+                i += 1
+            if n - i < HEADER_SIZE + 1:
+                break
+            length = buf[i + 3]
+            end = i + HEADER_SIZE + length
+            if end >= n:
+                break
+            if _crc(buf, i + 1, end) != buf[end]:
+                self.crc_errors += 1
+                i += 1
+                continue
+            self._frame(buf, i, length, out)
+            i = end + 1
+        del buf[:i]
+        return out
+
+    def _frame(self, buf, i, length, out):
+        ftype = buf[i + 1]
+        seq = buf[i + 2]
+        if self._seq >= 0:
+            self.lost += (seq - self._seq - 1) & 0xFF
+        self._seq = seq
+        self.frames += 1
+        p = i + HEADER_SIZE
+        if ftype == SAMPLES:
+            ts = buf[p] | buf[p + 1] << 8 | buf[p + 2] << 16 | buf[p + 3] << 24
+            for q in range(p + 4, p + length, SAMPLE_SIZE):
+                dt = buf[q] | buf[q + 1] << 8
+                out.append(('sample', seq, ts + dt,
+                            _s16(buf[q + 2] | buf[q + 3] << 8),
+                            buf[q + 4] | buf[q + 5] << 8))
+        elif ftype == STAT:
+            v = buf[p + 1] | buf[p + 2] << 8 | buf[p + 3] << 16 | \
+                buf[p + 4] << 24
+            if v & 0x80000000:
+                v -= 1 << 32
+            out.append(('stat', seq, buf[p], v))
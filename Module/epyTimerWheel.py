@@ -0,0 +1,257 @@
+"""Many periodic and one-shot jobs on one hardware Timer.
+
+A hashed timing wheel: the Timer interrupts every `tick_ms`, and each job
+sits in the slot of the tick it is due on, in a doubly linked list, so
+adding, cancelling and expiring a job are O(1) however many jobs exist
+(jobs due more than one wheel turn ahead carry a round counter).
+
+The interrupt handler only counts the tick and asks micropython.schedule
+to run the wheel, so callbacks run in normal VM context: they may
+allocate, use I2C, raise, or take longer than a tick. Ticks that pass
+before the wheel gets to run are caught up in order, and counted as
+overruns. Periodic jobs are rescheduled from their due tick, not from
+when they ran, so they do not drift; periods that are not a multiple of
+tick_ms keep their average rate with at most one tick of jitter.
+
+Usage (MicroPython):
+	from machine import Timer
+	from epyTimerWheel import TimerWheel
+	wheel = TimerWheel(Timer(1), tick_ms=10)
+	wheel.every(33, lambda _: leds.fill_if_due())
+	wheel.every(1000, sampler_step)
+	wheel.every(300, marquee.step)
+	job = wheel.after(5000, print, 'five seconds')
+	wheel.start()
+	...
+	print(wheel.stats())
+"""
+
+import utime
+
+try:
+    from micropython import schedule
+except ImportError:
+    schedule = None
+
+# tick counters wrap like ticks_ms()
+TICK_MASK = 0x3FFFFFFF
+
+
+class Job:
+    """A callback in a TimerWheel; created by after() and every().
+
+    runs: times the callback ran
+    late_max_us: worst delay between the due tick and the callback
+    """
+
+    def __init__(self, callback, arg=None, period_ms=0):
+        self.callback = callback
+        self.arg = arg
+        self.period_ms = period_ms
+        self.runs = 0
+        self.late_max_us = 0
+        self._slot = -1  # -1: not in the wheel, -2: about to run
+        self._rounds = 0
+        self._err = 0  # ms the due tick is after the exact due time
+        self._prev = None
+        self._next = None
+
+    def active(self):
+        return self._slot != -1
+
+
+class TimerWheel:
+    """Timing wheel driven by a machine.Timer (or by update() polling).
+
+    timer: machine.Timer used for the tick, or None to call update()
+    tick_ms: tick period; must divide 1000 (Timer freq is whole Hz)
+    slots: wheel size, a power of two; jobs due within slots * tick_ms
+           need no round counting
+    """
+
+    def __init__(self, timer=None, tick_ms=10, slots=64):
+        if 1000 % tick_ms:
+            raise ValueError('tick_ms must divide 1000')
+        if slots & (slots - 1):
+            raise ValueError('slots must be a power of two')
+        self.timer = timer
+        self.tick_ms = tick_ms
+        self.tick_us = tick_ms * 1000
+        self._slots = [None] * slots
+        self._mask = slots - 1
+        self._tick = 0  # last tick processed
+        self._irq_tick = 0  # last tick that happened
+        self._irq_us = utime.ticks_us()
+        self._t0 = utime.ticks_ms()  # update(): time of _irq_tick
+        self._scheduled = False
+        self.jobs = 0
+        # statistics
+        self.expired = 0
+        self.latency_max_us = 0
+        self.latency_total_us = 0
+        self.overruns = 0  # ticks that passed before the wheel ran
+        self.schedule_full = 0  # ticks whose schedule() was refused
+        self.errors = 0  # callbacks that raised
+        self.last_error = None
+        # bound once: the interrupt handler allocates nothing
+        self._run_ref = self._run
+        self._irq_ref = self._irq
+
+    # --- jobs ---
+    def after(self, delay_ms, callback, arg=None):
+        """Run callback(arg) once, `delay_ms` from now; returns the Job."""
+        job = Job(callback, arg)
+        self._start_job(job, delay_ms)
+        return job
+
+    def every(self, period_ms, callback, arg=None, delay_ms=None):
+        """Run callback(arg) every `period_ms` (first after `delay_ms`)."""
+        job = Job(callback, arg, period_ms)
+        self._start_job(job, period_ms if delay_ms is None else delay_ms)
+        return job
+
+    def cancel(self, job):
+        """Remove a job; cancelling an inactive job does nothing."""
+        if job._slot < 0:
+            job._slot = -1  # also stops a job due in the current tick
+            return
+        if job._prev is None:
+            self._slots[job._slot] = job._next
+        else:
+            job._prev._next = job._next
+        if job._next is not None:
+            job._next._prev = job._prev
+        job._prev = job._next = None
+        job._slot = -1
+        self.jobs -= 1
+
+    def _start_job(self, job, delay_ms):
+        tick = self.tick_ms
+        n = -(-delay_ms // tick)  # ceil
+        if n < 1:
+            n = 1
+        job._err = n * tick - delay_ms
+        self._insert(job, (self._irq_tick + n) & TICK_MASK)
+
+    def _insert(self, job, due):
+        self.cancel(job)
+        slot = due & self._mask
+        dist = (due - self._tick) & TICK_MASK  # ticks the wheel will turn
+        job._rounds = (dist - 1) // len(self._slots)
+        job._slot = slot
+        job._prev = None
+        head = self._slots[slot]
+        job._next = head
+        if head is not None:
+            head._prev = job
+        self._slots[slot] = job
+        self.jobs += 1
+
+    # --- tick source ---
+    def _irq(self, timer):
+        self._irq_tick = (self._irq_tick + 1) & TICK_MASK
+        self._irq_us = utime.ticks_us()
+        if schedule is None:
+            self._run(0)
+        elif not self._scheduled:
+            self._scheduled = True
+            try:
+                schedule(self._run_ref, 0)
+            except RuntimeError:
+                # queue full: the next tick tries again and catches up
+                self._scheduled = False
+                self.schedule_full += 1
+
+    def start(self):
+        """Tick from the hardware Timer."""
+        self._t0 = utime.ticks_ms()
+        self.timer.init(freq=1000 // self.tick_ms)
+        self.timer.callback(self._irq_ref)
+
+    def stop(self):
+        self.timer.callback(None)
+
+    def update(self):
+        """Polling driver without a Timer; returns ms until the next tick."""
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self._t0)
+        n = elapsed // self.tick_ms
+        if n > 0:
+            self._t0 = utime.ticks_add(self._t0, n * self.tick_ms)
+            self._irq_tick = (self._irq_tick + n) & TICK_MASK
+            self._irq_us = utime.ticks_add(
+                utime.ticks_us(), -(elapsed - n * self.tick_ms) * 1000)
+            self._run(0)
+        return self.tick_ms - (elapsed - n * self.tick_ms)
+
+    # --- wheel ---
+    def _run(self, _):
+        self._scheduled = False
+        backlog = (self._irq_tick - self._tick) & TICK_MASK
+        if backlog > 1:
+            self.overruns += backlog - 1
+        while self._tick != self._irq_tick:
+            tick = (self._tick + 1) & TICK_MASK
+            self._tick = tick
+            self._expire(tick)
+
+    def _expire(self, tick):
+        # unlink everything due first, so callbacks may add or cancel
+        # jobs in this slot while we run them
+        slot = tick & self._mask
+        job = self._slots[slot]
+        ready = None
+        while job is not None:
+            nxt = job._next
+            if job._rounds:
+                job._rounds -= 1
+            else:
+                self.cancel(job)
+                job._slot = -2
+                job._next = ready
+                ready = job
+            job = nxt
+        if ready is None:
+            return
+        due_us = utime.ticks_add(
+            self._irq_us,
+            -((self._irq_tick - tick) & TICK_MASK) * self.tick_us)
+        while ready is not None:
+            job = ready
+            ready = job._next
+            job._next = None
+            if job._slot != -2:
+                continue  # cancelled by an earlier callback of this tick
+            job._slot = -1
+            if job.period_ms:
+                # the next run counts from this due tick: no drift
+                period = job.period_ms - job._err
+                n = -(-period // self.tick_ms)
+                if n < 1:
+                    n = 1
+                job._err = n * self.tick_ms - period
+                self._insert(job, (tick + n) & TICK_MASK)
+            late = utime.ticks_diff(utime.ticks_us(), due_us)
+            if late > job.late_max_us:
+                job.late_max_us = late
+            if late > self.latency_max_us:
+                self.latency_max_us = late
+            self.latency_total_us += late
+            self.expired += 1
+            job.runs += 1
+            try:
+                job.callback(job.arg)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+
+    def stats(self):
+        n = self.expired
+        return {
+            'jobs': self.jobs,
+            'expired': n,
+            'latency_max_us': self.latency_max_us,
+            'latency_avg_us': self.latency_total_us // n if n else 0,
+            'overruns': self.overruns,
+            'schedule_full': self.schedule_full,
+            'errors': self.errors,
+        }
@@ -0,0 +1,231 @@
+"""Retained-mode widgets for the SSD1306 OLED.
+
+A Screen holds widgets that each own a box of the display. set() on a
+widget only marks it dirty when what it shows changes (for a Bar, the
+number of filled columns). Screen.update() clears and redraws just the
+dirty widgets and invalidates their boxes. Screen.show() then sends
+those regions with SSD1306.show_region() instead of the whole frame.
+After creation or invalidate() the frame is cleared, every widget is
+drawn and the next show() sends the full frame. Widgets must not
+overlap: a redraw clears the whole box.
+
+Widgets: Label (text), Number (fixed-point value, see
+epyDashboard.fixed), Bar (horizontal gauge) and Icon (one of a set of
+MONO_HLSB bitmaps). A widget's set() can be used directly as an
+epyDashboard Field sink.
+
+Usage (MicroPython):
+	from epyWidgets import Bar, Label, Number, Screen
+	scr = Screen(oled)
+	scr.add(Label(0, 0, 'Room'))
+	temp = scr.add(Number(0, 16, 'T {} C', 1, chars=10))
+	hum = scr.add(Bar(0, 30, 128, 8, 0, 100))
+	while True:
+		temp.set(sensor.temperature_centi // 10)
+		hum.set(sensor.humidity_centi // 100)
+		scr.refresh()           # redraws and sends only what changed
+		utime.sleep_ms(1000)
+"""
+
+import framebuf
+from epyDashboard import fixed
+
+
+class Widget:
+    """A box x, y, w, h of the screen, redrawn by draw() when dirty."""
+
+    def __init__(self, x, y, w, h):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.value = None
+        self.dirty = True
+
+    def set(self, value):
+        """Show `value`; returns True if the widget needs a redraw."""
+        if value == self.value:
+            return False
+        self.value = value
+        self.dirty = True
+        return True
+
+    def draw(self, fb):
+        """Draw into the cleared box (fb: the display or its framebuf)."""
+        pass
+
+
+class Label(Widget):
+    """Text in 8x8 cells; the box is `chars` cells wide (default: the
+    length of the initial text) and longer text is cut."""
+
+    def __init__(self, x, y, text='', chars=None):
+        super().__init__(x, y, 8 * (len(text) if chars is None else chars),
+                         8)
+        self.value = text
+
+    def draw(self, fb):
+        fb.text(self.value[:self.w // 8], self.x, self.y, 1)
+
+
+class Number(Widget):
+    """A fixed-point value formatted into `chars` 8x8 cells.
+
+    fmt: format string with one {} for the value
+    decimals: the value is in units of 10**-decimals
+    """
+
+    def __init__(self, x, y, fmt='{}', decimals=0, chars=8):
+        super().__init__(x, y, 8 * chars, 8)
+        self.fmt = fmt
+        self.decimals = decimals
+
+    def draw(self, fb):
+        if self.value is not None:
+            s = self.fmt.format(fixed(self.value, self.decimals))
+            fb.text(s[:self.w // 8], self.x, self.y, 1)
+
+
+class Bar(Widget):
+    """Horizontal gauge from `lo` to `hi` with a 1 pixel frame."""
+
+    def __init__(self, x, y, w, h, lo=0, hi=100):
+        if hi <= lo:
+            raise ValueError('hi must be greater than lo')
+        super().__init__(x, y, w, h)
+        self.lo = lo
+        self.hi = hi
+        self.filled = -1  # columns inside the frame
+
+    def set(self, value):
+        span = self.w - 2
+        n = (value - self.lo) * span // (self.hi - self.lo)
+        n = 0 if n < 0 else span if n > span else n
+        if n == self.filled:
+            self.value = value
+            return False
+        self.filled = n
+        self.value = value
+        self.dirty = True
+        return True
+
+    def draw(self, fb):
+        fb.rect(self.x, self.y, self.w, self.h, 1)
+        if self.filled > 0:
+            fb.fill_rect(self.x + 1, self.y + 1, self.filled, self.h - 2, 1)
+
+
+class Icon(Widget):
+    """One of several w x h bitmaps; set() takes the index.
+
+    images: bytes per image, MONO_HLSB rows (each row (w + 7) // 8 bytes);
+            they are wrapped in FrameBuffers once, here
+    """
+
+    def __init__(self, x, y, w, h, images, index=0):
+        super().__init__(x, y, w, h)
+        self.images = [framebuf.FrameBuffer(bytearray(img), w, h,
+                                            framebuf.MONO_HLSB)
+                       for img in images]
+        self.value = index
+
+    def draw(self, fb):
+        # the box is cleared: off pixels can be the transparent key
+        fb.blit(self.images[self.value], self.x, self.y, 0)
+
+
+class Screen:
+    """Widgets of one SSD1306 and the regions still to be sent.
+
+    max_regions: dirty boxes kept apart; beyond that they are merged into
+                 their bounding box
+    """
+
+    def __init__(self, oled, max_regions=4):
+        self.oled = oled
+        self.max_regions = max_regions
+        self.widgets = []
+        self._regions = []  # [x0, y0, x1, y1], exclusive ends
+        self._full = True
+        self._clear = True
+        self.redraws = 0
+        self.bytes_sent = 0
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        return widget
+
+    def invalidate(self):
+        """Clear the frame, redraw every widget and send the whole frame
+        next time."""
+        for w in self.widgets:
+            w.dirty = True
+        self._full = True
+        self._clear = True
+        del self._regions[:]
+
+    def update(self):
+        """Redraw the dirty widgets; returns how many were drawn."""
+        oled = self.oled
+        if self._clear:
+            self._clear = False
+            oled.fill(0)
+        n = 0
+        for w in self.widgets:
+            if w.dirty:
+                oled.fill_rect(w.x, w.y, w.w, w.h, 0)
+                w.draw(oled)
+                w.dirty = False
+                n += 1
+                if not self._full:
+                    self._mark(w.x, w.y, w.x + w.w, w.y + w.h)
+        self.redraws += n
+        return n
+
+    def _mark(self, x0, y0, x1, y1):
+        regions = self._regions
+        # show_region() sends whole pages: boxes sharing a page and
+        # touching columns are one region. The grown box can reach
+        # another region, so merge until none touches it: no page is
+        # sent twice.
+        i = 0
+        while i < len(regions):
+            r = regions[i]
+            if x0 <= r[2] and r[0] <= x1 and y0 // 8 <= (r[3] - 1) // 8 and \
+                    r[1] // 8 <= (y1 - 1) // 8:
+                x0 = min(x0, r[0])
+                y0 = min(y0, r[1])
+                x1 = max(x1, r[2])
+                y1 = max(y1, r[3])
+                del regions[i]
+                i = 0
+            else:
+                i += 1
+        if len(regions) >= self.max_regions:
+            for r in regions:
+                x0 = min(x0, r[0])
+                y0 = min(y0, r[1])
+                x1 = max(x1, r[2])
+                y1 = max(y1, r[3])
+            del regions[:]
+        regions.append([x0, y0, x1, y1])
+
+    def show(self):
+        """Send the invalidated regions; returns the data bytes sent."""
+        oled = self.oled
+        if self._full:
+            self._full = False
+            oled.show()
+            n = oled.width * oled.pages
+        else:
+            n = 0
+            for x0, y0, x1, y1 in self._regions:
+                n += oled.show_region(x0, y0, x1 - x0, y1 - y0)
+            del self._regions[:]
+        self.bytes_sent += n
+        return n
+
+    def refresh(self):
+        """update() and show(); returns the data bytes sent."""
+        self.update()
+        return self.show()
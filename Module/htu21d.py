@@ -10,6 +10,12 @@ Main improvements:
 - exceptions on CRC failure with optional retries
 - helper methods: reset(), read_user_register(), write_user_register()
 - small docstrings and default address parameter
+- no-hold measurements: the sensor never clock-stretches the shared bus,
+  and update() runs a non-blocking temperature + humidity cycle
+- set_resolution(): trade precision for speed (8/12 bit converts in
+  16 ms instead of 66 ms); waits always match the selected resolution
+- integer paths: centi-unit conversions, compensated RH, dew point and
+  heat index in fixed point, off the soft-float path
 
 Usage (MicroPython):
 	from machine import I2C
@@ -18,9 +24,165 @@ Usage (MicroPython):
 	sensor = HTU21D(i2c)
 	t = sensor.read_temperature()
 	h = sensor.read_humidity()
+
+Non-blocking usage (main loop keeps running while the sensor converts):
+	while True:
+		if sensor.update():
+			print(sensor.temperature, sensor.humidity)
+		do_other_work()
 """
 
 import utime as time
+from epyI2CBus import as_bus
+
+# max conversion times in ms from the datasheet, indexed by the resolution
+# bits of the user register (bit 7 << 1 | bit 0): (RH ms, T ms)
+#   0: RH 12 bit / T 14 bit   1: RH 8 bit / T 12 bit
+#   2: RH 10 bit / T 13 bit   3: RH 11 bit / T 11 bit
+CONVERSION_MS = ((16, 50), (3, 13), (5, 25), (8, 7))
+# (RH bits, T bits) for the same index
+RESOLUTIONS = ((12, 14), (8, 12), (10, 13), (11, 11))
+# errno.ETIMEDOUT, raised when the sensor never answers a conversion
+ETIMEDOUT = 110
+
+
+# CRC8 polynomial 0x31 (x^8 + x^5 + x^4 + 1), one entry per byte value.
+# A literal rather than computed at import (2048 shift steps at boot);
+# frozen into flash it costs no heap at all.
+CRC8_TABLE = (
+    b'\x00\x31\x62\x53\xc4\xf5\xa6\x97\xb9\x88\xdb\xea\x7d\x4c\x1f\x2e'
+    b'\x43\x72\x21\x10\x87\xb6\xe5\xd4\xfa\xcb\x98\xa9\x3e\x0f\x5c\x6d'
+    b'\x86\xb7\xe4\xd5\x42\x73\x20\x11\x3f\x0e\x5d\x6c\xfb\xca\x99\xa8'
+    b'\xc5\xf4\xa7\x96\x01\x30\x63\x52\x7c\x4d\x1e\x2f\xb8\x89\xda\xeb'
+    b'\x3d\x0c\x5f\x6e\xf9\xc8\x9b\xaa\x84\xb5\xe6\xd7\x40\x71\x22\x13'
+    b'\x7e\x4f\x1c\x2d\xba\x8b\xd8\xe9\xc7\xf6\xa5\x94\x03\x32\x61\x50'
+    b'\xbb\x8a\xd9\xe8\x7f\x4e\x1d\x2c\x02\x33\x60\x51\xc6\xf7\xa4\x95'
+    b'\xf8\xc9\x9a\xab\x3c\x0d\x5e\x6f\x41\x70\x23\x12\x85\xb4\xe7\xd6'
+    b'\x7a\x4b\x18\x29\xbe\x8f\xdc\xed\xc3\xf2\xa1\x90\x07\x36\x65\x54'
+    b'\x39\x08\x5b\x6a\xfd\xcc\x9f\xae\x80\xb1\xe2\xd3\x44\x75\x26\x17'
+    b'\xfc\xcd\x9e\xaf\x38\x09\x5a\x6b\x45\x74\x27\x16\x81\xb0\xe3\xd2'
+    b'\xbf\x8e\xdd\xec\x7b\x4a\x19\x28\x06\x37\x64\x55\xc2\xf3\xa0\x91'
+    b'\x47\x76\x25\x14\x83\xb2\xe1\xd0\xfe\xcf\x9c\xad\x3a\x0b\x58\x69'
+    b'\x04\x35\x66\x57\xc0\xf1\xa2\x93\xbd\x8c\xdf\xee\x79\x48\x1b\x2a'
+    b'\xc1\xf0\xa3\x92\x05\x34\x67\x56\x78\x49\x1a\x2b\xbc\x8d\xde\xef'
+    b'\x82\xb3\xe0\xd1\x46\x77\x24\x15\x3b\x0a\x59\x68\xff\xce\x9d\xac')
+
+
+def crc8(data, n=None):
+    """Return the HTU21D CRC8 (poly 0x31, init 0) of the first n bytes."""
+    table = CRC8_TABLE
+    crc = 0
+    for i in range(len(data) if n is None else n):
+        crc = table[crc ^ data[i]]
+    return crc
+
+
+# --- integer conversions ---
+# Values are fixed-point centi-units (2345 == 23.45 degC / %RH). Every
+# intermediate stays below 2**30, so on MicroPython these are small-int
+# operations that never touch the soft-float or long-int paths.
+
+def temperature_centi(raw):
+    """Temperature in 0.01 degC from a raw 16-bit reading."""
+    # -46.85 + 175.72 * raw / 65536, on raw >> 2 to keep products small
+    return -4685 + ((17572 * ((raw & 0xFFFC) >> 2) + 8192) >> 14)
+
+
+def humidity_centi(raw):
+    """Relative humidity in 0.01 %RH from a raw 16-bit reading."""
+    return -600 + ((12500 * ((raw & 0xFFFC) >> 2) + 8192) >> 14)
+
+
+def compensated_humidity_centi(rh_c, t_c):
+    """Temperature-compensated RH (datasheet: -0.15 %RH/degC from 25 degC),
+    clamped to 0..100 %."""
+    rh = rh_c + ((t_c - 2500) * 3 + 10) // 20
+    return 0 if rh < 0 else 10000 if rh > 10000 else rh
+
+
+# ln(1 + i/32) in Q12 for i = 0..32
+_LN_TABLE = (0, 126, 248, 367, 482, 595, 704, 810, 914, 1015, 1114, 1210,
+             1304, 1396, 1486, 1575, 1661, 1745, 1828, 1909, 1989, 2067,
+             2143, 2218, 2292, 2365, 2436, 2506, 2575, 2642, 2709, 2775,
+             2839)
+_LN2_Q12 = 2839
+
+
+def _ln_q12(x):
+    """Natural log of an integer x >= 1 in Q12 (error < 0.001)."""
+    # normalise x to m in [2**16, 2**17): ln x = ln(m / 2**16) + k ln 2
+    k = 16
+    while x < 0x10000:
+        x <<= 1
+        k -= 1
+    while x >= 0x20000:
+        x >>= 1
+        k += 1
+    x -= 0x10000
+    i = x >> 11
+    frac = x & 0x7FF
+    lo = _LN_TABLE[i]
+    return k * _LN2_Q12 + lo + (((_LN_TABLE[i + 1] - lo) * frac) >> 11)
+
+
+def dew_point_centi(t_c, rh_c):
+    """Dew point in 0.01 degC (Magnus formula, A=17.62, B=243.12 degC)."""
+    if rh_c < 1:
+        rh_c = 1
+    # gamma = ln(RH / 100 %) + A * T / (B + T), in Q12
+    gamma = _ln_q12(rh_c) - 37726 + (72172 * t_c) // (24312 + t_c)
+    # Td = B * gamma / (A - gamma)
+    return 24312 * gamma // (72172 - gamma)
+
+
+def _isqrt(n):
+    """Integer square root (floor) for n >= 0."""
+    if n < 2:
+        return n
+    x = n
+    y = (x + 1) >> 1
+    while y < x:
+        x = y
+        y = (x + n // x) >> 1
+    return x
+
+
+def heat_index_centi(t_c, rh_c):
+    """Heat index in 0.01 degC (NWS algorithm: Steadman's simple formula,
+    Rothfusz regression with its low/high humidity adjustments).
+
+    Evaluated in binary fixed point: degF and %RH in Q6, the regression
+    re-centred on 100 degF (u = T - 100) so its terms stay small.
+    Temperatures above 150 degF (65.5 degC) are clamped, where a heat
+    index has no meaning anyway.
+    """
+    tq = (t_c * 144 + 62) // 125 + 2048  # degF * 64
+    if tq > 9600:
+        tq = 9600
+    rq = (rh_c * 16 + 12) // 25  # %RH * 64
+    if rq < 0:
+        rq = 0
+    elif rq > 6400:
+        rq = 6400
+    # simple formula 0.5 * (T + 61 + (T - 68) * 1.2 + RH * 0.094), Q8
+    hi = (tq + 3904 + (tq - 4352) * 6 // 5 + rq * 94 // 1000) * 2
+    if hi + tq * 4 >= 160 * 256:
+        # HI = A(u) + RH * (B(u) + RH * C(u)), quadratics in u
+        uq = tq - 6400
+        u2 = (uq * uq) >> 8  # u^2 in Q4
+        a = 24101 + ((44659 * uq) >> 14) + ((-7170 * u2) >> 16)  # Q8
+        b = -2937 + ((22012 * uq) >> 10) + ((20615 * u2) >> 12)  # Q16
+        c = 2835963 + ((122089 * uq) >> 6) + ((-2137 * u2) >> 6)  # Q28
+        inner = b + (((c >> 8) * rq) >> 10)  # Q16
+        hi = a + (((inner >> 3) * rq) >> 11)  # Q8
+        if rq < 832 and 5120 <= tq <= 7168:
+            # dry: - (13 - RH) / 4 * sqrt((17 - |T - 95|) / 17)
+            s = ((1088 - abs(tq - 6080)) << 16) // 1088
+            hi -= ((832 - rq) * _isqrt(s)) >> 8
+        elif rq > 5440 and 5120 <= tq <= 5568:
+            # humid: + (RH - 85) / 10 * (87 - T) / 5
+            hi += (rq - 5440) * (5568 - tq) // 800
+    return (hi - 8192) * 125 // 576
 
 
 def sleep_ms(ms):
@@ -50,57 +212,262 @@ class HTU21D:
     READ_USER_REG = 0xE7
     SOFT_RESET = 0xFE
 
-    def __init__(self, i2c, address=DEFAULT_ADDRESS, *, retries=2, delay_ms=50):
+    # measurement states of the non-blocking state machine
+    IDLE = 0
+    MEASURE_TEMP = 1
+    MEASURE_HUMD = 2
+
+    def __init__(self, i2c, address=DEFAULT_ADDRESS, *, retries=2, delay_ms=50,
+                 resolution=None):
         """Create HTU21D instance.
 
-        i2c: an initialized machine.I2C instance
+        i2c: an initialized machine.I2C instance or a shared I2CBus
         address: device address (default 0x40)
         retries: number of retries on CRC failure
         delay_ms: delay between retries in milliseconds
+        resolution: optional (rh_bits, t_bits) pair passed to
+                    set_resolution()
         """
         self.i2c = i2c
+        self.bus = as_bus(i2c)
         self.address = address
         self.retries = int(retries)
         self.delay_ms = int(delay_ms)
+        # resolution bits of the user register (0 after power-up/reset)
+        self._res = 0
+        # non-blocking measurement state
+        self.state = self.IDLE
+        self._due = 0
+        self._started = 0
+        self._command = self.TRIGGER_TEMP_MEASURE_NOHOLD
+        self._attempt = 0
+        # latest update() pair in centi-units (None until measured)
+        self.temperature_centi = None
+        self.humidity_centi = None
+        # preallocated transfer buffers: reads fill _buf in place and
+        # commands are written from _cmd, so a reading allocates nothing
+        self._buf = bytearray(3)
+        self._buf1 = memoryview(self._buf)[:1]
+        self._cmd = bytearray(2)
+        self._cmd1 = memoryview(self._cmd)[:1]
+        if resolution is not None:
+            self.set_resolution(*resolution)
 
     # --- low level helpers ---
     def reset(self):
         """Soft reset the sensor."""
         try:
-            self.i2c.writeto(self.address, bytes([self.SOFT_RESET]))
+            self._cmd[0] = self.SOFT_RESET
+            self.bus.write(self.address, self._cmd1)
             # datasheet: typically < 15 ms
             sleep_ms(20)
         except Exception:
             # be tolerant on write errors (bus busy)
             sleep_ms(20)
+        self._res = 0
+        self.state = self.IDLE
 
     def read_user_register(self):
         """Return the user register as int."""
-        data = self.i2c.mem_read(1, self.address, self.READ_USER_REG)
-        return int(data[0])
+        self.bus.read_mem_into(self.address, self.READ_USER_REG, self._buf1)
+        value = self._buf[0]
+        self._res = ((value >> 6) & 0x02) | (value & 0x01)
+        return value
 
     def write_user_register(self, value):
         """Write one byte to user register."""
-        self.i2c.writeto(self.address, bytes(
-            [self.WRITE_USER_REG, value & 0xFF]))
+        self._cmd[0] = self.WRITE_USER_REG
+        self._cmd[1] = value & 0xFF
+        self.bus.write(self.address, self._cmd)
+        self._res = ((value >> 6) & 0x02) | (value & 0x01)
+
+    def set_resolution(self, rh_bits=12, t_bits=14):
+        """Select the measurement resolution.
+
+        Valid (rh_bits, t_bits) pairs: (12, 14) default, (8, 12), (10, 13)
+        and (11, 11). Other user register bits (heater, OTP reload) are
+        preserved. Raises ValueError for an unsupported pair.
+        """
+        pair = (rh_bits, t_bits)
+        if pair not in RESOLUTIONS:
+            raise ValueError("unsupported HTU21D resolution {}".format(pair))
+        res = RESOLUTIONS.index(pair)
+        value = self.read_user_register() & 0x7E
+        value |= ((res & 0x02) << 6) | (res & 0x01)
+        self.write_user_register(value)
+
+    def resolution(self):
+        """Return the current (rh_bits, t_bits) pair."""
+        return RESOLUTIONS[self._res]
+
+    def measurement_ms(self):
+        """Max time of a temperature + humidity pair at this resolution."""
+        times = CONVERSION_MS[self._res]
+        return times[0] + times[1]
+
+    def conversion_ms(self, command):
+        """Max conversion time in ms for a trigger command at the current
+        resolution."""
+        times = CONVERSION_MS[self._res]
+        if command == self.TRIGGER_HUMD_MEASURE_NOHOLD:
+            return times[0]
+        return times[1]
+
+    # --- no-hold measurement primitives ---
+    def start(self, command):
+        """Trigger a no-hold conversion and return immediately.
+
+        command: TRIGGER_TEMP_MEASURE_NOHOLD or TRIGGER_HUMD_MEASURE_NOHOLD
+        The bus is free while the sensor converts; call fetch() once
+        ready() is true.
+        """
+        self._cmd[0] = command
+        self.bus.write(self.address, self._cmd1)
+        self._command = command
+        self._started = time.ticks_ms()
+        self._due = time.ticks_add(self._started,
+                                   self.conversion_ms(command))
+
+    def ready(self):
+        """True when the started conversion should be finished."""
+        return time.ticks_diff(time.ticks_ms(), self._due) >= 0
+
+    def time_until_ready(self):
+        """ms until the started conversion is due (0 if already due)."""
+        wait = time.ticks_diff(self._due, time.ticks_ms())
+        return wait if wait > 0 else 0
+
+    def fetch(self):
+        """Read the result of the started conversion.
+
+        Returns the 16-bit raw value, or None if the sensor NACKed because
+        the conversion is still running. Raises ValueError on CRC failure.
+        """
+        buf = self._buf
+        try:
+            self.bus.readinto(self.address, buf)
+        except OSError:
+            return None
+        if not self._check_crc(buf):
+            raise ValueError("HTU21D CRC check failed")
+        return (buf[0] << 8) | buf[1]
+
+    def _measure(self, command):
+        """Blocking no-hold measurement with retries; returns raw, or None
+        if the last attempt failed the CRC check. Raises
+        OSError(ETIMEDOUT) if the last attempt was never answered."""
+        conv = self.conversion_ms(command)
+        timed_out = False
+        for attempt in range(self.retries + 1):
+            self.start(command)
+            sleep_ms(conv)
+            try:
+                raw = self.fetch()
+                # still converting (slow part): poll for up to another
+                # conversion time
+                for _ in range(conv):
+                    if raw is not None:
+                        break
+                    sleep_ms(1)
+                    raw = self.fetch()
+                if raw is not None:
+                    return raw
+                timed_out = True
+            except ValueError:
+                timed_out = False
+            if attempt < self.retries:
+                sleep_ms(self.delay_ms)
+        if timed_out:
+            raise OSError(ETIMEDOUT)
+        return None
+
+    def _failed(self):
+        """Count a failed update() attempt. Returns True once `retries`
+        are used up (the cycle is back to IDLE), else starts the same
+        conversion again."""
+        self._attempt += 1
+        if self._attempt > self.retries:
+            self.state = self.IDLE
+            return True
+        self.start(self._command)
+        return False
+
+    def update(self):
+        """Advance the non-blocking temperature + humidity cycle.
+
+        Call it as often as convenient; it never waits. Returns True when
+        a new pair is available in `temperature`/`humidity`. Humidity is
+        triggered right after the temperature result is collected, so the
+        pair costs two short writes and two 3-byte reads on the bus.
+        Raises ValueError after `retries` consecutive CRC failures and
+        OSError(ETIMEDOUT) after as many conversions the sensor NACKed
+        for twice their conversion time (e.g. a missing sensor).
+        """
+        state = self.state
+        if state == self.IDLE:
+            self._attempt = 0
+            self.start(self.TRIGGER_TEMP_MEASURE_NOHOLD)
+            self.state = self.MEASURE_TEMP
+            return False
+        if not self.ready():
+            return False
+        try:
+            raw = self.fetch()
+        except ValueError:
+            if self._failed():
+                raise
+            return False
+        if raw is None:
+            now = time.ticks_ms()
+            if time.ticks_diff(now, self._started) < \
+                    2 * self.conversion_ms(self._command):
+                # NACKed although due: poll again in 1 ms, not in a busy
+                # loop, for up to another conversion time
+                self._due = time.ticks_add(now, 1)
+                return False
+            if self._failed():
+                raise OSError(ETIMEDOUT)
+            return False
+        self._attempt = 0
+        if state == self.MEASURE_TEMP:
+            self.temperature_centi = temperature_centi(raw)
+            self.start(self.TRIGGER_HUMD_MEASURE_NOHOLD)
+            self.state = self.MEASURE_HUMD
+            return False
+        self.humidity_centi = humidity_centi(raw)
+        self.state = self.IDLE
+        return True
+
+    @property
+    def temperature(self):
+        """Latest update() temperature in degC as float (or None)."""
+        t = self.temperature_centi
+        return None if t is None else t / 100
+
+    @property
+    def humidity(self):
+        """Latest update() relative humidity in % as float (or None)."""
+        h = self.humidity_centi
+        return None if h is None else h / 100
+
+    def dew_point_centi(self):
+        """Dew point of the latest update() pair in 0.01 degC."""
+        return dew_point_centi(self.temperature_centi, self.humidity_centi)
+
+    def heat_index_centi(self):
+        """Heat index of the latest update() pair in 0.01 degC."""
+        return heat_index_centi(self.temperature_centi, self.humidity_centi)
 
     # --- CRC and parsing ---
     def _check_crc(self, raw):
         """Check CRC8 for three-byte result (msb, lsb, crc).
 
-        Uses polynomial 0x31 (x^8 + x^5 + x^4 + 1) as in datasheet.
+        Uses polynomial 0x31 (x^8 + x^5 + x^4 + 1) as in datasheet, via the
+        precomputed CRC8_TABLE (two lookups, no loop or slice).
         """
         # raw expected to be a bytes-like object of length >=3
-        POLY = 0x131  # 0x31 shifted for 8-bit algorithm implementation
-        crc = 0
-        for byte in raw[0:2]:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = ((crc << 1) ^ POLY) & 0xFF
-                else:
-                    crc = (crc << 1) & 0xFF
-        return crc == (raw[2] & 0xFF)
+        table = CRC8_TABLE
+        return table[table[raw[0]] ^ raw[1]] == raw[2]
 
     def _raw_to_temperature(self, msb, lsb):
         raw = ((msb << 8) | lsb) & 0xFFFC
@@ -114,30 +481,40 @@ class HTU21D:
     def read_temperature(self):
         """Read temperature in Celsius and return float.
 
-        Raises ValueError on repeated CRC failures.
+        Uses the no-hold command, so the bus stays free during conversion.
+        Raises ValueError on repeated CRC failures and OSError if the
+        sensor does not answer.
         """
-        for attempt in range(self.retries + 1):
-            data = self.i2c.mem_read(
-                3, self.address, self.TRIGGER_TEMP_MEASURE_HOLD)
-            if self._check_crc(data):
-                return self._raw_to_temperature(data[0], data[1])
-            if attempt < self.retries:
-                sleep_ms(self.delay_ms)
-        raise ValueError("HTU21D CRC check failed for temperature")
+        raw = self._measure(self.TRIGGER_TEMP_MEASURE_NOHOLD)
+        if raw is None:
+            raise ValueError("HTU21D CRC check failed for temperature")
+        return self._raw_to_temperature(raw >> 8, raw & 0xFF)
 
     def read_humidity(self):
         """Read relative humidity (0-100 %) and return float.
 
-        Raises ValueError on repeated CRC failures.
+        Uses the no-hold command, so the bus stays free during conversion.
+        Raises ValueError on repeated CRC failures and OSError if the
+        sensor does not answer.
         """
-        for attempt in range(self.retries + 1):
-            data = self.i2c.mem_read(
-                3, self.address, self.TRIGGER_HUMD_MEASURE_HOLD)
-            if self._check_crc(data):
-                return self._raw_to_humidity(data[0], data[1])
-            if attempt < self.retries:
-                sleep_ms(self.delay_ms)
-        raise ValueError("HTU21D CRC check failed for humidity")
+        raw = self._measure(self.TRIGGER_HUMD_MEASURE_NOHOLD)
+        if raw is None:
+            raise ValueError("HTU21D CRC check failed for humidity")
+        return self._raw_to_humidity(raw >> 8, raw & 0xFF)
+
+    def read_temperature_centi(self):
+        """Read temperature as an int in 0.01 degC (no float math)."""
+        raw = self._measure(self.TRIGGER_TEMP_MEASURE_NOHOLD)
+        if raw is None:
+            raise ValueError("HTU21D CRC check failed for temperature")
+        return temperature_centi(raw)
+
+    def read_humidity_centi(self):
+        """Read relative humidity as an int in 0.01 %RH (no float math)."""
+        raw = self._measure(self.TRIGGER_HUMD_MEASURE_NOHOLD)
+        if raw is None:
+            raise ValueError("HTU21D CRC check failed for humidity")
+        return humidity_centi(raw)
 
     # --- backward compatibility wrappers ---
     def readTemperatureData(self):
@@ -2,6 +2,7 @@
 from micropython import const
 import utime
 import framebuf
+from epyI2CBus import I2CBus, as_bus
 
 # register definitions
 SET_CONTRAST = const(0x81)
@@ -29,6 +30,8 @@ class SSD1306:
         self.height = height
         self.external_vcc = external_vcc
         self.pages = self.height // 8
+        # column/page address commands of show(), updated in place
+        self._addr_cmds = bytearray(6)
         # Note the subclass must initialize self.framebuf to a framebuffer.
         # This is necessary because the underlying data buffer is different
         # between I2C and SPI implementations (I2C needs an extra byte).
@@ -36,7 +39,7 @@ class SSD1306:
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        self.write_cmds((
             SET_DISP | 0x00,  # off
             # address setting
             SET_MEM_ADDR, 0x00,  # horizontal
@@ -57,11 +60,14 @@ class SSD1306:
             SET_NORM_INV,  # not inverted
             # charge pump
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
-                SET_DISP | 0x01):  # on
-            self.write_cmd(cmd)
+            SET_DISP | 0x01))  # on
         self.fill(0)
         self.show()
 
+    def write_cmds(self, cmds):
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
     def poweroff(self):
         self.write_cmd(SET_DISP | 0x00)
 
@@ -72,21 +78,42 @@ class SSD1306:
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
+    def _set_window(self, x0, x1, p0, p1):
         if self.width == 64:
             # displays with width of 64 pixels are shifted by 32
             x0 += 32
             x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
+        cmds = self._addr_cmds
+        cmds[0] = SET_COL_ADDR
+        cmds[1] = x0
+        cmds[2] = x1
+        cmds[3] = SET_PAGE_ADDR
+        cmds[4] = p0
+        cmds[5] = p1
+        self.write_cmds(cmds)
+
+    def show(self):
+        self._set_window(0, self.width - 1, 0, self.pages - 1)
         self.write_framebuf()
 
+    def show_region(self, x, y, w, h):
+        """Send only the pages/columns covering the rectangle x, y, w, h.
+
+        Rows are sent in whole 8-pixel pages, one data transfer per page.
+        Returns the number of data bytes sent (0 if clipped away).
+        """
+        x0 = max(0, x)
+        x1 = min(self.width, x + w) - 1
+        p0 = max(0, y) // 8
+        p1 = (min(self.height, y + h) - 1) // 8
+        if x1 < x0 or p1 < p0:
+            return 0
+        self._set_window(x0, x1, p0, p1)
+        n = x1 - x0 + 1
+        for page in range(p0, p1 + 1):
+            self.write_data(page * self.width + x0, n)
+        return n * (p1 - p0 + 1)
+
     def fill(self, col):
         self.framebuf.fill(col)
 
@@ -114,9 +141,14 @@ class SSD1306:
 
 class SSD1306_I2C(SSD1306):
     def __init__(self, width, height, i2c, addr=0x3c, external_vcc=False):
+        # i2c: ePy/machine I2C object or a shared epyI2CBus.I2CBus
         self.i2c = i2c
+        self.bus = as_bus(i2c)
         self.addr = addr
-        self.temp = bytearray(2)
+        # command bytes after a 0x00 control byte (Co=0, D/C#=0) go out
+        # in one transaction; single commands use it too instead of a
+        # separate 2-byte buffer
+        self._batch = self.bus.batch(addr, control=0x00)
         # Add an extra byte to the data buffer to hold an I2C data/command byte
         # to use hardware-compatible I2C transactions.  A memoryview of the
         # buffer is used to mask this byte from the framebuffer operations
@@ -124,19 +156,37 @@ class SSD1306_I2C(SSD1306):
         # buffer).
         self.buffer = bytearray(((height // 8) * width) + 1)
         self.buffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
-        self.framebuf = framebuf.FrameBuffer1(
-            memoryview(self.buffer)[1:], width, height)
+        self._mv = memoryview(self.buffer)
+        self.framebuf = framebuf.FrameBuffer1(self._mv[1:], width, height)
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
-        self.temp[0] = 0x80  # Co=1, D/C#=0
-        self.temp[1] = cmd
-        self.i2c.send(self.temp, self.addr)
+        batch = self._batch
+        batch.add(cmd)
+        batch.flush()
+
+    def write_cmds(self, cmds):
+        batch = self._batch
+        for cmd in cmds:
+            batch.add(cmd)
+        batch.flush()
 
     def write_framebuf(self):
         # Blast out the frame buffer using a single I2C transaction to support
         # hardware I2C interfaces.
-        self.i2c.send(self.buffer, self.addr)
+        self.bus.write(self.addr, self.buffer)
+
+    def write_data(self, start, n):
+        # framebuffer bytes start..start+n-1 sit at buffer[start + 1..];
+        # the byte in front of them briefly holds the data control byte,
+        # so a partial update is one transaction without a copy
+        buf = self.buffer
+        saved = buf[start]
+        buf[start] = 0x40
+        try:
+            self.bus.write(self.addr, self._mv[start:start + n + 1])
+        finally:
+            buf[start] = saved
 
     def poweron(self):
         pass
@@ -153,6 +203,7 @@ class SSD1306_SPI(SSD1306):
         self.res = res
         self.cs = cs
         self.buffer = bytearray((height // 8) * width)
+        self._mv = memoryview(self.buffer)
         self.framebuf = framebuf.FrameBuffer1(self.buffer, width, height)
         super().__init__(width, height, external_vcc)
 
@@ -172,6 +223,14 @@ class SSD1306_SPI(SSD1306):
         self.spi.write(self.buffer)
         self.cs.high()
 
+    def write_data(self, start, n):
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cs.high()
+        self.dc.high()
+        self.cs.low()
+        self.spi.write(self._mv[start:start + n])
+        self.cs.high()
+
     def poweron(self):
         self.res.high()
         utime.sleep_ms(1)
@@ -199,15 +258,8 @@ def _example_main_i2c(i2c_id=0, addr=0x3c, width=128, height=64):
         print('Failed to initialize I2C:', e)
         return
 
-    # Provide compatibility: many ePy/I2C implementations use writeto; driver expects send
-    if not hasattr(i2c, 'send'):
-        def _send(buf, addr_):
-            try:
-                i2c.writeto(addr_, buf)
-            except Exception:
-                # some variants might have different signatures; try a fallback
-                i2c.writeto(addr_, buf)
-        setattr(i2c, 'send', _send)
+    # one wrapper for the bus: resolves send/writeto once, keeps stats
+    bus = I2CBus(i2c)
 
     # Optional: print discovered addresses if scan available
     try:
@@ -218,7 +270,7 @@ def _example_main_i2c(i2c_id=0, addr=0x3c, width=128, height=64):
 
     # Create display and run a tiny demo
     try:
-        disp = SSD1306_I2C(width, height, i2c, addr=addr)
+        disp = SSD1306_I2C(width, height, bus, addr=addr)
     except Exception as e:
         print('Failed to create SSD1306_I2C:', e)
         return
@@ -232,6 +284,7 @@ def _example_main_i2c(i2c_id=0, addr=0x3c, width=128, height=64):
     disp.fill(0)
     disp.text('Done', 50, 28, 1)
     disp.show()
+    print('I2C bus stats:', bus.stats(addr))
 
 
 if __name__ == '__main__':
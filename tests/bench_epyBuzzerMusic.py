@@ -0,0 +1,98 @@
+"""Host benchmarks for epyBuzzerMusic on the epysim virtual clock.
+
+Run: python tests/bench_epyBuzzerMusic.py [notes]
+"""
+
+import io
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+import epyBuzzerMusic  # noqa: E402
+import epySongBank  # noqa: E402
+
+
+def _rate(count, func, repeat=3):
+    """Best-of-`repeat` items per second for func()."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return count / best if best else float('inf')
+
+
+def run(notes=5000):
+    """Return a dict of benchmark results for a song of `notes` notes."""
+    names = ('C', 'D', 'E', 'F', 'G', 'A', 'B')
+    legacy = ['{}4:2'.format(names[i % 7]) for i in range(notes)]
+    mml = 'T140 L8 O4 ' + ' '.join(names[i % 7] for i in range(notes))
+    rtttl = 'bench:d=8,o=5,b=140:' + ','.join(
+        names[i % 7].lower() for i in range(notes))
+    blob = epySongBank.compile_mml(mml)
+
+    res = {}
+    res['parse_legacy_notes_per_s'] = _rate(
+        notes, lambda: epySongBank.compile_notes(legacy))
+    res['parse_mml_notes_per_s'] = _rate(
+        notes, lambda: epySongBank.compile_mml(mml))
+    res['parse_rtttl_notes_per_s'] = _rate(
+        notes, lambda: epySongBank.compile_rtttl(rtttl))
+
+    def stream(src):
+        r = epySongBank.SongReader(src)
+        while r.read() >= 0:
+            pass
+    res['stream_bytes_notes_per_s'] = _rate(notes, lambda: stream(blob))
+    res['stream_file_notes_per_s'] = _rate(
+        notes, lambda: stream(io.BytesIO(blob)))
+    res['song_bytes'] = len(blob)
+    res['legacy_list_bytes'] = sys.getsizeof(legacy) + sum(
+        sys.getsizeof(s) for s in legacy)
+
+    # full playback in virtual time
+    epysim.reset()
+    tim = epysim.Timer(0)
+    muz = epyBuzzerMusic.Music(tim)
+    muz.play(blob)
+    calls = [0]
+
+    def step():
+        calls[0] += 1
+        return muz.update()
+
+    t0 = time.perf_counter()
+    virtual_ms = epysim.run(step, until=lambda: muz.getState() != 'START')
+    wall = time.perf_counter() - t0
+    segs = tim.segments()
+    res['playback_virtual_ms'] = virtual_ms
+    res['playback_wall_ms'] = wall * 1000
+    res['playback_speedup'] = virtual_ms / (wall * 1000) if wall else 0
+    res['playback_update_calls'] = calls[0]
+    res['timer_segments'] = len(segs)
+    res['timer_callbacks_per_s'] = (tim.callback_count() * 1000 // virtual_ms
+                                    if virtual_ms else 0)
+    return res
+
+
+def main():
+    notes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for key, val in run(notes).items():
+        if isinstance(val, float):
+            print('{:28s} {:14.1f}'.format(key, val))
+        else:
+            print('{:28s} {:14d}'.format(key, val))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Host benchmark: command-to-effect latency of the BLE command channel.
+
+Run: python tests/bench_epyCommand.py [seconds]
+
+A phone sends a command every 700 ms over the 115200 baud UART (mode and
+speed changes, beeps, queued jingles, binary frames) while 64 LEDs
+animate at 30 Hz and a song plays. Latency is from the arrival of a
+command's last byte to its handler running, on the virtual clock.
+
+"async" polls a CommandChannel every 20 ms from epyAsync next to the LED
+and music coroutines. "readline" is the naive loop: readline() on the
+UART between frames, which blocks until a line arrives or the 2 s
+timeout passes. Dropped LED frames are 30 Hz slots that got no frame.
+"""
+
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from epyAsync import (Periodic, command_poll, led_frames,  # noqa: E402
+                      music_playback, run_for)
+from epyBuzzerMusic import Music  # noqa: E402
+from epyCommand import (SYNC, CommandChannel, bind_leds,  # noqa: E402
+                        bind_music)
+from epyRGB_MutilMode import RGBModeDisplay  # noqa: E402
+from htu21d import crc8  # noqa: E402
+
+SONG = "T140 L8 E E R E R C E R G4 R4 <G4 R4 >C4. <G R4 E4."
+PERIOD_MS = 700
+POLL_MS = 20
+
+
+def binary_command(cmd, args=b''):
+    frame = bytes([ord(cmd), 0, len(args)]) + args
+    return bytes([SYNC]) + frame + bytes([crc8(frame)])
+
+
+COMMANDS = (
+    b'M chase\n', b'S 4\n', b'B 880 50\n', b'M fire\n',
+    b'Q T200 L16 C E G >C\n', binary_command('M', b'rainbow'),
+    b'F 30\n', binary_command('B', b'1760 30'),
+)
+
+
+def _setup():
+    epysim.reset()
+    uart = epysim.UART(1, 115200, timeout=2000, read_buf_len=128)
+    leds = RGBModeDisplay(num_leds=64, update_hz=30, write_hz=30)
+    music = Music(epysim.Timer(0), thread=False)
+    music.play(SONG, loop=True)
+    channel = CommandChannel(uart)
+    bind_leds(channel, leds)
+    bind_music(channel, music)
+    # note when each handler runs
+    ran = []
+    for cmd, handler in list(channel._handlers.items()):
+        channel._handlers[cmd] = _timed(handler, ran)
+    return uart, leds, music, channel, ran
+
+
+def _timed(handler, ran):
+    def wrapper(args):
+        ran.append(epysim.clock.now)
+        handler(args)
+    return wrapper
+
+
+def _send_script(uart, ms):
+    arrivals = []
+    for i in range(ms // PERIOD_MS - 1):
+        cmd = COMMANDS[i % len(COMMANDS)]
+        arrivals.append(uart.feed(cmd, (i + 1) * PERIOD_MS -
+                                  epysim.clock.now))
+    return arrivals
+
+
+def _result(leds, ms, frames, arrivals, ran):
+    lat = [r - a for a, r in zip(arrivals, ran)]
+    expected = ms // leds.fill_interval_ms
+    return {
+        'commands': len(ran),
+        'sent': len(arrivals),
+        'latency_mean_ms': sum(lat) / len(lat) if lat else None,
+        'latency_max_ms': max(lat) if lat else None,
+        'led_dropped': max(0, expected - frames),
+    }
+
+
+def run_async(ms=10000):
+    uart, leds, music, channel, ran = _setup()
+    arrivals = _send_script(uart, ms)
+    fps = Periodic(leds.fill_interval_ms)
+    epysim.run_async(run_for(ms, led_frames(leds, fps),
+                             music_playback(music),
+                             command_poll(channel, POLL_MS)))
+    res = _result(leds, ms, len(leds.led.frames), arrivals, ran)
+    res['led_dropped'] = fps.dropped
+    res['errors'] = channel.errors + channel.dropped
+    return res
+
+
+def run_readline(ms=10000):
+    uart, leds, music, channel, ran = _setup()
+    arrivals = _send_script(uart, ms)
+    clock = epysim.clock
+    while clock.now < ms:
+        leds.fill_if_due()
+        leds.update_if_due()
+        music.update()
+        line = uart.readline()
+        if line and line[0] != SYNC:
+            # the naive loop only knows text lines
+            handler = channel._handlers.get(line[0])
+            if handler is not None:
+                handler(memoryview(line.strip())[2:])
+    return _result(leds, ms, len(leds.led.frames), arrivals, ran)
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    ms = seconds * 1000
+    print('{} s virtual, a command every {} ms'.format(seconds, PERIOD_MS))
+    for name, func in (('readline', run_readline), ('async', run_async)):
+        res = func(ms)
+        print('{:9}'.format(name) + '  '.join(
+            '{}={}'.format(k, round(v, 1) if isinstance(v, float) else v)
+            for k, v in sorted(res.items())))
+
+
+if __name__ == '__main__':
+    main()
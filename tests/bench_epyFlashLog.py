@@ -0,0 +1,122 @@
+"""Host benchmark: binary FlashLog against the text-line logger it replaces.
+
+Run: python tests/bench_epyFlashLog.py [records] [directory]
+
+Write amplification models a flash filesystem that programs whole
+512-byte sectors: every write call costs its size rounded up to whole
+sectors, divided by the bytes of sample data it carried. The text logger
+writes and flushes one "ts,t,rh" line per reading, as the old code did.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from epyFlashLog import FlashLog  # noqa: E402
+
+SECTOR = 512
+
+
+def _programmed(nbytes):
+    return (nbytes + SECTOR - 1) // SECTOR * SECTOR
+
+
+def _samples(n):
+    return [(1700000000 + i, (2000 + i % 700, 4500 - i % 900))
+            for i in range(n)]
+
+
+def text_log(samples, path):
+    """The old logger: one flushed text line per reading."""
+    programmed = payload = 0
+    with open(path, 'w') as f:
+        for ts, (t, rh) in samples:
+            line = '{},{:.2f},{:.2f}\n'.format(ts, t / 100, rh / 100)
+            f.write(line)
+            f.flush()
+            programmed += _programmed(len(line))
+            payload += len(line)
+    return programmed, payload
+
+
+class _SectorFile:
+    """File wrapper adding each write's programmed size to a counter."""
+
+    def __init__(self, f, owner):
+        self._f = f
+        self._owner = owner
+
+    def write(self, data):
+        self._owner.programmed += _programmed(len(data))
+        return self._f.write(data)
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class CountingLog(FlashLog):
+    programmed = 0
+
+    def _rotate(self):
+        super()._rotate()
+        self.programmed += _programmed(8)  # the header write
+        self._file = _SectorFile(self._file, self)
+
+
+def run(records=20000, directory=None):
+    res = {}
+    samples = _samples(records)
+    tmp = None
+    if directory is None:
+        tmp = tempfile.TemporaryDirectory()
+        directory = tmp.name
+    try:
+        t0 = time.perf_counter()
+        programmed, _ = text_log(samples, os.path.join(directory, 'th.txt'))
+        dt = time.perf_counter() - t0
+        # sample data is 8 bytes of information per reading either way
+        res['text_write_amplification'] = programmed / (8 * records)
+        res['text_records_per_s'] = records / dt
+
+        log = CountingLog(os.path.join(directory, 'th'), files=4,
+                          file_size=64 * 1024, block_size=SECTOR)
+        t0 = time.perf_counter()
+        for ts, vals in samples:
+            log.append(ts, vals)
+        log.flush()
+        dt = time.perf_counter() - t0
+        res['binary_records_per_s'] = records / dt
+        res['binary_write_amplification'] = log.programmed / (8 * records)
+        res['binary_writes_per_record'] = log.writes / records
+        t0 = time.perf_counter()
+        n = sum(1 for _ in log.records())
+        res['binary_read_records_per_s'] = n / (time.perf_counter() - t0)
+        log.close()
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+    return res
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = sys.argv[2] if len(sys.argv) > 2 else None
+    for key, val in run(records, directory).items():
+        print('{:28s} {:14.2f}'.format(key, val))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Host benchmark: binary telemetry frames against one text line per reading.
+
+Run: python tests/bench_epyTelemetry.py [samples] [buffer bytes] [delay ms]
+
+"text" is the old path: one formatted "ts,t,rh" line written per
+reading. "binary" packs the same readings (plus a stat frame per minute)
+with epyTelemetry, flushing at least every `delay` ms. Both write to a
+fake UART at 115200 baud; the binary stream is decoded back with
+FrameDecoder, in 20-byte pieces as a BLE link delivers it, and checked
+against the input. CPU figures are CPython time per sample for encoding
+and for decoding; CPython formats floats in C, so the text path is
+cheaper here than with MicroPython's float formatting.
+"""
+
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from epyTelemetry import STAT_LOOP_US, FrameDecoder, Telemetry  # noqa: E402
+
+PERIOD_MS = 1000
+BLE_CHUNK = 20
+
+
+def _readings(n):
+    return [(2000 + i % 700 - 350, 4500 - i % 900) for i in range(n)]
+
+
+def _link(uart, n):
+    """Per-sample wire and write-call figures of a UART."""
+    nbytes = len(uart.tx)
+    return {'bytes_per_sample': nbytes / n,
+            'writes_per_sample': len(uart.writes) / n,
+            'link_busy': nbytes * uart.byte_us() / (n * PERIOD_MS * 1000.0)}
+
+
+def run_text(n):
+    epysim.reset()
+    uart = epysim.UART(1, 115200)
+    readings = _readings(n)
+    t0 = time.perf_counter()
+    for t, rh in readings:
+        epysim.clock.advance_ms(PERIOD_MS)
+        uart.write('{},{:.2f},{:.2f}\n'.format(
+            epysim.clock.now, t / 100, rh / 100))
+    res = _link(uart, n)
+    res['encode_us'] = (time.perf_counter() - t0) * 1e6 / n
+    return res
+
+
+def run_binary(n, size=128, delay_ms=10000):
+    epysim.reset()
+    uart = epysim.UART(1, 115200)
+    tel = Telemetry(uart, size=size, max_delay_ms=delay_ms)
+    readings = _readings(n)
+    t0 = time.perf_counter()
+    for i, (t, rh) in enumerate(readings):
+        epysim.clock.advance_ms(PERIOD_MS)
+        tel.sample(t, rh)
+        if i % 60 == 59:
+            tel.stat(STAT_LOOP_US, i)
+        tel.update()
+    tel.flush()
+    res = _link(uart, n)
+    res['encode_us'] = (time.perf_counter() - t0) * 1e6 / n
+
+    dec = FrameDecoder()
+    data = bytes(uart.tx)
+    records = []
+    t0 = time.perf_counter()
+    for i in range(0, len(data), BLE_CHUNK):
+        records.extend(dec.feed(data[i:i + BLE_CHUNK]))
+    res['decode_us'] = (time.perf_counter() - t0) * 1e6 / n
+    samples = [(r[3], r[4]) for r in records if r[0] == 'sample']
+    res['decoded_ok'] = (samples == readings and dec.crc_errors == 0 and
+                         dec.lost == 0)
+    res['frames'] = dec.frames
+    return res
+
+
+def run(n=3600, size=128, delay_ms=10000):
+    return {'text': run_text(n), 'binary': run_binary(n, size, delay_ms)}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    delay_ms = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    print('{} samples at 1 Hz, {}-byte buffer, flushed within {} ms'.format(
+        n, size, delay_ms))
+    for name, res in sorted(run(n, size, delay_ms).items()):
+        print('{:7}'.format(name) + '  '.join(
+            '{}={}'.format(k, round(v, 4) if isinstance(v, float) else v)
+            for k, v in sorted(res.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Host benchmark: full-screen redraws against epyWidgets invalidation.
+
+Run: python tests/bench_epyWidgets.py [refreshes]
+
+A 128x64 dashboard (title, link icon, temperature, humidity and its
+bar) is refreshed once a second. The temperature changes by a tenth
+every refresh, the humidity every tenth refresh and the icon every
+thirtieth. "full" is the ad-hoc structure: fill(0), draw everything,
+show(). "widgets" sets the same values on an epyWidgets.Screen and calls
+refresh(). Figures are per refresh on the virtual 400 kHz bus, and
+CPython time for drawing and sending.
+"""
+
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from epyDashboard import fixed  # noqa: E402
+from epyWidgets import Icon  # noqa: E402
+from oledsim import LINK_OFF, LINK_ON, dashboard  # noqa: E402
+from ssd1306 import SSD1306_I2C  # noqa: E402
+
+
+def readings(i):
+    """Shown values of refresh i: tenths degC, %RH, link."""
+    return 215 + i % 50, 40 + (i // 10) % 20, (i // 30) & 1
+
+
+def _setup():
+    epysim.reset()
+    i2c = epysim.I2C(0, epysim.I2C.MASTER, baudrate=400000)
+    dev = i2c.attach(epysim.WriteRecorder(0x3c))
+    oled = SSD1306_I2C(128, 64, i2c)
+    return i2c, dev, oled
+
+
+def _measure(i2c, dev, n, step):
+    dev.clear()
+    i2c.bus_us = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        step(i)
+    cpu = time.perf_counter() - t0
+    return {'bytes': sum(len(p) for p in dev.payloads()) / n,
+            'transactions': len(dev.writes) / n,
+            'bus_ms': i2c.bus_us / 1000 / n,
+            'cpu_us': cpu * 1e6 / n}
+
+
+def run_full(n=300):
+    i2c, dev, oled = _setup()
+    icons = Icon(0, 0, 16, 8, (LINK_OFF, LINK_ON)).images
+
+    def step(i):
+        t, rh, link = readings(i)
+        oled.fill(0)
+        oled.text('Living room', 0, 0, 1)
+        oled.blit(icons[link], 112, 0, 0)
+        oled.text('T {} C'.format(fixed(t, 1)), 0, 16, 1)
+        oled.text('RH {} %'.format(rh), 0, 32, 1)
+        oled.rect(0, 44, 128, 8, 1)
+        oled.fill_rect(1, 45, rh * 126 // 100, 6, 1)
+        oled.show()
+    return _measure(i2c, dev, n, step)
+
+
+def run_widgets(n=300):
+    i2c, dev, oled = _setup()
+    scr, temp, hum, bar, link = dashboard(oled)
+    scr.refresh()
+    first = scr.redraws
+
+    def step(i):
+        t, rh, up = readings(i)
+        temp.set(t)
+        hum.set(rh)
+        bar.set(rh)
+        link.set(up)
+        scr.refresh()
+    res = _measure(i2c, dev, n, step)
+    res['redraws'] = (scr.redraws - first) / n
+    return res
+
+
+def run(n=300):
+    return {'full': run_full(n), 'widgets': run_widgets(n)}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print('{} refreshes, figures per refresh'.format(n))
+    for name, res in sorted(run(n).items()):
+        print('{:8}'.format(name) + '  '.join(
+            '{}={}'.format(k, round(v, 2)) for k, v in sorted(res.items())))
+
+
+if __name__ == '__main__':
+    main()
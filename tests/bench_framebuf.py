@@ -0,0 +1,62 @@
+"""Host benchmark: render SSD1306-sized frames with the host framebuf.
+
+Run: python tests/bench_framebuf.py [frames]
+
+Each frame clears a 128x64 MONO_VLSB buffer, draws two text lines, a
+bar graph, a frame rectangle, a line, blits a 16x16 icon and scrolls,
+which is a typical dashboard redraw. Figures are reported for the NumPy
+path and for the per-pixel fallback (the fallback alone when NumPy is
+missing).
+"""
+
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import simframebuf as fb  # noqa: E402
+
+
+def _frame(f, icon, i):
+    f.fill(0)
+    f.text('T 23.{}C'.format(i % 10), 0, 0, 1)
+    f.text('RH {}%'.format(40 + i % 20), 0, 10, 1)
+    f.rect(0, 20, 128, 44, 1)
+    for b in range(12):
+        h = (i + b * 7) % 40
+        f.fill_rect(4 + b * 10, 62 - h, 8, h, 1)
+    f.line(0, 63, 127, 20 + i % 40, 1)
+    f.blit(icon, 110, 0, 0)
+    f.scroll(0, 0)
+
+
+def run(frames=1000, use_numpy=True):
+    buf = bytearray(128 * 64 // 8)
+    f = fb.FrameBuffer(buf, 128, 64, fb.MONO_VLSB, use_numpy=use_numpy)
+    icon = fb.FrameBuffer(bytearray(32), 16, 16, fb.MONO_VLSB,
+                          use_numpy=use_numpy)
+    icon.rect(0, 0, 16, 16, 1)
+    icon.line(0, 0, 15, 15, 1)
+    t0 = time.perf_counter()
+    for i in range(frames):
+        _frame(f, icon, i)
+    dt = time.perf_counter() - t0
+    return {'frames': frames, 'numpy': f._arr is not None,
+            'frames_per_s': frames / dt if dt else float('inf')}
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for use_numpy in (True, False):
+        res = run(frames if use_numpy else max(1, frames // 10), use_numpy)
+        print('{:8} {:8.0f} frames/s'.format(
+            'numpy' if res['numpy'] else 'python', res['frames_per_s']))
+        if not res['numpy']:
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Host benchmarks for the HTU21D driver read path.
+
+Run: python tests/bench_htu21d.py [readings]
+
+"before" figures use the original read path (hold-master mem_read into a
+new bytes object, bit-by-bit CRC over a slice); "after" figures use the
+current driver. Heap figures are CPython's peak traced bytes for one read;
+the "after" path only creates the returned int, which is a heap-free
+small int on MicroPython.
+
+The fault table runs the driver against the emulated sensor on a timed
+virtual bus with injected slow conversions, CRC errors and NACKs, and
+reports readings per (virtual) second, bus time and retries per reading.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+import htu21d  # noqa: E402
+
+
+def legacy_check_crc(raw):
+    """The original bit-by-bit CRC of HTU21D._check_crc."""
+    POLY = 0x131
+    crc = 0
+    for byte in raw[0:2]:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ POLY) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+    return crc == (raw[2] & 0xFF)
+
+
+def legacy_read_temperature(sensor):
+    """The original hold-master read path."""
+    data = sensor.i2c.mem_read(3, sensor.address,
+                               sensor.TRIGGER_TEMP_MEASURE_HOLD)
+    if legacy_check_crc(data):
+        return sensor._raw_to_temperature(data[0], data[1])
+    raise ValueError
+
+
+class NullI2C:
+    """Bus with no simulation overhead that allocates like the hardware:
+    reads into a caller buffer are in place, reads by length return a new
+    bytes object."""
+
+    def __init__(self):
+        self.frame = bytes([0x68, 0x3A, 0x7C])
+
+    def writeto(self, addr, buf):
+        pass
+
+    def readfrom_into(self, addr, buf):
+        buf[:] = self.frame
+
+    def mem_read(self, data, addr, memaddr):
+        if isinstance(data, int):
+            return bytes(self.frame)
+        data[:] = self.frame
+        return data
+
+
+def _per_second(n, func):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        func()
+    dt = time.perf_counter() - t0
+    return n / dt if dt else float('inf')
+
+
+def _peak_bytes(func):
+    """Peak transient heap bytes while running func() once."""
+    func()  # warm up
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - base
+
+
+def run(readings=20000):
+    res = {}
+    frame = bytes([0x68, 0x3A, 0x7C])  # datasheet example
+    sensor = htu21d.HTU21D(NullI2C())
+    res['crc_before_per_s'] = _per_second(
+        readings, lambda: legacy_check_crc(frame))
+    res['crc_after_per_s'] = _per_second(
+        readings, lambda: sensor._check_crc(frame))
+
+    # read path alone on a bus without emulator overhead
+    null = htu21d.HTU21D(NullI2C())
+
+    def nohold_read():
+        null.start(null.TRIGGER_TEMP_MEASURE_NOHOLD)
+        return null.fetch()
+
+    def read_temperature():
+        raw = nohold_read()
+        return null._raw_to_temperature(raw >> 8, raw & 0xFF)
+
+    res['reads_before_per_s'] = _per_second(
+        readings, lambda: legacy_read_temperature(null))
+    res['reads_after_per_s'] = _per_second(readings, read_temperature)
+    res['heap_bytes_before_per_read'] = _peak_bytes(
+        lambda: legacy_check_crc(null.i2c.mem_read(3, 0x40, 0xE3)))
+    res['heap_bytes_after_per_read'] = _peak_bytes(nohold_read)
+    return res
+
+
+# (name, HTU21DDevice fault options)
+FAULTS = (
+    ('clean', {}),
+    ('slow part', {'latency_ms': (20, 60)}),
+    ('crc 5%', {'crc_error_rate': 0.05}),
+    ('nack 5%', {'nack_rate': 0.05}),
+    ('crc+nack 10%', {'crc_error_rate': 0.1, 'nack_rate': 0.1}),
+)
+
+
+def run_faults(readings=200, mode='blocking', retries=2, delay_ms=50,
+               **faults):
+    """Deterministic throughput of the driver under injected faults.
+
+    mode: 'blocking' (read_temperature) or 'update' (T + RH pairs)
+    Readings given up after `retries` (CRC or timeout) count in 'failed'.
+    """
+    epysim.reset()
+    clock = epysim.clock
+    i2c = epysim.I2C(0, timed=True)
+    dev = i2c.attach(epysim.HTU21DDevice(**faults))
+    sensor = htu21d.HTU21D(i2c, retries=retries, delay_ms=delay_ms)
+    ok = failed = 0
+    t0 = clock.us
+    while ok + failed < readings:
+        try:
+            if mode == 'blocking':
+                sensor.read_temperature()
+                ok += 1
+            elif sensor.update():
+                ok += 1
+            else:
+                clock.advance_ms(sensor.time_until_ready())
+        except (OSError, ValueError):
+            # CRC failures and conversions the sensor never answered
+            failed += 1
+    elapsed_s = (clock.us - t0) / 1e6
+    per_ok = max(ok, 1)
+    attempts = ok + failed
+    if mode == 'update':
+        attempts *= 2  # a temperature and a humidity trigger per pair
+    triggers = sum(1 for c in dev.commands if c in (0xF3, 0xF5))
+    return {
+        'readings_per_s': ok / elapsed_s,
+        'bus_ms_per_reading': i2c.bus_us / 1000 / per_ok,
+        'retries_per_reading': (triggers - attempts) / per_ok,
+        'nack_polls_per_reading': i2c.nacks / per_ok,
+        'failed': failed,
+    }
+
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for key, val in run(readings).items():
+        print('{:28s} {:14.2f}'.format(key, val))
+    print()
+    print('{:14s} {:>18s} {:>9s} {:>8s} {:>8s} {:>8s} {:>6s}'.format(
+        'faults', 'mode', 'read/s', 'bus ms', 'retries', 'nacks', 'fail'))
+    for name, faults in FAULTS:
+        for mode, delay_ms in (('blocking', 50), ('blocking', 0),
+                               ('update', 50)):
+            res = run_faults(min(readings, 1000), mode,
+                             delay_ms=delay_ms, **faults)
+            print('{:14s} {:>18s} {:9.2f} {:8.3f} {:8.3f} {:8.3f} {:6d}'
+                  .format(name, '{} delay={}'.format(mode, delay_ms),
+                          res['readings_per_s'],
+                          res['bus_ms_per_reading'],
+                          res['retries_per_reading'],
+                          res['nack_polls_per_reading'], res['failed']))
+
+
+if __name__ == '__main__':
+    main()
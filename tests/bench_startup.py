@@ -0,0 +1,149 @@
+"""Startup benchmark: import time and heap per module, and per object.
+
+Run: python tests/bench_startup.py          (host, tracemalloc)
+     import bench_startup; bench_startup.main()   (board, gc.mem_free)
+
+Modules are imported in dependency order, so each figure is what that
+module adds on top of the ones above it. "bytes" is the heap still held
+after the import or constructor (tracemalloc's traced size on the host,
+the drop in gc.mem_free() after gc.collect() on the device). The host
+also reports the import-time peak. CPython objects are several times
+larger than MicroPython's, so compare host figures with host figures.
+"""
+
+import gc
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+if tracemalloc is not None:
+    import os
+    # the virtual utime clock does not move by itself on the host
+    from time import perf_counter
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import epysim
+    epysim.install()
+
+    def _elapsed_us(t0):
+        return int((perf_counter() - t0) * 1000000)
+
+    _now = perf_counter
+else:
+    import utime
+
+    def _elapsed_us(t0):
+        return utime.ticks_diff(utime.ticks_us(), t0)
+
+    _now = utime.ticks_us
+
+MODULES = (
+    'epyI2CBus', 'epyBeatClock', 'epySongBank', 'epyBuzzerMusic',
+    'epyRGB_MutilMode', 'htu21d', 'ePy4Digit', 'ssd1306',
+    'epySensorSampler', 'epyFlashLog', 'epyTimerWheel', 'epyAsync',
+    'epyProfile',
+)
+
+
+class _Meter:
+    """Retained (and on the host, peak) heap bytes of a block of code."""
+
+    def start(self):
+        gc.collect()
+        if tracemalloc is not None:
+            tracemalloc.start()
+            self._base = tracemalloc.get_traced_memory()[0]
+        else:
+            self._base = gc.mem_free()
+        self._t0 = _now()
+
+    def stop(self):
+        us = _elapsed_us(self._t0)
+        if tracemalloc is not None:
+            cur, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return us, cur - self._base, peak - self._base
+        gc.collect()
+        return us, self._base - gc.mem_free(), None
+
+
+def imports(modules=MODULES):
+    """[(module, us, bytes, peak)] for importing each module in order.
+
+    Modules that were already loaded are put back afterwards, so classes
+    other code holds stay the ones in sys.modules.
+    """
+    loaded = {}
+    for name in modules:
+        if name in sys.modules:
+            loaded[name] = sys.modules.pop(name)
+    meter = _Meter()
+    rows = []
+    for name in modules:
+        meter.start()
+        __import__(name)
+        rows.append((name,) + meter.stop())
+    sys.modules.update(loaded)
+    return rows
+
+
+def _objects():
+    from machine import I2C, Timer
+    from epyBuzzerMusic import Music
+    from epyRGB_MutilMode import RGBModeDisplay
+    from htu21d import HTU21D
+    from ssd1306 import SSD1306_I2C
+    from epyI2CBus import I2CBus
+
+    def i2c():
+        bus = I2C(0, I2C.MASTER, baudrate=400000)
+        if tracemalloc is not None:
+            bus.attach(epysim.HTU21DDevice(23.0, 40.0))
+            bus.attach(epysim.WriteRecorder(0x3c))
+        return I2CBus(bus)
+
+    return (
+        ('Music', lambda: Music(Timer(0), thread=False)),
+        ('RGBModeDisplay', lambda: RGBModeDisplay()),
+        ('RGBModeDisplay #2', lambda: RGBModeDisplay()),
+        ('SSD1306_I2C 128x64', lambda: SSD1306_I2C(128, 64, i2c())),
+        ('HTU21D', lambda: HTU21D(i2c())),
+    )
+
+
+def objects():
+    """[(object, us, bytes, peak)] for constructing the main drivers."""
+    meter = _Meter()
+    keep = []
+    rows = []
+    for name, make in _objects():
+        meter.start()
+        keep.append(make())
+        rows.append((name,) + meter.stop())
+    return rows
+
+
+def _print(title, rows):
+    print('{:20} {:>8} {:>8} {:>8}'.format(title, 'us', 'bytes', 'peak'))
+    for name, us, nbytes, peak in rows:
+        print('{:20} {:8} {:8} {:>8}'.format(
+            name, us, nbytes, '-' if peak is None else peak))
+
+
+def main():
+    rows = imports()
+    _print('module', rows)
+    print('{:20} {:8} {:8}'.format('total', sum(r[1] for r in rows),
+                                   sum(r[2] for r in rows)))
+    print()
+    _print('object', objects())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# make the repo root (``from Module import ...``), the Module directory
+# (flat imports used between modules on the device) and this directory
+# (the epysim simulation layer) importable
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(tests_dir)
+for path in (repo_root, os.path.join(repo_root, 'Module'), tests_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+# fake utime/machine/_thread/... before any test imports a driver
+epysim.install()
+
+# manual scripts that need real hardware/audio; run them by hand
+collect_ignore = ['manual_beep_test.py']
+
+
+@pytest.fixture(autouse=True)
+def sim():
+    """Fresh virtual clock and thread/scheduler records for every test."""
+    epysim.reset()
+    return epysim
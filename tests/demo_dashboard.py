@@ -0,0 +1,137 @@
+"""Host demo: bus traffic of the HTU21D -> SSD1306 + FourDigit dashboard.
+
+Run: python tests/demo_dashboard.py [minutes]
+
+The emulated sensor drifts slowly (0.8 degC and 3 %RH over 20 minutes)
+with a little noise. "fixed" is the old structure: read the sensor and
+redraw the whole OLED and the digits every second. "changes" samples at
+the same rate through epyDashboard, so the displays are only written
+when a shown value changes, and then only the changed digits and text
+areas. Figures are bytes and transactions per device on the virtual
+400 kHz bus. Either scenario can be recorded with an epyBusTrace.BusTrace
+(tests/trace_replay.py does).
+"""
+
+import math
+import os
+import random
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from ePy4Digit import FourDigit  # noqa: E402
+from epyDashboard import (Dashboard, Deadband, Field, OledText,  # noqa: E402
+                          digits_temperature, fixed)
+from epyI2CBus import I2CBus  # noqa: E402
+from epySensorSampler import HTU21DSampler  # noqa: E402
+from htu21d import HTU21D  # noqa: E402
+from ssd1306 import SSD1306_I2C  # noqa: E402
+
+OLED_ADDR = 0x3c
+DIGITS_ADDR = 0x3d
+SENSOR_ADDR = 0x40
+PERIOD_MS = 1000
+
+
+class DriftingSensor(epysim.HTU21DDevice):
+    """HTU21D whose readings follow a slow sine with noise."""
+
+    def __init__(self, seed=1):
+        super().__init__(23.0, 45.0)
+        self._noise = random.Random(seed)
+
+    def write(self, data):
+        phase = 2 * math.pi * epysim.clock.now / (20 * 60000)
+        self.temperature = 23.0 + 0.8 * math.sin(phase) + \
+            self._noise.gauss(0, 0.02)
+        self.humidity = 45.0 + 3.0 * math.sin(phase) + \
+            self._noise.gauss(0, 0.1)
+        return super().write(data)
+
+
+def _setup(trace=None):
+    epysim.reset()
+    i2c = epysim.I2C(0, epysim.I2C.MASTER, baudrate=400000, timed=True)
+    i2c.attach(DriftingSensor())
+    i2c.attach(epysim.WriteRecorder(OLED_ADDR))
+    i2c.attach(epysim.WriteRecorder(DIGITS_ADDR))
+    bus = I2CBus(i2c)
+    oled = SSD1306_I2C(128, 64, bus, addr=OLED_ADDR)
+    digits = FourDigit(bus, DIGITS_ADDR)
+    sampler = HTU21DSampler(HTU21D(bus), period_ms=PERIOD_MS)
+    # count (and trace) from after the display initialisation
+    bus.reset_stats()
+    if trace is not None:
+        trace.attach(bus)
+        trace.start()
+    return bus, oled, digits, sampler
+
+
+def _result(bus):
+    res = {}
+    for name, addr in (('oled', OLED_ADDR), ('digits', DIGITS_ADDR),
+                       ('sensor', SENSOR_ADDR)):
+        st = bus.stats(addr)
+        res[name + '_bytes'] = st['bytes']
+        res[name + '_tx'] = st['transactions']
+    return res
+
+
+def run_fixed(ms, trace=None):
+    """Read and redraw everything every PERIOD_MS."""
+    bus, oled, digits, sampler = _setup(trace)
+    sensor = sampler.sensor
+    clock = epysim.clock
+    while clock.now < ms:
+        t = int(sensor.read_temperature() * 100 + 0.5)
+        h = int(sensor.read_humidity() * 100 + 0.5)
+        oled.fill(0)
+        oled.text('T {} C'.format(fixed((t + 5) // 10, 1)), 0, 0, 1)
+        oled.text('RH {} %'.format(fixed((h + 50) // 100, 0)), 0, 10, 1)
+        oled.show()
+        digits.show_temper(t / 100)
+        clock.sleep_ms(PERIOD_MS - clock.now % PERIOD_MS)
+    return _result(bus)
+
+
+def run_changes(ms, trace=None):
+    """The same screen through epyDashboard."""
+    bus, oled, digits, sampler = _setup(trace)
+    oled.fill(0)
+    oled.show()
+    bus.reset_stats()
+    if trace is not None:
+        trace.clear()
+        trace.start()
+    dash = Dashboard(sampler)
+    temp = dash.add(Field(sampler.temperature.last, Deadband(10, 3),
+                          digits_temperature(digits),
+                          OledText(oled, 0, 0, 'T {} C', 1, 10)))
+    hum = dash.add(Field(sampler.humidity.last, Deadband(100, 30),
+                         OledText(oled, 0, 10, 'RH {} %', 0, 10)))
+    epysim.run(dash.update, max_ms=ms)
+    res = _result(bus)
+    res['pushes'] = temp.pushes + hum.pushes
+    res['samples'] = sampler.samples
+    return res
+
+
+def main():
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    ms = minutes * 60000
+    print('{} min virtual, one sample per second'.format(minutes))
+    for name, func in (('fixed', run_fixed), ('changes', run_changes)):
+        res = func(ms)
+        print('{:8}'.format(name) + '  '.join(
+            '{}={}'.format(k, v) for k, v in sorted(res.items())))
+
+
+if __name__ == '__main__':
+    main()
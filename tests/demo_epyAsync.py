@@ -0,0 +1,150 @@
+"""Host demo: LEDs, music, sensor and display in one cooperative loop.
+
+Run: python tests/demo_epyAsync.py [seconds]
+
+Everything runs on the virtual clock with a timed 400 kHz I2C bus, so
+the display and sensor transfers take the bus time they take on the
+device. 64 LEDs render at 30 Hz, a song plays on the buzzer timer, the
+HTU21D is sampled once a second and the SSD1306 redraws the readings 4
+times a second.
+
+"async" runs the epyAsync coroutines on one event loop. "blocking" is
+the old structure for comparison: one loop with blocking sensor reads
+and the LED update as one more job in it. Dropped LED frames are 30 Hz
+grid slots that never got a frame.
+"""
+
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from epyAsync import (Periodic, led_frames, music_playback,  # noqa: E402
+                      refresh, run_for, sensor_sampling)
+from epyBuzzerMusic import Music  # noqa: E402
+from epyI2CBus import I2CBus  # noqa: E402
+from epyRGB_MutilMode import RGBModeDisplay  # noqa: E402
+from epySensorSampler import HTU21DSampler  # noqa: E402
+from htu21d import HTU21D  # noqa: E402
+from ssd1306 import SSD1306_I2C  # noqa: E402
+
+SONG = "T140 L8 E E R E R C E R G4 R4 <G4 R4 >C4. <G R4 E4."
+OLED_ADDR = 0x3c
+OLED_PERIOD_MS = 250
+
+
+def _draw(oled, sampler):
+    oled.fill(0)
+    t = sampler.temperature.last() if len(sampler.temperature) else 0
+    h = sampler.humidity.last() if len(sampler.humidity) else 0
+    oled.text('T  {:>3}.{:02} C'.format(t // 100, t % 100), 0, 0, 1)
+    oled.text('RH {:>3}.{:02} %'.format(h // 100, h % 100), 0, 10, 1)
+    oled.rect(0, 24, 128, 40, 1)
+
+
+def _setup():
+    epysim.reset()
+    i2c = epysim.I2C(0, epysim.I2C.MASTER, baudrate=400000, timed=True)
+    i2c.attach(epysim.HTU21DDevice(24.0, 45.0))
+    recorder = i2c.attach(epysim.WriteRecorder(OLED_ADDR))
+    bus = I2CBus(i2c)
+    timer = epysim.Timer(0)
+    parts = {
+        'bus': bus,
+        'timer': timer,
+        'music': Music(timer, thread=False),
+        'leds': RGBModeDisplay(num_leds=64, update_hz=30, write_hz=30),
+        'sampler': HTU21DSampler(HTU21D(bus), period_ms=1000),
+        'oled': SSD1306_I2C(128, 64, bus, addr=OLED_ADDR),
+        'recorder': recorder,
+    }
+    # start measuring after the display initialisation
+    recorder.clear()
+    bus.reset_stats()
+    epysim.clock.reset()
+    parts['music'].play(SONG, loop=True)
+    return parts
+
+
+def draw_for(parts):
+    """draw(oled) callback showing the sampler's latest readings."""
+    sampler = parts['sampler']
+    return lambda oled: _draw(oled, sampler)
+
+
+def _result(parts, ms, frames):
+    leds = parts['leds']
+    expected = ms // leds.fill_interval_ms
+    return {
+        'led_frames': frames,
+        'led_dropped': max(0, expected - frames),
+        'notes': len(parts['timer'].starts()),
+        'samples': parts['sampler'].samples,
+        'oled_frames': sum(1 for p in parts['recorder'].payloads()
+                           if p[0] == 0x40),
+        'bus_ms': sum(s['time_us'] for s in
+                      parts['bus'].stats().values()) // 1000,
+    }
+
+
+def run_async(ms=5000):
+    """The epyAsync version; adds the LED frame statistics."""
+    parts = _setup()
+    leds = parts['leds']
+    fps = Periodic(leds.fill_interval_ms)
+    epysim.run_async(run_for(
+        ms, led_frames(leds, fps), music_playback(parts['music']),
+        sensor_sampling(parts['sampler']),
+        refresh(parts['oled'], draw_for(parts), Periodic(OLED_PERIOD_MS))))
+    res = _result(parts, ms, len(leds.led.frames))
+    res['led_dropped'] = fps.dropped
+    res['led_late_max_ms'] = fps.late_max
+    return res
+
+
+def run_blocking(ms=5000):
+    """One polling loop with blocking sensor reads, as before."""
+    parts = _setup()
+    leds = parts['leds']
+    music = parts['music']
+    sensor = parts['sampler'].sensor
+    oled = parts['oled']
+    draw = draw_for(parts)
+    clock = epysim.clock
+    next_sample = next_oled = 0
+    while clock.now < ms:
+        leds.fill_if_due()
+        leds.update_if_due()
+        music.update()
+        if clock.ticks_diff(clock.now, next_sample) >= 0:
+            next_sample += 1000
+            sensor.read_temperature()
+            sensor.read_humidity()
+            parts['sampler'].samples += 1
+        if clock.ticks_diff(clock.now, next_oled) >= 0:
+            next_oled += OLED_PERIOD_MS
+            draw(oled)
+            oled.show()
+        clock.sleep_ms(1)
+    return _result(parts, ms, len(leds.led.frames))
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    ms = seconds * 1000
+    print('{} s virtual, LEDs at 30 Hz, I2C at 400 kHz'.format(seconds))
+    for name, func in (('blocking', run_blocking), ('async', run_async)):
+        res = func(ms)
+        print('{:9}'.format(name) + '  '.join(
+            '{}={}'.format(k, v) for k, v in sorted(res.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,727 @@
+"""Host simulation of the MicroPython modules used by the ePy drivers.
+
+install() puts fake ``utime``, ``machine``, ``_thread``, ``urandom``,
+``micropython`` and ``framebuf`` (see simframebuf) modules into
+``sys.modules`` so the files in Module/ import unchanged on CPython.
+Time is a virtual clock: sleep_ms() advances it instantly, so a song of
+several minutes plays in milliseconds and every run is deterministic.
+
+    import epysim
+    epysim.install()
+    import epyBuzzerMusic
+    tim = epysim.Timer(0)
+    muz = epyBuzzerMusic.Music(tim)
+    muz.play("T120 L4 C D E")
+    epysim.run(muz.update, until=lambda: muz.getState() == 'STOP')
+    tim.segments()   # [(start_ms, end_ms, freq), ...]
+
+Coroutines (epyAsync) run the same way with run_async(), on an asyncio
+loop whose sleeps advance the virtual clock.
+"""
+
+import asyncio
+import math
+import random
+import selectors
+import sys
+import types
+
+import simframebuf
+
+
+class VirtualClock:
+    """ticks_ms()/ticks_us() source with MicroPython's wraparound."""
+
+    # MicroPython ports wrap ticks at 2**30 (TICKS_MAX + 1)
+    PERIOD = 1 << 30
+
+    def __init__(self, start_ms=0):
+        self.reset(start_ms)
+
+    def reset(self, start_ms=0):
+        self.us = start_ms * 1000
+        self.sleeps = 0
+
+    # --- utime API ---
+    def ticks_ms(self):
+        return (self.us // 1000) % self.PERIOD
+
+    def ticks_us(self):
+        return self.us % self.PERIOD
+
+    def ticks_cpu(self):
+        return self.ticks_us()
+
+    def ticks_add(self, ticks, delta):
+        return (ticks + delta) % self.PERIOD
+
+    def ticks_diff(self, ticks1, ticks2):
+        half = self.PERIOD // 2
+        return ((ticks1 - ticks2 + half) % self.PERIOD) - half
+
+    def sleep_ms(self, ms):
+        self.sleeps += 1
+        self.advance_us(int(ms) * 1000)
+
+    def sleep_us(self, us):
+        self.sleeps += 1
+        self.advance_us(int(us))
+
+    def sleep(self, s):
+        self.sleeps += 1
+        self.advance_us(int(s * 1000000))
+
+    def time(self):
+        return self.us // 1000000
+
+    # --- test helpers ---
+    def advance_us(self, us):
+        if us > 0:
+            self.us += us
+
+    def advance_ms(self, ms):
+        self.advance_us(int(ms) * 1000)
+
+    @property
+    def now(self):
+        return self.ticks_ms()
+
+
+clock = VirtualClock()
+
+
+def run(step, until=None, max_ms=None, slice_ms=None):
+    """Drive a cooperative ``step()`` that returns ms until it is due again.
+
+    Stops when `until()` is true or after `max_ms` of virtual time. With
+    `slice_ms` sleeps are capped like in a polling thread.
+    Returns the virtual ms elapsed.
+    """
+    start = clock.us
+    while True:
+        wait = step()
+        if until is not None and until():
+            break
+        elapsed = (clock.us - start) // 1000
+        if max_ms is not None:
+            if elapsed >= max_ms:
+                break
+            wait = min(wait, max_ms - elapsed)
+        if slice_ms is not None:
+            wait = min(wait, slice_ms)
+        clock.sleep_ms(max(wait, 0))
+    return (clock.us - start) // 1000
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the virtual clock instead of blocking."""
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError('event loop idle with nothing scheduled')
+        if timeout > 0:
+            clock.advance_us(math.ceil(timeout * 1000000))
+        return super().select(0)
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """asyncio loop on the virtual clock.
+
+    Sleeping tasks advance ``clock`` to their deadline at once, so
+    coroutines written for uasyncio run deterministically and in no real
+    time; only steps that advance the clock themselves (timed I2C,
+    clock stretching) take virtual time while they run.
+    """
+
+    def __init__(self):
+        super().__init__(_VirtualSelector())
+
+    def time(self):
+        return clock.us / 1000000
+
+
+def run_async(coro):
+    """Run `coro` to completion on a fresh VirtualEventLoop."""
+    loop = VirtualEventLoop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+# --- machine ---
+class Pin:
+    OUT = 1
+    IN = 0
+
+    class epy:
+        pass
+
+    def __init__(self, pin=None, mode=None, value=None):
+        self.id = pin
+        self.mode = mode
+        self._v = int(value or 0) & 1
+        self.writes = 0
+
+    def init(self, mode=None, value=None):
+        self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._v
+        self._v = int(v) & 0x1
+        self.writes += 1
+        return self._v
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+
+for _i in range(26):
+    setattr(Pin.epy, 'P{}'.format(_i), _i)
+
+
+class Timer:
+    """Timer that records what was scheduled instead of firing callbacks.
+
+    log: ``(t_ms, event, freq)`` with event 'init', 'callback' (enabled),
+         'stop' (callback None) or 'deinit'
+    """
+
+    def __init__(self, id=0, freq=0, setup_us=0):
+        self.id = id
+        self.freq = freq
+        self.setup_us = setup_us  # virtual cost of each init()
+        self.cb = None
+        self.log = []
+
+    def init(self, freq=0, **kwargs):
+        clock.advance_us(self.setup_us)
+        self.freq = freq
+        self.log.append((clock.now, 'init', freq))
+
+    def callback(self, cb):
+        self.cb = cb
+        self.log.append((clock.now, 'stop' if cb is None else 'callback',
+                         self.freq))
+
+    def deinit(self):
+        self.cb = None
+        self.log.append((clock.now, 'deinit', self.freq))
+
+    def fire(self, n=1):
+        """Invoke the callback `n` times as the hardware would."""
+        for _ in range(n):
+            if self.cb is not None:
+                self.cb(self)
+
+    def starts(self):
+        """``[(t_ms, freq)]`` for every time a callback was enabled."""
+        return [(t, f) for t, ev, f in self.log if ev == 'callback']
+
+    def segments(self):
+        """``[(start_ms, end_ms, freq)]`` while a callback was enabled."""
+        out = []
+        start = None
+        freq = 0
+        for t, ev, f in self.log:
+            if start is not None and ev in ('callback', 'stop', 'deinit'):
+                out.append((start, t, freq))
+                start = None
+            if ev == 'callback':
+                start = t
+                freq = f
+        if start is not None:
+            out.append((start, clock.now, freq))
+        return out
+
+    def callback_count(self):
+        """Callbacks the hardware would have run (rate * enabled time)."""
+        total = 0
+        for start, end, freq in self.segments():
+            total += freq * clock.ticks_diff(end, start) // 1000
+        return total
+
+
+class I2C:
+    """I2C master routing transactions to simulated devices by address.
+
+    Implements both the machine.I2C (writeto/readfrom/readfrom_into/
+    readfrom_mem_into) and the ePy/pyb style (send/recv/mem_read) APIs.
+    A device that does not acknowledge raises OSError like the hardware.
+
+    Every transaction adds its wire time (9 bit times per byte plus start
+    and stop) to ``bus_us``; with ``timed=True`` it also advances the
+    virtual clock, so throughput figures include the bus itself.
+    """
+
+    MASTER = 0
+    SLAVE = 1
+
+    def __init__(self, id=0, mode=0, baudrate=100000, freq=None, timed=False):
+        self.id = id
+        self.baudrate = freq or baudrate
+        self.timed = timed
+        self.devices = {}
+        self.log = []  # (t_ms, addr, 'w'|'r'|'m', nbytes)
+        self.bus_us = 0
+        self.nacks = 0
+
+    def attach(self, device):
+        self.devices[device.address] = device
+        return device
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def _wire(self, nbytes):
+        # address + data bytes at 9 bits each, 2 bit times for start/stop
+        us = ((nbytes + 1) * 9 + 2) * 1000000 // self.baudrate
+        self.bus_us += us
+        if self.timed:
+            clock.advance_us(us)
+
+    def _call(self, addr, nbytes, func, *args):
+        dev = self.devices.get(addr)
+        try:
+            if dev is None:
+                raise OSError(19)  # ENODEV: no ACK
+            data = func(dev, *args)
+        except OSError:
+            # the transfer stops after the unacknowledged address byte
+            self.nacks += 1
+            self._wire(0)
+            raise
+        self._wire(nbytes)
+        return data
+
+    # machine.I2C
+    def writeto(self, addr, buf, stop=True):
+        data = bytes(buf)
+        self._call(addr, len(data), lambda dev: dev.write(data))
+        self.log.append((clock.now, addr, 'w', len(data)))
+        return len(data)
+
+    def readfrom(self, addr, n, stop=True):
+        data = self._call(addr, n, lambda dev: dev.read(n))
+        self.log.append((clock.now, addr, 'r', n))
+        return data
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf))
+
+    def readfrom_mem(self, addr, memaddr, n):
+        # register write + repeated start + read
+        data = self._call(addr, n + 2,
+                          lambda dev: dev.mem_read(memaddr, n))
+        self.log.append((clock.now, addr, 'm', n))
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    # ePy / pyb style
+    def send(self, buf, addr=0):
+        if isinstance(buf, int):
+            buf = bytes([buf])
+        elif isinstance(buf, str):
+            buf = buf.encode()
+        self.writeto(addr, buf)
+
+    def recv(self, recv, addr=0):
+        if isinstance(recv, int):
+            return self.readfrom(addr, recv)
+        self.readfrom_into(addr, recv)
+        return recv
+
+    def mem_read(self, data, addr, memaddr):
+        if isinstance(data, int):
+            return self.readfrom_mem(addr, memaddr, data)
+        self.readfrom_mem_into(addr, memaddr, data)
+        return data
+
+
+def crc8(data):
+    """HTU21D CRC8 (polynomial 0x31, init 0) reference implementation."""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x131) if crc & 0x80 else (crc << 1)
+    return crc & 0xFF
+
+
+class HTU21DDevice:
+    """Simulated HTU21D behind an I2C address.
+
+    Hold commands (0xE3/0xE5 via mem_read) stretch the clock: virtual time
+    advances by the conversion time inside the transaction. No-hold
+    commands (0xF3/0xF5) return at once; reading before the conversion is
+    finished is NACKed (OSError). Set ``fail`` to a number of writes to
+    NACK, e.g. a trigger lost to a bus glitch.
+    """
+
+    address = 0x40
+    # (RH ms, T ms) by resolution bits, datasheet maximums
+    CONVERSION_MS = ((16, 50), (3, 13), (5, 25), (8, 7))
+
+    def __init__(self, temperature=25.0, humidity=50.0, address=0x40, *,
+                 latency_ms=None, crc_error_rate=0.0, nack_rate=0.0, seed=1):
+        self.address = address
+        self.temperature = temperature
+        self.humidity = humidity
+        self.user_reg = 0x02
+        self.pending = None  # (raw, ready_us)
+        self.commands = []
+        self.latency_ms = latency_ms
+        self.crc_error_rate = crc_error_rate
+        self.nack_rate = nack_rate
+        self._rng = random.Random(seed)
+        self.corrupted = 0
+        self.nacked = 0
+        self.fail = 0
+
+    def _res(self):
+        return ((self.user_reg >> 6) & 0x02) | (self.user_reg & 0x01)
+
+    def _raw(self, cmd):
+        if cmd in (0xE3, 0xF3):
+            raw = int((self.temperature + 46.85) * 65536 / 175.72)
+            return raw & 0xFFFC
+        raw = int((self.humidity + 6.0) * 65536 / 125.0)
+        return (raw & 0xFFFC) | 0x02  # status bit 1: humidity
+
+    def _conv_us(self, cmd):
+        rh, t = self.latency_ms or self.CONVERSION_MS[self._res()]
+        return int(1000 * (t if cmd in (0xE3, 0xF3) else rh))
+
+    def _result(self, raw):
+        msb_lsb = bytes([raw >> 8, raw & 0xFF])
+        frame = bytearray(msb_lsb + bytes([crc8(msb_lsb)]))
+        if self.crc_error_rate and self._rng.random() < self.crc_error_rate:
+            self.corrupted += 1
+            frame[self._rng.randrange(3)] ^= 1 << self._rng.randrange(8)
+        return bytes(frame)
+
+    def write(self, data):
+        if self.fail:
+            self.fail -= 1
+            self.nacked += 1
+            raise OSError(5)
+        cmd = data[0]
+        self.commands.append(cmd)
+        if cmd in (0xF3, 0xF5):
+            self.pending = (self._raw(cmd), clock.us + self._conv_us(cmd))
+        elif cmd == 0xE6:
+            # reserved bits 3..5 keep their value
+            self.user_reg = (self.user_reg & 0x38) | (data[1] & 0xC7)
+        elif cmd == 0xFE:
+            self.user_reg = 0x02
+            self.pending = None
+
+    def read(self, n):
+        if self.pending is None or clock.us < self.pending[1]:
+            raise OSError(19)  # still converting: NACK
+        if self.nack_rate and self._rng.random() < self.nack_rate:
+            self.nacked += 1
+            raise OSError(19)
+        raw = self.pending[0]
+        self.pending = None
+        return self._result(raw)[:n]
+
+    def mem_read(self, reg, n):
+        self.commands.append(reg)
+        if reg == 0xE7:
+            return bytes([self.user_reg])[:n]
+        if reg in (0xE3, 0xE5):
+            clock.advance_us(self._conv_us(reg))  # clock stretching
+            return self._result(self._raw(reg))[:n]
+        raise OSError(5)
+
+
+class WriteRecorder:
+    """I2C device that acknowledges and records every write.
+
+    ``writes`` holds (t_ms, bytes) per transaction; set ``fail`` to a
+    number of transactions to NACK (OSError) before acking again.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.writes = []
+        self.fail = 0
+
+    def write(self, data):
+        if self.fail:
+            self.fail -= 1
+            raise OSError(5)
+        self.writes.append((clock.now, data))
+
+    def read(self, n):
+        return bytes(n)
+
+    def payloads(self):
+        return [data for _, data in self.writes]
+
+    def clear(self):
+        del self.writes[:]
+
+
+class UART:
+    """UART whose wire is the virtual clock.
+
+    A byte takes 10 bit times (8N1). Everything written is kept in ``tx``
+    and ``writes`` holds (t_ms, nbytes) per write() call; with
+    ``timed=True`` write() blocks for the wire time like a full FIFO.
+    feed() plays the remote side: its bytes arrive one by one at the
+    line rate and land in a ``read_buf_len`` RX buffer, where bytes that
+    do not fit are lost and counted in ``overrun``. read(), readinto()
+    and readline() block for up to ``timeout`` ms like the firmware;
+    any() does not.
+    """
+
+    def __init__(self, id=1, baudrate=115200, bits=8, parity=None, stop=1,
+                 timeout=2000, timeout_char=2, read_buf_len=64,
+                 timed=False):
+        self.id = id
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.read_buf_len = read_buf_len
+        self.timed = timed
+        self.tx = bytearray()
+        self.writes = []
+        self.rx = bytearray()
+        self.overrun = 0
+        self._incoming = []  # (arrival_us, byte), oldest first
+        self._line_free_us = 0
+
+    def byte_us(self):
+        return 10 * 1000000 // self.baudrate
+
+    # --- remote side ---
+    def feed(self, data, delay_ms=0):
+        """Send `data` to the board, starting `delay_ms` from now."""
+        if isinstance(data, str):
+            data = data.encode()
+        t = max(clock.us + int(delay_ms) * 1000, self._line_free_us)
+        step = self.byte_us()
+        for byte in data:
+            t += step
+            self._incoming.append((t, byte))
+        self._line_free_us = t
+        return t // 1000  # ms when the last byte has arrived
+
+    def _receive(self):
+        incoming = self._incoming
+        n = 0
+        while n < len(incoming) and incoming[n][0] <= clock.us:
+            if len(self.rx) < self.read_buf_len:
+                self.rx.append(incoming[n][1])
+            else:
+                self.overrun += 1
+            n += 1
+        if n:
+            del incoming[:n]
+
+    # --- machine.UART ---
+    def write(self, buf):
+        if isinstance(buf, str):
+            buf = buf.encode()
+        n = len(buf)
+        self.tx.extend(buf)
+        self.writes.append((clock.now, n))
+        if self.timed:
+            clock.advance_us(n * self.byte_us())
+        return n
+
+    def any(self):
+        self._receive()
+        return len(self.rx)
+
+    def _wait(self):
+        """Block like the firmware: until a byte is received or `timeout`
+        passes."""
+        deadline = clock.us + self.timeout * 1000
+        self._receive()
+        while not self.rx:
+            nxt = self._incoming[0][0] if self._incoming else deadline
+            if nxt >= deadline:
+                clock.advance_us(deadline - clock.us)
+                return
+            clock.advance_us(nxt - clock.us)
+            self._receive()
+
+    def _take(self, nbytes):
+        n = len(self.rx) if nbytes is None else min(nbytes, len(self.rx))
+        if not n:
+            return None
+        data = bytes(self.rx[:n])
+        del self.rx[:n]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        """Waits up to `timeout` for the first byte, see read()."""
+        self._wait()
+        data = self._take(len(buf) if nbytes is None else
+                          min(nbytes, len(buf)))
+        if data is None:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def read(self, nbytes=None):
+        """Waits up to `timeout` for the first byte, then returns what has
+        arrived (the firmware also waits `timeout_char` between bytes;
+        here they are either in or not)."""
+        self._wait()
+        return self._take(nbytes)
+
+    def readline(self):
+        """Blocks like the firmware: waits up to `timeout` for a newline."""
+        deadline = clock.us + self.timeout * 1000
+        while True:
+            self._receive()
+            i = self.rx.find(b'\n')
+            if i >= 0:
+                return self._take(i + 1)
+            nxt = self._incoming[0][0] if self._incoming else deadline
+            if nxt >= deadline:
+                clock.advance_us(deadline - clock.us)
+                return self._take(None)
+            clock.advance_us(nxt - clock.us)
+
+
+class LED:
+    RGB = 0
+
+    def __init__(self, kind=0):
+        self.kind = kind
+        self.level = None
+        self.frames = []
+
+    def lightness(self, level):
+        self.level = level
+
+    def rgb_write(self, data):
+        self.frames.append((clock.now, tuple(data)))
+
+
+# --- _thread ---
+class _ThreadModule(types.ModuleType):
+    """Records started threads; tests run their bodies as steps."""
+
+    def __init__(self):
+        super().__init__('_thread')
+        self.started = []
+
+    def start_new_thread(self, func, args):
+        self.started.append((func, args))
+        return len(self.started)
+
+    def allocate_lock(self):
+        return _Lock()
+
+    def get_ident(self):
+        return 1
+
+
+class _Lock:
+    def __init__(self):
+        self.locked_ = False
+
+    def acquire(self, waitflag=1, timeout=-1):
+        if self.locked_:
+            return False
+        self.locked_ = True
+        return True
+
+    def release(self):
+        self.locked_ = False
+
+    def locked(self):
+        return self.locked_
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# --- micropython ---
+_scheduled = []
+
+
+def schedule(func, arg):
+    if len(_scheduled) >= 8:
+        # MicroPython's schedule queue is small and raises when full
+        raise RuntimeError('schedule queue full')
+    _scheduled.append((func, arg))
+
+
+def run_scheduled():
+    """Run callbacks queued with micropython.schedule(); return count."""
+    n = 0
+    while _scheduled:
+        func, arg = _scheduled.pop(0)
+        func(arg)
+        n += 1
+    return n
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    for key, val in attrs.items():
+        setattr(mod, key, val)
+    return mod
+
+
+utime = _module(
+    'utime',
+    ticks_ms=lambda: clock.ticks_ms(),
+    ticks_us=lambda: clock.ticks_us(),
+    ticks_cpu=lambda: clock.ticks_cpu(),
+    ticks_add=lambda t, d: clock.ticks_add(t, d),
+    ticks_diff=lambda a, b: clock.ticks_diff(a, b),
+    sleep_ms=lambda ms: clock.sleep_ms(ms),
+    sleep_us=lambda us: clock.sleep_us(us),
+    sleep=lambda s: clock.sleep(s),
+    time=lambda: clock.time(),
+)
+machine = _module('machine', Pin=Pin, Timer=Timer, LED=LED, I2C=I2C,
+                  UART=UART)
+thread = _ThreadModule()
+_rng = random.Random(0)
+urandom = _module('urandom', getrandbits=lambda n: _rng.getrandbits(n),
+                  seed=lambda s: _rng.seed(s))
+micropython = _module('micropython', const=lambda x: x, schedule=schedule,
+                      alloc_emergency_exception_buf=lambda n: None)
+
+MODULES = {
+    'utime': utime,
+    'machine': machine,
+    '_thread': thread,
+    'urandom': urandom,
+    'micropython': micropython,
+    'framebuf': simframebuf,
+}
+
+
+def install():
+    """Register the fake modules (idempotent)."""
+    for name, mod in MODULES.items():
+        sys.modules[name] = mod
+
+
+def reset(start_ms=0):
+    """Reset virtual time, thread records, scheduler and random seed."""
+    clock.reset(start_ms)
+    del thread.started[:]
+    del _scheduled[:]
+    _rng.seed(0)
@@ -0,0 +1,99 @@
+"""Host helpers for the SSD1306 tests and benchmarks.
+
+make_oled() gives a driver on the simulated bus with a WriteRecorder
+behind it. Frames are decoded from the bytes the driver sent and
+compared with the text images in tests/golden ('#' = pixel on);
+UPDATE_GOLDEN=1 rewrites them. gddram() models the controller RAM the
+transfers are written to. The widget dashboard of the epyWidgets tests
+and benchmark is built here too.
+"""
+
+import os
+
+import pytest
+
+from epysim import I2C, WriteRecorder
+from simframebuf import FrameBuffer1, to_text
+# the helpers also serve the benchmarks, which import the drivers flat
+from epyWidgets import Bar, Icon, Label, Number, Screen
+from ssd1306 import SSD1306_I2C
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+# 16x8 link icons, MONO_HLSB
+LINK_OFF = bytes([0x00, 0x00, 0x42, 0x00, 0x24, 0x00, 0x18, 0x00,
+                  0x18, 0x00, 0x24, 0x00, 0x42, 0x00, 0x00, 0x00])
+LINK_ON = bytes([0x00, 0x07, 0x00, 0x07, 0x00, 0x37, 0x00, 0x37,
+                 0x01, 0xB7, 0x01, 0xB7, 0x0D, 0xB7, 0x0D, 0xB7])
+
+
+def make_oled(width=128, height=64):
+    i2c = I2C(0, baudrate=400000)
+    dev = i2c.attach(WriteRecorder(0x3c))
+    oled = SSD1306_I2C(width, height, i2c)
+    dev.clear()
+    return oled, dev
+
+
+def sent_frame(oled, dev):
+    """The last frame on the bus, as a golden-image text."""
+    frames = [p for p in dev.payloads() if p[0] == 0x40]
+    assert frames, 'no frame was sent'
+    fb = FrameBuffer1(bytearray(frames[-1][1:]), oled.width, oled.height)
+    return to_text(fb)
+
+
+def check_golden(name, text):
+    path = os.path.join(GOLDEN, name + '.txt')
+    if os.environ.get('UPDATE_GOLDEN'):
+        os.makedirs(GOLDEN, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+    if not os.path.exists(path):
+        pytest.fail('missing golden image {} (run with UPDATE_GOLDEN=1)'
+                    .format(path))
+    with open(path) as f:
+        expected = f.read()
+    if text != expected:
+        diff = [i for i, (a, b) in enumerate(zip(text.splitlines(),
+                                                 expected.splitlines()))
+                if a != b]
+        pytest.fail('{} differs from the golden image in rows {}\n{}'
+                    .format(name, diff, text))
+
+
+def gddram(width, pages, payloads, ram=None, shift=0):
+    """Replay command/data transfers into a model of the controller RAM
+    (horizontal addressing mode)."""
+    ram = ram if ram is not None else bytearray(width * pages)
+    col = (shift, shift + width - 1)
+    page = (0, pages - 1)
+    c, p = col[0], page[0]
+    for data in payloads:
+        if data[0] == 0x00:
+            cmds = data[1:]
+            if cmds[0] == 0x21:
+                col = (cmds[1], cmds[2])
+                c = col[0]
+            if len(cmds) >= 4 and cmds[3] == 0x22:
+                page = (cmds[4], cmds[5])
+                p = page[0]
+        elif data[0] == 0x40:
+            for b in data[1:]:
+                ram[p * width + c - shift] = b
+                c += 1
+                if c > col[1]:
+                    c = col[0]
+                    p = p + 1 if p < page[1] else page[0]
+    return ram
+
+
+def dashboard(oled):
+    """The widget dashboard; returns the screen and value widgets."""
+    scr = Screen(oled)
+    scr.add(Label(0, 0, 'Living room', chars=13))
+    link = scr.add(Icon(112, 0, 16, 8, (LINK_OFF, LINK_ON)))
+    temp = scr.add(Number(0, 16, 'T {} C', 1, chars=10))
+    hum = scr.add(Number(0, 32, 'RH {} %', 0, chars=10))
+    bar = scr.add(Bar(0, 44, 128, 8, 0, 100))
+    return scr, temp, hum, bar, link
@@ -0,0 +1,157 @@
+"""Host report for epyProfile dumps.
+
+Run: python tests/profile_report.py [dump.txt | -]
+
+Reads the lines Profiler.dump() wrote (a file, or stdin with '-') and
+prints per-subsystem time: the subsystem is the probe name up to the
+first '.', "span" the summed probe time, "bus" the I2C time of the
+devices labelled with that subsystem and "cpu" the rest of the span.
+Percentiles come from the log2 histograms, so they are bucket upper
+bounds (capped at the maximum). Without an argument the epyAsync demo
+is profiled on the host simulation and its dump reported.
+"""
+
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def parse(lines):
+    """Dump lines -> {'ms': wall ms, 'probes', 'counters', 'buses'}."""
+    dump = {'ms': 0, 'probes': {}, 'counters': {}, 'buses': []}
+    for line in lines:
+        f = line.split()
+        if not f:
+            continue
+        if f[0] == 'T':
+            dump['ms'] = int(f[1])
+        elif f[0] == 'P':
+            count, total_ms, rem_us, max_us = (int(v) for v in f[2:6])
+            dump['probes'][f[1]] = {
+                'count': count, 'us': total_ms * 1000 + rem_us,
+                'max_us': max_us,
+                'hist': [int(v) for v in f[6].split(',')]}
+        elif f[0] == 'C':
+            dump['counters'][f[1]] = int(f[2])
+        elif f[0] == 'B':
+            tx, nbytes, errors, time_us = (int(v) for v in f[3:7])
+            dump['buses'].append({
+                'name': f[1], 'addr': int(f[2]), 'transactions': tx,
+                'bytes': nbytes, 'errors': errors, 'time_us': time_us})
+    return dump
+
+
+def percentile(hist, q):
+    """Upper bound in us of the bucket holding quantile q (0..1)."""
+    n = sum(hist)
+    if not n:
+        return 0
+    need = q * n
+    seen = 0
+    for b, c in enumerate(hist):
+        seen += c
+        if c and seen >= need:
+            return 0 if b == 0 else (1 << b) - 1
+    return (1 << (len(hist) - 1)) - 1
+
+
+def report(dump):
+    """Per-subsystem rows, largest span first."""
+    rows = {}
+    for name, p in dump['probes'].items():
+        r = rows.setdefault(name.split('.')[0], {
+            'calls': 0, 'span_us': 0, 'bus_us': 0, 'max_us': 0,
+            'hist': [0] * len(p['hist'])})
+        r['calls'] += p['count']
+        r['span_us'] += p['us']
+        r['max_us'] = max(r['max_us'], p['max_us'])
+        r['hist'] = [a + b for a, b in zip(r['hist'], p['hist'])]
+    for b in dump['buses']:
+        r = rows.get(b['name'])
+        if r is not None:
+            r['bus_us'] += b['time_us']
+    wall_us = dump['ms'] * 1000
+    out = []
+    for name, r in rows.items():
+        out.append({
+            'name': name, 'calls': r['calls'],
+            'span_ms': r['span_us'] / 1000,
+            'bus_ms': r['bus_us'] / 1000,
+            'cpu_ms': max(0, r['span_us'] - r['bus_us']) / 1000,
+            'share': r['span_us'] / wall_us if wall_us else 0.0,
+            'p50_us': min(r['max_us'], percentile(r['hist'], 0.5)),
+            'p99_us': min(r['max_us'], percentile(r['hist'], 0.99)),
+            'max_us': r['max_us']})
+    out.sort(key=lambda r: -r['span_ms'])
+    return out
+
+
+def format_report(dump):
+    rows = report(dump)
+    yield '{} ms profiled'.format(dump['ms'])
+    yield '{:10} {:>7} {:>9} {:>9} {:>9} {:>6} {:>7} {:>7} {:>7}'.format(
+        'subsystem', 'calls', 'span_ms', 'bus_ms', 'cpu_ms', 'share',
+        'p50_us', 'p99_us', 'max_us')
+    for r in rows:
+        yield ('{name:10} {calls:7} {span_ms:9.1f} {bus_ms:9.1f} '
+               '{cpu_ms:9.1f} {share:6.1%} {p50_us:7} {p99_us:7} '
+               '{max_us:7}'.format(**r))
+    for name, value in sorted(dump['counters'].items()):
+        yield 'counter {} = {}'.format(name, value)
+
+
+def demo_dump(ms=5000):
+    """Profile the epyAsync demo and return its dump lines."""
+    import demo_epyAsync
+    import epysim
+    from epyAsync import (Periodic, led_frames, music_playback, refresh,
+                          run_for, sensor_sampling)
+    from epyProfile import Profiler
+    parts = demo_epyAsync._setup()
+    prof = Profiler()
+    prof.install()
+    prof.add_bus(parts['bus'], {demo_epyAsync.OLED_ADDR: 'display',
+                                0x40: 'sensor'})
+    try:
+        epysim.run_async(run_for(
+            ms, led_frames(parts['leds'],
+                           Periodic(parts['leds'].fill_interval_ms)),
+            music_playback(parts['music']),
+            sensor_sampling(parts['sampler']),
+            refresh(parts['oled'], demo_epyAsync.draw_for(parts),
+                    Periodic(demo_epyAsync.OLED_PERIOD_MS))))
+        return list(prof.lines())
+    finally:
+        prof.uninstall()
+
+
+def usage():
+    """The "Run:" line of the module docstring."""
+    for line in __doc__.splitlines():
+        if line.startswith('Run: '):
+            return 'usage: ' + line[5:]
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) > 1 or args and args[0] != '-' and args[0].startswith('-'):
+        print(usage())
+        sys.exit(0 if args[0] in ('-h', '--help') else 2)
+    if len(sys.argv) > 1:
+        if sys.argv[1] == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(sys.argv[1]) as f:
+                lines = f.read().splitlines()
+    else:
+        lines = demo_dump()
+    for line in format_report(parse(lines)):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""Host implementation of MicroPython's ``framebuf`` module.
+
+epysim.install() registers it as ``framebuf`` so ssd1306.py and other
+display code run unchanged on CPython. The memory layout is bit-exact
+with the firmware for MONO_VLSB (SSD1306 pages: byte ``(y // 8) * stride
++ x``, bit ``y % 8``), MONO_HLSB and MONO_HMSB, and the drawing
+primitives follow the firmware's algorithms (fill_rect clipping,
+Bresenham line, scroll that leaves the vacated area as it was, blit with
+key and palette, text drawing only set bits).
+
+With NumPy the bulk operations (fill, fill_rect, scroll, blit, text, line)
+work on an unpacked pixel plane of the caller's buffer; without it every
+operation falls back to per-pixel Python, which is also the reference
+the NumPy path is tested against.
+
+text() uses a 5x7 font in 8x8 cells. Cell size, placement and clipping
+match the firmware, but the glyphs are not the firmware's petme128 font,
+so golden images that contain text are host images.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+MVLSB = MONO_VLSB
+
+# 5x7 glyphs for chr(32)..chr(127), 5 column bytes each, bit 0 at the top
+_FONT = bytes((
+    0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x5F, 0x00, 0x00,  # sp !
+    0x00, 0x07, 0x00, 0x07, 0x00, 0x14, 0x7F, 0x14, 0x7F, 0x14,  # " #
+    0x24, 0x2A, 0x7F, 0x2A, 0x12, 0x23, 0x13, 0x08, 0x64, 0x62,  # $ %
+    0x36, 0x49, 0x55, 0x22, 0x50, 0x00, 0x05, 0x03, 0x00, 0x00,  # & '
+    0x00, 0x1C, 0x22, 0x41, 0x00, 0x00, 0x41, 0x22, 0x1C, 0x00,  # ( )
+    0x08, 0x2A, 0x1C, 0x2A, 0x08, 0x08, 0x08, 0x3E, 0x08, 0x08,  # * +
+    0x00, 0x50, 0x30, 0x00, 0x00, 0x08, 0x08, 0x08, 0x08, 0x08,  # , -
+    0x00, 0x60, 0x60, 0x00, 0x00, 0x20, 0x10, 0x08, 0x04, 0x02,  # . /
+    0x3E, 0x51, 0x49, 0x45, 0x3E, 0x00, 0x42, 0x7F, 0x40, 0x00,  # 0 1
+    0x42, 0x61, 0x51, 0x49, 0x46, 0x21, 0x41, 0x45, 0x4B, 0x31,  # 2 3
+    0x18, 0x14, 0x12, 0x7F, 0x10, 0x27, 0x45, 0x45, 0x45, 0x39,  # 4 5
+    0x3C, 0x4A, 0x49, 0x49, 0x30, 0x01, 0x71, 0x09, 0x05, 0x03,  # 6 7
+    0x36, 0x49, 0x49, 0x49, 0x36, 0x06, 0x49, 0x49, 0x29, 0x1E,  # 8 9
+    0x00, 0x36, 0x36, 0x00, 0x00, 0x00, 0x56, 0x36, 0x00, 0x00,  # : ;
+    0x08, 0x14, 0x22, 0x41, 0x00, 0x14, 0x14, 0x14, 0x14, 0x14,  # < =
+    0x00, 0x41, 0x22, 0x14, 0x08, 0x02, 0x01, 0x51, 0x09, 0x06,  # > ?
+    0x32, 0x49, 0x79, 0x41, 0x3E, 0x7E, 0x11, 0x11, 0x11, 0x7E,  # @ A
+    0x7F, 0x49, 0x49, 0x49, 0x36, 0x3E, 0x41, 0x41, 0x41, 0x22,  # B C
+    0x7F, 0x41, 0x41, 0x22, 0x1C, 0x7F, 0x49, 0x49, 0x49, 0x41,  # D E
+    0x7F, 0x09, 0x09, 0x01, 0x01, 0x3E, 0x41, 0x41, 0x51, 0x32,  # F G
+    0x7F, 0x08, 0x08, 0x08, 0x7F, 0x00, 0x41, 0x7F, 0x41, 0x00,  # H I
+    0x20, 0x40, 0x41, 0x3F, 0x01, 0x7F, 0x08, 0x14, 0x22, 0x41,  # J K
+    0x7F, 0x40, 0x40, 0x40, 0x40, 0x7F, 0x02, 0x04, 0x02, 0x7F,  # L M
+    0x7F, 0x04, 0x08, 0x10, 0x7F, 0x3E, 0x41, 0x41, 0x41, 0x3E,  # N O
+    0x7F, 0x09, 0x09, 0x09, 0x06, 0x3E, 0x41, 0x51, 0x21, 0x5E,  # P Q
+    0x7F, 0x09, 0x19, 0x29, 0x46, 0x46, 0x49, 0x49, 0x49, 0x31,  # R S
+    0x01, 0x01, 0x7F, 0x01, 0x01, 0x3F, 0x40, 0x40, 0x40, 0x3F,  # T U
+    0x1F, 0x20, 0x40, 0x20, 0x1F, 0x7F, 0x20, 0x18, 0x20, 0x7F,  # V W
+    0x63, 0x14, 0x08, 0x14, 0x63, 0x03, 0x04, 0x78, 0x04, 0x03,  # X Y
+    0x61, 0x51, 0x49, 0x45, 0x43, 0x00, 0x7F, 0x41, 0x41, 0x00,  # Z [
+    0x02, 0x04, 0x08, 0x10, 0x20, 0x00, 0x41, 0x41, 0x7F, 0x00,  # \ ]
+    0x04, 0x02, 0x01, 0x02, 0x04, 0x40, 0x40, 0x40, 0x40, 0x40,  # ^ _
+    0x00, 0x01, 0x02, 0x04, 0x00, 0x20, 0x54, 0x54, 0x54, 0x78,  # ` a
+    0x7F, 0x48, 0x44, 0x44, 0x38, 0x38, 0x44, 0x44, 0x44, 0x20,  # b c
+    0x38, 0x44, 0x44, 0x48, 0x7F, 0x38, 0x54, 0x54, 0x54, 0x18,  # d e
+    0x08, 0x7E, 0x09, 0x01, 0x02, 0x08, 0x14, 0x54, 0x54, 0x3C,  # f g
+    0x7F, 0x08, 0x04, 0x04, 0x78, 0x00, 0x44, 0x7D, 0x40, 0x00,  # h i
+    0x20, 0x40, 0x44, 0x3D, 0x00, 0x00, 0x7F, 0x10, 0x28, 0x44,  # j k
+    0x00, 0x41, 0x7F, 0x40, 0x00, 0x7C, 0x04, 0x18, 0x04, 0x78,  # l m
+    0x7C, 0x08, 0x04, 0x04, 0x78, 0x38, 0x44, 0x44, 0x44, 0x38,  # n o
+    0x7C, 0x14, 0x14, 0x14, 0x08, 0x08, 0x14, 0x14, 0x18, 0x7C,  # p q
+    0x7C, 0x08, 0x04, 0x04, 0x08, 0x48, 0x54, 0x54, 0x54, 0x20,  # r s
+    0x04, 0x3F, 0x44, 0x40, 0x20, 0x3C, 0x40, 0x40, 0x20, 0x7C,  # t u
+    0x1C, 0x20, 0x40, 0x20, 0x1C, 0x3C, 0x40, 0x30, 0x40, 0x3C,  # v w
+    0x44, 0x28, 0x10, 0x28, 0x44, 0x0C, 0x50, 0x50, 0x50, 0x3C,  # x y
+    0x44, 0x64, 0x54, 0x4C, 0x44, 0x00, 0x08, 0x36, 0x41, 0x00,  # z {
+    0x00, 0x00, 0x7F, 0x00, 0x00, 0x00, 0x41, 0x36, 0x08, 0x00,  # | }
+    0x08, 0x04, 0x08, 0x10, 0x08, 0x7F, 0x7F, 0x7F, 0x7F, 0x7F,  # ~ DEL
+))
+
+
+def glyph(code):
+    """The 8 column bytes drawn for byte value `code`."""
+    if code < 32 or code > 127:
+        code = 127
+    o = (code - 32) * 5
+    return b'\x00' + _FONT[o:o + 5] + b'\x00\x00'
+
+
+class FrameBuffer:
+    """framebuf.FrameBuffer for the monochrome formats."""
+
+    def __init__(self, buffer, width, height, format, stride=None,
+                 use_numpy=True):
+        if format not in (MONO_VLSB, MONO_HLSB, MONO_HMSB):
+            raise ValueError('invalid format')
+        if stride is None:
+            stride = width
+        if format != MONO_VLSB:
+            stride = (stride + 7) & ~7
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = stride
+        if format == MONO_VLSB:
+            self._size = (height + 7) // 8 * stride
+        else:
+            self._size = stride // 8 * height
+        self._buf = memoryview(buffer).cast('B') \
+            if isinstance(buffer, memoryview) else memoryview(buffer)
+        if len(self._buf) < self._size:
+            raise ValueError('buffer too small')
+        self._arr = None
+        if np is not None and use_numpy and not self._buf.readonly:
+            self._arr = np.frombuffer(self._buf, np.uint8, self._size)
+
+    # --- bit layout ---
+    def _index(self, x, y):
+        if self.format == MONO_VLSB:
+            return (y >> 3) * self.stride + x, y & 7
+        index = (x + y * self.stride) >> 3
+        if self.format == MONO_HLSB:
+            return index, 7 - (x & 7)
+        return index, x & 7
+
+    def _get(self, x, y):
+        index, bit = self._index(x, y)
+        return (self._buf[index] >> bit) & 1
+
+    def _set(self, x, y, col):
+        index, bit = self._index(x, y)
+        b = self._buf[index]
+        self._buf[index] = (b & ~(1 << bit)) | ((col != 0) << bit)
+
+    def _unpack(self):
+        """Pixel bits of the whole buffer; plane() is its visible part."""
+        arr = self._arr
+        if self.format == MONO_VLSB:
+            pages = arr.reshape(-1, self.stride)
+            return np.unpackbits(pages, axis=0, bitorder='little')
+        rows = arr.reshape(self.height, self.stride // 8)
+        order = 'big' if self.format == MONO_HLSB else 'little'
+        return np.unpackbits(rows, axis=1, bitorder=order)
+
+    def _pack(self, bits):
+        if self.format == MONO_VLSB:
+            packed = np.packbits(bits, axis=0, bitorder='little')
+        else:
+            order = 'big' if self.format == MONO_HLSB else 'little'
+            packed = np.packbits(bits, axis=1, bitorder=order)
+        self._arr[:] = packed.reshape(-1)
+
+    def plane(self):
+        """Copy of the pixels as a (height, width) uint8 NumPy array."""
+        return self._unpack()[:self.height, :self.width].copy()
+
+    # --- drawing ---
+    def pixel(self, x, y, col=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        if col is None:
+            return self._get(x, y)
+        self._set(x, y, col)
+
+    def fill(self, col):
+        self.fill_rect(0, 0, self.width, self.height, col)
+
+    def fill_rect(self, x, y, w, h, col):
+        if h < 1 or w < 1 or x + w <= 0 or y + h <= 0 or \
+                y >= self.height or x >= self.width:
+            return
+        xend = min(self.width, x + w)
+        yend = min(self.height, y + h)
+        x = max(x, 0)
+        y = max(y, 0)
+        if self._arr is not None and self.format == MONO_VLSB:
+            # whole pages at once: one bit mask per page
+            pages = self._arr.reshape(-1, self.stride)
+            for p in range(y >> 3, ((yend - 1) >> 3) + 1):
+                lo = max(y - 8 * p, 0)
+                hi = min(yend - 8 * p, 8)
+                mask = (0xFF >> (8 - hi)) & (0xFF << lo)
+                if col:
+                    pages[p, x:xend] |= mask
+                else:
+                    pages[p, x:xend] &= ~mask & 0xFF
+            return
+        if self._arr is not None:
+            bits = self._unpack()
+            bits[y:yend, x:xend] = col != 0
+            self._pack(bits)
+            return
+        for yy in range(y, yend):
+            for xx in range(x, xend):
+                self._set(xx, yy, col)
+
+    def hline(self, x, y, w, col):
+        self.fill_rect(x, y, w, 1, col)
+
+    def vline(self, x, y, h, col):
+        self.fill_rect(x, y, 1, h, col)
+
+    def rect(self, x, y, w, h, col, fill=False):
+        if fill:
+            self.fill_rect(x, y, w, h, col)
+            return
+        self.fill_rect(x, y, w, 1, col)
+        self.fill_rect(x, y + h - 1, w, 1, col)
+        self.fill_rect(x, y, 1, h, col)
+        self.fill_rect(x + w - 1, y, 1, h, col)
+
+    def _line_points(self, x1, y1, x2, y2):
+        # the firmware's Bresenham walk, end point included
+        dx = x2 - x1
+        sx = 1 if dx > 0 else -1
+        dx = abs(dx)
+        dy = y2 - y1
+        sy = 1 if dy > 0 else -1
+        dy = abs(dy)
+        steep = dy > dx
+        if steep:
+            x1, y1 = y1, x1
+            dx, dy = dy, dx
+            sx, sy = sy, sx
+        e = 2 * dy - dx
+        pts = []
+        for _ in range(dx):
+            pts.append((y1, x1) if steep else (x1, y1))
+            while e >= 0:
+                y1 += sy
+                e -= 2 * dx
+            x1 += sx
+            e += 2 * dy
+        pts.append((x2, y2))
+        w, h = self.width, self.height
+        return [(x, y) for x, y in pts if 0 <= x < w and 0 <= y < h]
+
+    def line(self, x1, y1, x2, y2, col):
+        pts = self._line_points(x1, y1, x2, y2)
+        if self._arr is not None and pts:
+            bits = self._unpack()
+            xs, ys = zip(*pts)
+            bits[list(ys), list(xs)] = col != 0
+            self._pack(bits)
+            return
+        for x, y in pts:
+            self._set(x, y, col)
+
+    def scroll(self, xstep, ystep):
+        w, h = self.width, self.height
+        if xstep < 0:
+            if w + xstep <= 0:
+                return
+        elif xstep - 1 >= w - 1:
+            return
+        if ystep < 0:
+            if h + ystep <= 0:
+                return
+        elif ystep - 1 >= h - 1:
+            return
+        # destination and source windows; the firmware walks away from
+        # the shift so the copy behaves like a memmove
+        dx0, dx1 = max(0, xstep), min(w, w + xstep)
+        dy0, dy1 = max(0, ystep), min(h, h + ystep)
+        if self._arr is not None:
+            bits = self._unpack()
+            bits[dy0:dy1, dx0:dx1] = \
+                bits[dy0 - ystep:dy1 - ystep, dx0 - xstep:dx1 - xstep].copy()
+            self._pack(bits)
+            return
+        ys = range(dy0, dy1) if ystep <= 0 else range(dy1 - 1, dy0 - 1, -1)
+        xs = range(dx0, dx1) if xstep <= 0 else range(dx1 - 1, dx0 - 1, -1)
+        for y in ys:
+            for x in xs:
+                self._set(x, y, self._get(x - xstep, y - ystep))
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if x >= self.width or y >= self.height or \
+                -x >= fbuf.width or -y >= fbuf.height:
+            return
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = max(0, -x), max(0, -y)
+        x0end = min(self.width, x + fbuf.width)
+        y0end = min(self.height, y + fbuf.height)
+        if self._arr is not None and fbuf._arr is not None:
+            src = fbuf._unpack()[y1:y1 + y0end - y0, x1:x1 + x0end - x0]
+            if palette is not None:
+                src = palette._unpack()[0, :2][src]
+            bits = self._unpack()
+            dst = bits[y0:y0end, x0:x0end]
+            keep = src == key
+            dst[...] = np.where(keep, dst, src != 0)
+            self._pack(bits)
+            return
+        for yy in range(y0, y0end):
+            cx1 = x1
+            for xx in range(x0, x0end):
+                col = fbuf._get(cx1, y1)
+                if palette is not None:
+                    col = palette._get(col, 0)
+                if col != key:
+                    self._set(xx, yy, col)
+                cx1 += 1
+            y1 += 1
+
+    def text(self, s, x, y, col=1):
+        data = s.encode() if isinstance(s, str) else bytes(s)
+        if self._arr is not None and data:
+            cols = np.frombuffer(b''.join(glyph(c) for c in data), np.uint8)
+            cells = np.unpackbits(cols[None, :], axis=0,
+                                  bitorder='little')  # (8, 8 * len)
+            xs0, ys0 = max(0, x), max(0, y)
+            xs1 = min(self.width, x + cells.shape[1])
+            ys1 = min(self.height, y + 8)
+            if xs0 >= xs1 or ys0 >= ys1:
+                return
+            on = cells[ys0 - y:ys1 - y, xs0 - x:xs1 - x] != 0
+            bits = self._unpack()
+            bits[ys0:ys1, xs0:xs1][on] = col != 0
+            self._pack(bits)
+            return
+        for code in data:
+            for column in glyph(code):
+                if 0 <= x < self.width:
+                    yy = y
+                    while column:
+                        if column & 1 and 0 <= yy < self.height:
+                            self._set(x, yy, col)
+                        column >>= 1
+                        yy += 1
+                x += 1
+
+
+def FrameBuffer1(buffer, width, height, stride=None):
+    """Legacy constructor: MONO_VLSB."""
+    return FrameBuffer(buffer, width, height, MONO_VLSB, stride)
+
+
+def to_text(fb, on='#', off='.'):
+    """Pixels as lines of text, for golden images and failure output."""
+    return '\n'.join(
+        ''.join(on if fb._get(x, y) else off for x in range(fb.width))
+        for y in range(fb.height)) + '\n'
@@ -0,0 +1,281 @@
+import pytest
+
+from epysim import I2C, Timer, WriteRecorder, clock
+from Module import ePy4Digit
+from Module.ePy4Digit import FourDigit
+
+
+def make():
+    i2c = I2C(1)
+    dev = i2c.attach(WriteRecorder(FourDigit.DEFAULT_I2C_ADDR))
+    return dev, FourDigit(i2c)
+
+
+def test_first_draw_sends_everything():
+    dev, disp = make()
+    disp.show4number(1234)
+    assert dev.payloads() == [b'\x03\x01\x01', b'\x03\x02\x02',
+                              b'\x03\x03\x03', b'\x03\x04\x04',
+                              b'\x04\x00']
+
+
+def test_counter_only_sends_changed_digits():
+    dev, disp = make()
+    disp.show4number(0)
+    dev.clear()
+    for n in range(1, 101):
+        disp.show4number(n)
+    # 100 updates: 100 ones, 10 tens, 1 hundreds digit change
+    assert len(dev.writes) == 111
+    assert dev.payloads()[-3:] == [b'\x03\x02\x01', b'\x03\x03\x00',
+                                   b'\x03\x04\x00']
+    # five transactions per update without the shadow
+    assert 1 - len(dev.writes) / 500 > 0.75
+
+
+def test_temperature_and_colon_are_diffed():
+    dev, disp = make()
+    disp.show_temper(24.1)
+    dev.clear()
+    disp.show_temper(24.3)
+    assert dev.payloads() == [b'\x03\x03\x03']
+    disp.set_colon(True)
+    disp.set_colon(True)
+    assert dev.payloads()[-1:] == [b'\x04\x01']
+    assert disp.skipped > 0
+
+
+def test_show_time_invalidates_digits():
+    dev, disp = make()
+    disp.show4number(1200)
+    disp.show_time(12, 0)
+    disp.show_time(12, 0)
+    dev.clear()
+    disp.show4number(1200)  # same codes, but the device shows the time
+    assert len(dev.writes) == 5
+
+
+def test_refresh_resends_shadow():
+    dev, disp = make()
+    disp.show4number(42)
+    dev.clear()
+    disp.refresh()
+    assert dev.payloads() == [b'\x03\x01\x00', b'\x03\x02\x00',
+                              b'\x03\x03\x04', b'\x03\x04\x02',
+                              b'\x04\x00']
+    disp.show_time(7, 5)
+    dev.clear()
+    disp.refresh()
+    assert dev.payloads() == [b'\x02\x07\x05', b'\x04\x01']
+
+
+def test_failed_write_is_counted_and_retried(capsys):
+    dev, disp = make()
+    dev.fail = 1
+    disp.set_digit(1, 5)
+    assert dev.writes == []
+    assert disp.errors == 1 and disp.last_error == 5
+    assert capsys.readouterr().out == ''
+    disp.set_digit(1, 5)
+    assert dev.payloads() == [b'\x03\x01\x05']
+    assert disp.writes == 1
+
+
+class MachineI2C:
+    """machine.I2C-style bus (writeto only) recording the buffers."""
+
+    def __init__(self):
+        self.bufs = []
+        self.lookups = 0
+
+    def __getattribute__(self, name):
+        if name in ('send', 'writeto'):
+            object.__getattribute__(self, '__dict__')['lookups'] += 1
+        return object.__getattribute__(self, name)
+
+    def writeto(self, addr, buf):
+        self.bufs.append((addr, buf, bytes(buf)))
+
+
+def test_dispatch_resolved_once_and_buffer_reused():
+    i2c = MachineI2C()
+    disp = FourDigit(i2c)
+    lookups = i2c.lookups
+    for n in range(20):
+        disp.show4number(n * 7)
+    disp.show_time(9, 30)
+    assert i2c.lookups == lookups
+    bufs = [buf for _, buf, _ in i2c.bufs]
+    assert all(b.obj is disp._buf for b in bufs if isinstance(b, memoryview))
+    assert all(b is disp._buf for b in bufs if not isinstance(b, memoryview))
+    assert i2c.bufs[-2][2] == b'\x02\x09\x1e'
+    assert i2c.bufs[-1][2] == b'\x04\x01'
+    assert {addr for addr, _, _ in i2c.bufs} == {0x3D}
+
+
+def test_raw_i2c_write():
+    dev, disp = make()
+    assert disp.i2c_write([0x04, 1])
+    assert disp.i2c_write(b'\x01\x02\x03\x04')
+    assert dev.payloads() == [b'\x04\x01', b'\x01\x02\x03\x04']
+
+
+def test_bad_position():
+    dev, disp = make()
+    with pytest.raises(ValueError):
+        disp.set_digit(5, 1)
+
+
+B, M, DOT = ePy4Digit.BLANK, ePy4Digit.MINUS, ePy4Digit.DOT
+
+
+@pytest.mark.parametrize('n, kwargs, codes, ok', [
+    (0, {}, [B, B, B, 0], True),
+    (-5, {}, [B, B, M, 5], True),
+    (1234, {}, [1, 2, 3, 4], True),
+    (-999, {}, [M, 9, 9, 9], True),
+    (12345, {}, [M, M, M, M], False),
+    (-1000, {}, [M, M, M, M], False),
+    (42, {'zero_pad': True}, [0, 0, 4, 2], True),
+    (-42, {'zero_pad': True}, [M, 0, 4, 2], True),
+    (0xBEEF, {'base': 16}, [11, 14, 14, 15], True),
+    (-0x1F, {'base': 16}, [B, M, 1, 15], True),
+])
+def test_encode_int(n, kwargs, codes, ok):
+    out = bytearray(4)
+    assert ePy4Digit.encode_int(n, out, **kwargs) is ok
+    assert list(out) == codes
+
+
+@pytest.mark.parametrize('x, precision, codes', [
+    (3.14159, None, [3 | DOT, 1, 4, 2]),
+    (-3.14159, None, [M, 3 | DOT, 1, 4]),
+    (0.25, 2, [B, 0 | DOT, 2, 5]),
+    (24.1, 1, [B, 2, 4 | DOT, 1]),
+    (999.96, None, [1, 0, 0, 0]),
+    (-0.5, 0, [B, B, M, 1]),
+    (7, 0, [B, B, B, 7]),
+    (0.5, None, [0 | DOT, 5, 0, 0]),
+    (-0.5, None, [M, 0 | DOT, 5, 0]),
+    (-0.05, 2, [M, 0 | DOT, 0, 5]),
+])
+def test_encode_float(x, precision, codes):
+    out = bytearray(4)
+    assert ePy4Digit.encode_float(x, out, precision)
+    assert list(out) == codes
+
+
+def test_encode_float_overflow():
+    out = bytearray(4)
+    assert not ePy4Digit.encode_float(12345.6, out)
+    assert not ePy4Digit.encode_float(-1234, out, 0)
+
+
+@pytest.mark.parametrize('x, precision', [(-0.5, 3), (0.5, 4)])
+def test_encode_float_rejects_precision_without_room(x, precision):
+    with pytest.raises(ValueError):
+        ePy4Digit.encode_float(x, bytearray(4), precision)
+
+
+@pytest.mark.parametrize('text', ['AB.CD', b'AB.CD'])
+def test_encode_text(text):
+    out = bytearray(4)
+    assert ePy4Digit.encode_text(text, out) == 5
+    assert list(out) == [10, 11 | DOT, 12, 13]
+    assert ePy4Digit.encode_text(text, out, start=3) == 5
+    assert list(out) == [12, 13, B, B]
+
+
+def test_unknown_chars_are_blank_until_taught():
+    out = bytearray(4)
+    ePy4Digit.encode_text('Err', out)
+    assert list(out) == [14, B, B, B]
+    saved = ePy4Digit.CHAR_CODES[ord('r')]
+    try:
+        ePy4Digit.set_char_code('r', 20)
+        ePy4Digit.encode_text('Err', out)
+        assert list(out) == [14, 20, 20, B]
+    finally:
+        ePy4Digit.CHAR_CODES[ord('r')] = saved
+
+
+def shown(dev):
+    """Replay recorded writes into the 4 codes the display shows."""
+    codes = [None] * 4
+    frames = []
+    for _, data in dev.writes:
+        if data[0] == FourDigit.SHOW_FOUR_DIGITAL:
+            codes[data[1] - 1] = data[2]
+        elif data[0] == FourDigit.SHOW_COLON:
+            frames.append(list(codes))
+    return codes, frames
+
+
+def test_show_helpers_draw_codes():
+    dev, disp = make()
+    assert disp.show_int(-12)
+    assert shown(dev)[0] == [B, M, 1, 2]
+    disp.show_hex(0xC0DE)
+    assert shown(dev)[0] == [12, 0, 13, 14]
+    disp.show_float(21.5, 1)
+    assert shown(dev)[0] == [B, 2, 1 | DOT, 5]
+    disp.show_text('bEEF')
+    assert shown(dev)[0] == [11, 14, 14, 15]
+
+
+def test_marquee_scrolls_once_with_diffed_writes():
+    dev, disp = make()
+    mq = ePy4Digit.Marquee(disp, '12345', step_ms=250, loop=False)
+    mq.start()
+    windows = []
+    times = []
+    while mq.running:
+        pos = mq.pos
+        wait = mq.update()
+        if mq.pos != pos or not mq.running:
+            windows.append(shown(dev)[0])
+            times.append(clock.now)
+        clock.advance_ms(wait)
+    assert times == [i * 250 for i in range(8)]
+    assert windows == [
+        [B, B, B, 1], [B, B, 1, 2], [B, 1, 2, 3], [1, 2, 3, 4],
+        [2, 3, 4, 5], [3, 4, 5, B], [4, 5, B, B], [5, B, B, B]]
+    # only positions whose code changed went out on the bus
+    digit_writes = [d for _, d in dev.writes if d[0] == 3]
+    assert len(digit_writes) == 4 + 2 + 3 + 4 + 4 + 4 + 3 + 2  # not 8 * 4
+    assert sum(1 for d in digit_writes if d[2] == B) == 6
+
+
+def test_marquee_loops_from_timer_via_schedule(sim):
+    dev, disp = make()
+    tim = Timer(2)
+    mq = ePy4Digit.Marquee(disp, 'AB', step_ms=250, gap=2)
+    mq.start(tim)
+    assert tim.freq == 4
+    seen = []
+    for _ in range(8):
+        tim.fire()
+        # nothing touches the bus from the IRQ itself
+        assert sim.run_scheduled() == 1
+        seen.append(shown(dev)[0])
+    assert seen[:4] == [[10, 11, B, B], [11, B, B, 10],
+                        [B, B, 10, 11], [B, 10, 11, B]]
+    assert seen[4:] == seen[:4]
+    mq.stop()
+    assert tim.cb is None
+
+
+def test_marquee_timer_for_odd_step_uses_ticks_grid(sim):
+    dev, disp = make()
+    tim = Timer(2)
+    mq = ePy4Digit.Marquee(disp, '1234', step_ms=300)
+    mq.start(tim)
+    assert tim.freq == 100
+    steps = 0
+    for _ in range(100):  # one second of 10 ms timer ticks
+        tim.fire()
+        before = mq.pos
+        sim.run_scheduled()
+        steps += mq.pos != before
+        clock.advance_ms(10)
+    assert steps == 4  # at 0, 300, 600 and 900 ms
@@ -0,0 +1,91 @@
+import pytest
+
+import epysim
+from epysim import Pin, Timer, clock, run_async
+from Module import epyAsync
+from Module.epyAsync import Periodic, run_for, sleep_ms
+
+
+def test_virtual_loop_sleeps_advance_clock():
+    order = []
+
+    async def job(name, ms):
+        await sleep_ms(ms)
+        order.append((name, clock.now))
+
+    run_async(run_for(None, job('b', 30), job('a', 10), job('c', 20)))
+    # woken in deadline order, at their deadlines, in no real time
+    assert order == [('a', 10), ('c', 20), ('b', 30)]
+
+
+def test_periodic_grid_and_dropped_frames():
+    tick = Periodic(33)
+    starts = []
+
+    async def job():
+        while True:
+            late = await tick.wait()
+            starts.append((clock.now, late))
+            if len(starts) == 3:
+                clock.advance_ms(80)  # a step that overruns two slots
+
+    run_async(run_for(200, job()))
+    # slot 99 starts 47 ms late, slot 132 is dropped, 165 is on time
+    assert starts[:5] == [(0, 0), (33, 0), (66, 0), (146, 47), (165, 0)]
+    assert tick.dropped == 1 and tick.late_max == 47
+
+
+def test_run_for_cancels_tasks():
+    async def forever():
+        while True:
+            await sleep_ms(7)
+
+    run_async(run_for(100, forever(), forever()))
+    assert clock.now == 100
+
+
+def test_music_without_thread(sim):
+    from Module.epyBuzzerMusic import Music
+    muz = Music(Timer(0), pin=Pin.epy.P9, thread=False)
+    assert sim.thread.started == []
+    muz.play("T120 L4 C D E")
+    run_async(run_for(2000, epyAsync.music_playback(muz)))
+    assert [t for t, _ in muz._timer.starts()] == [0, 500, 1000]
+    assert muz.getState() == 'STOP'
+
+
+def test_led_frames_follow_beat_clock():
+    from Module.epyBuzzerMusic import Music
+    from Module.epyRGB_MutilMode import RGBModeDisplay
+    muz = Music(Timer(0), pin=Pin.epy.P9, thread=False)
+    disp = RGBModeDisplay(num_leds=8)
+    disp.set_beat_clock(muz.clock, ticks_per_frame=16)
+    muz.play("T100 L4 C D E F G A B >C")
+    run_async(run_for(4000, epyAsync.led_frames(disp),
+                      epyAsync.music_playback(muz)))
+    frames = [t for t, _ in disp.led.frames]
+    # one frame per beat, on the note starts
+    assert frames[:6] == [i * 600 for i in range(6)]
+
+
+def test_sensor_sampling_awaits_conversions():
+    from Module.htu21d import HTU21D
+    from Module.epySensorSampler import HTU21DSampler
+    i2c = epysim.I2C(0)
+    i2c.attach(epysim.HTU21DDevice(21.5, 40.0))
+    sampler = HTU21DSampler(HTU21D(i2c), period_ms=500)
+    run_async(run_for(2100, epyAsync.sensor_sampling(sampler)))
+    assert sampler.samples == 5 and sampler.missed == 0
+    assert sampler.temperature.last() == pytest.approx(2150, abs=2)
+
+
+def test_demo_runs_without_dropped_frames():
+    import demo_epyAsync
+    res = demo_epyAsync.run_async(3000)
+    assert res['led_frames'] == 3000 // 33 + 1
+    assert res['led_dropped'] == 0
+    assert res['led_late_max_ms'] < 33
+    assert res['samples'] == 3 and res['oled_frames'] == 12
+    assert res['notes'] > 0
+    blocking = demo_epyAsync.run_blocking(3000)
+    assert blocking['led_dropped'] > 0
@@ -0,0 +1,171 @@
+import pytest
+
+import trace_replay
+from epysim import I2C, HTU21DDevice, Pin, WriteRecorder, clock
+from Module.epyBusTrace import SPI_WRITE, BusTrace, parse
+from Module.htu21d import HTU21D
+from Module.ssd1306 import SSD1306_I2C, SSD1306_SPI
+# the drivers import the bus module by its device name
+from epyI2CBus import READ, READ_MEM, WRITE, I2CBus
+
+
+def make_bus():
+    i2c = I2C(0, I2C.MASTER, baudrate=400000)
+    sensor = i2c.attach(HTU21DDevice(25.0, 50.0))
+    oled = i2c.attach(WriteRecorder(0x3c))
+    return I2CBus(i2c), sensor, oled
+
+
+def test_records_and_parse():
+    bus, sensor, oled = make_bus()
+    trace = BusTrace(256)
+    trace.attach(bus)
+    bus.write(0x3c, b'\x00\xaf')  # not started: not recorded
+    trace.start()
+    clock.advance_us(300)
+    bus.write(0x3c, bytes([0x40]) + bytes(20))
+    clock.advance_ms(2)
+    bus.read_mem_into(0x40, 0xE7, bytearray(1))
+    bus.write(0x40, b'\xf3')
+    with pytest.raises(OSError):
+        bus.readinto(0x40, bytearray(3))  # still converting: NACK
+    clock.advance_ms(60)
+    bus.readinto(0x40, bytearray(3))
+    assert trace.records == 5 and trace.dropped == 0
+    data = bytes(trace.data())
+    assert data[:4] == b'eT\x01\x02'
+    # flags, address, varint dt (1..3 bytes here), varint length, head
+    assert len(data) == 4 + (1 + 1 + 2 + 1 + 2) + 6 + 5 + 4 + 6
+    assert list(parse(data)) == [
+        (300, WRITE, 0x3c, 21, True, 0, b'\x40\x00'),
+        (2300, READ_MEM, 0x40, 1, True, 0, b'\xe7'),
+        (2300, WRITE, 0x40, 1, True, 0, b'\xf3'),
+        (2300, READ, 0x40, 3, False, 0, b''),
+        (62300, READ, 0x40, 3, True, 0, b''),
+    ]
+    trace.detach(bus)
+    bus.write(0x3c, b'\x00\xaf')
+    assert trace.records == 5
+
+
+def test_full_buffer_keeps_a_prefix():
+    bus, sensor, oled = make_bus()
+    trace = BusTrace(40, head=1)
+    trace.attach(bus)
+    trace.start()
+    for i in range(20):
+        bus.write(0x3c, bytes([0x00, i]))
+    assert trace.full and trace.records + trace.dropped == 20
+    assert trace.used() <= 40
+    records = list(parse(trace.data()))
+    assert len(records) == trace.records
+    assert all(r[6] == b'\x00' for r in records)
+    # a truncated record at the end is ignored
+    assert len(list(parse(bytes(trace.data())[:-1]))) == trace.records - 1
+    with pytest.raises(ValueError):
+        list(parse(b'eL\x01\x00'))
+
+
+class FakeSPI:
+    def __init__(self):
+        self.writes = []
+
+    def init(self, **kwargs):
+        pass
+
+    def write(self, buf):
+        self.writes.append(bytes(buf))
+
+
+def test_spi_writes_keep_the_dc_level(tmp_path):
+    trace = BusTrace(4096)
+    dc = Pin()
+    spi = trace.spi(FakeSPI(), addr=1, dc=dc)
+    oled = SSD1306_SPI(128, 64, spi, dc, Pin(), Pin())
+    init_writes = len(spi.spi.writes)
+    trace.start()
+    oled.show()
+    path = str(tmp_path / 'spi.trc')
+    assert trace.save(path) == trace.used()
+    records = trace_replay.load(path)
+    assert [r[5] for r in records] == [0] * 6 + [1]
+    assert records[-1][1] == SPI_WRITE and records[-1][3] == 1024
+    s = trace_replay.summary(records)
+    assert s['spi 1']['ops'] == {'cmd': 6, 'data': 1}
+    assert len(spi.spi.writes) == init_writes + 7
+
+
+def test_replay_reproduces_the_recording():
+    data = trace_replay.demo_trace('changes', 20000)
+    records = list(parse(data))
+    summary = trace_replay.summary(records)
+    played = trace_replay.replay(records)
+    assert set(played) == set(summary)
+    for dev, s in summary.items():
+        assert played[dev]['transactions'] == s['transactions']
+        assert played[dev]['bytes'] == s['bytes']
+        assert played[dev]['mismatches'] == 0
+    assert summary['i2c 0x40']['ops']['w 0xf3'] == pytest.approx(20, abs=1)
+
+
+def test_replay_flags_changed_timing():
+    bus, sensor, oled = make_bus()
+    trace = BusTrace(256)
+    trace.attach(bus)
+    trace.start()
+    bus.write(0x40, b'\xf3')
+    clock.advance_ms(60)
+    bus.readinto(0x40, bytearray(3))
+    records = list(parse(trace.data()))
+    assert trace_replay.replay(records)['i2c 0x40']['mismatches'] == 0
+    # the same read 10 ms after the command comes too early
+    early = [records[0], (10000,) + records[1][1:]]
+    assert trace_replay.replay(early)['i2c 0x40']['mismatches'] == 1
+
+
+class UnbatchedOLED(SSD1306_I2C):
+    """An older driver sending every command in its own transaction."""
+
+    def write_cmds(self, cmds):
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
+
+def _trace_frames(cls):
+    bus, sensor_dev, oled_dev = make_bus()
+    oled = cls(128, 64, bus)
+    sensor = HTU21D(bus)
+    trace = BusTrace(4096)
+    trace.attach(bus)
+    trace.start()
+    for i in range(5):
+        oled.fill(i & 1)
+        oled.show()
+        sensor.read_temperature()
+    return list(parse(trace.data()))
+
+
+def test_compare_spots_extra_commands():
+    base = trace_replay.summary(_trace_frames(SSD1306_I2C))
+    new = trace_replay.summary(_trace_frames(UnbatchedOLED))
+    assert trace_replay.compare(base, base) == []
+    rows = {(r[0], r[1]): r[2:] for r in trace_replay.compare(base, new)}
+    assert rows[('i2c 0x3c', 'op w 0x00')] == (5, 30, True)
+    assert rows[('i2c 0x3c', 'transactions')] == (10, 35, True)
+    assert ('i2c 0x40', 'transactions') not in rows
+    # fewer transactions are listed but are no regression
+    back = trace_replay.compare(new, base)
+    assert not any(r[4] for r in back)
+
+
+@pytest.mark.parametrize('args, code', [
+    (['--help'], 0), (['-h'], 0), (['-x', 'a.trc'], 2),
+    (['a.trc', 'b.trc', 'c.trc'], 2),
+])
+def test_main_prints_usage(monkeypatch, capsys, args, code):
+    monkeypatch.setattr('sys.argv', ['trace_replay.py'] + args)
+    with pytest.raises(SystemExit) as exc:
+        trace_replay.main()
+    assert exc.value.code == code
+    assert capsys.readouterr().out == \
+        'usage: python tests/trace_replay.py [trace.trc [baseline.trc]]\n'
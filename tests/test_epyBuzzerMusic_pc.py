@@ -1,110 +1,10 @@
-from Module import epyBuzzerMusic as m
-import pytest
-import sys
-import types
-import time
-import threading
 import os
 
-# make sure repo root is importable
-repo_root = r"d:\個人資料庫\Github\ePy_SDK"
-if repo_root not in sys.path:
-    sys.path.insert(0, repo_root)
-
-# ---- fake utime (ModuleType) ----
-fake_utime = types.ModuleType('utime')
-
-
-def sleep_ms(ms):
-    time.sleep(ms / 1000.0)
-
-
-def ticks_ms():
-    return int(time.time() * 1000)
-
-
-fake_utime.sleep_ms = sleep_ms
-fake_utime.ticks_ms = ticks_ms
-sys.modules['utime'] = fake_utime
-
-# ---- fake _thread (ModuleType) ----
-fake_thread = types.ModuleType('_thread')
-
-
-def start_new_thread(func, args):
-    t = threading.Thread(target=func, args=args, daemon=True)
-    t.start()
-    return t
-
-
-fake_thread.start_new_thread = start_new_thread
-sys.modules['_thread'] = fake_thread
-
-# ---- fake machine (ModuleType with Pin/Timer classes) ----
-machine_mod = types.ModuleType('machine')
-
-
-class Pin:
-    OUT = 0
-
-    class epy:
-        P9 = 9
-        P22 = 22
-
-    def __init__(self, pin, mode=None):
-        self._v = 0
-
-    def value(self, v=None):
-        if v is None:
-            return int(self._v)
-        self._v = int(v) & 0x1
-        return self._v
-
-
-class Timer:
-    def __init__(self, id=0):
-        self._freq = 0
-        self._cb = None
-        self._thr = None
-        self._stop = threading.Event()
-
-    def init(self, freq=0):
-        self._freq = freq
+import pytest
 
-    def callback(self, cb):
-        # stop old thread
-        if getattr(self, '_thr', None):
-            self._stop.set()
-            try:
-                self._thr.join()
-            except Exception:
-                pass
-            self._stop = threading.Event()
-            self._thr = None
-        self._cb = cb
-        if cb is None:
-            return
-        if not self._freq:
-            return
-        interval = 1.0 / float(self._freq)
-
-        def run():
-            while not self._stop.is_set():
-                try:
-                    cb(self)
-                except Exception:
-                    pass
-                time.sleep(interval)
-
-        self._thr = threading.Thread(target=run, daemon=True)
-        self._thr.start()
-
-
-machine_mod.Pin = Pin
-machine_mod.Timer = Timer
-sys.modules['machine'] = machine_mod
-
-# ---- import module under test (after fake modules injected) ----
+import epysim
+from epysim import Pin, Timer, clock
+from Module import epyBuzzerMusic as m
 
 # Optional: enable Windows audio output for buzzer simulation when
 # running tests locally. Controlled by environment variable ENABLE_AUDIO.
@@ -131,11 +31,34 @@ if os.name == 'nt' and os.environ.get('ENABLE_AUDIO'):
         m.Music._playFreq = _playFreq_with_audio
 
 
+def play_all(muz, slice_ms=None):
+    """Run the playback loop on the virtual clock until it stops."""
+    return epysim.run(muz.update, until=lambda: muz.getState() != 'START',
+                      slice_ms=slice_ms)
+
+
+def run_thread_loop(muz, ms):
+    """Emulate play_music() (SLICE_MS sleeps) for `ms` of virtual time."""
+    epysim.run(muz.update, max_ms=ms, slice_ms=m.SLICE_MS)
+
+
+def tone(note):
+    """Timer frequency used for MIDI `note` (two toggles per period)."""
+    return int(m.note_freq(note) * 2)
+
+
+def test_playback_thread_started(sim):
+    muz = m.Music(Timer(0), pin=Pin.epy.P9)
+    assert sim.thread.started == [(muz.play_music, ())]
+
+
 def test_playFreq_sync():
     t = Timer(0)
     muz = m.Music(t, pin=Pin.epy.P9)
     muz.playFreq(440, 150)
     assert muz.getState() == 'STOP'
+    assert clock.now == 150
+    assert t.segments() == [(0, 150, 880)]
 
 
 def test_play_sequence():
@@ -143,12 +66,244 @@ def test_play_sequence():
     muz = m.Music(t, pin=Pin.epy.P22)
     muz.tempo(4, 200)
     muz.play(["A4:1", "R:1"], loop=False)
-    timeout = time.time() + 5
-    while muz.getState() != 'STOP' and time.time() < timeout:
-        time.sleep(0.05)
+    assert play_all(muz) == 150
+    assert muz.getState() == 'STOP'
+    assert t.segments() == [(0, 75, 880)]
+
+
+@pytest.mark.parametrize('song', [
+    "t:d=32,o=4,b=240:a,p",
+    "T240 L32 A R",
+    bytes(m.compile_text("T240 L32 A R")),
+])
+def test_play_text_and_binary(song):
+    t = Timer(1)
+    muz = m.Music(t, pin=Pin.epy.P22)
+    muz.play(song, loop=False)
+    assert play_all(muz) == 2 * 31
+    assert t.segments() == [(0, 31, 880)]
+
+
+def test_loop_keeps_playing():
+    t = Timer(0)
+    muz = m.Music(t, pin=Pin.epy.P9)
+    muz.play("T120 L4 C D", loop=True)
+    run_thread_loop(muz, 4999)
+    assert muz.getState() == 'START'
+    assert [f for _, f in t.starts()] == [tone(60), tone(62)] * 5
+
+
+def test_long_song_full_playback():
+    # ~25 minutes of music verified note by note in virtual time
+    text = "T150 L8 O4 " + "C D E F G A B >C< R16 " * 700
+    blob = m.compile_text(text)
+    t = Timer(0)
+    muz = m.Music(t, pin=Pin.epy.P9)
+    muz.play(blob)
+    elapsed = play_all(muz)
+    reader = m.SongReader(blob)
+    assert elapsed == reader.duration_ms()
+    segs = t.segments()
+    assert len(segs) == 8 * 700
+    assert [f for _, _, f in segs[:8]] == \
+        [tone(n) for n in (60, 62, 64, 65, 67, 69, 71, 72)]
+    # 200 ms per eighth note at 150 bpm
+    assert all(end - start == 200 for start, end, _ in segs[:8])
+    assert t.callback_count() == sum(
+        f * (end - start) // 1000 for start, end, f in segs)
+
+
+def test_no_cumulative_drift(sim):
+    sim.reset(start_ms=clock.PERIOD - 5000)  # wraps during the song
+    tim = Timer(0, setup_us=3000)  # 3 ms setup cost per note
+    muz = m.Music(tim, pin=Pin.epy.P9)
+    # 97 bpm gives a non-integer tick length (154.6 ms)
+    muz.tempo(4, 97)
+    song = ["C4:1", "E:2", "G:3", "R:1"] * 1000
+    muz.play(song)
+    t0 = clock.now
+    play_all(muz)
+
+    total_ticks = 7 * 1000
+    expected = total_ticks * 60000 // (97 * 4)
+    assert clock.ticks_diff(clock.now, t0) == expected
+    # every tone starts on its exact beat-grid position, only delayed by
+    # its own setup cost, never by the accumulated cost of earlier notes
+    pos = 0
+    starts = iter(tim.starts())
+    for _ in range(1000):
+        for ticks in (1, 2, 3):
+            when, _ = next(starts)
+            grid = clock.ticks_add(t0, pos * 60000 // (97 * 4))
+            assert clock.ticks_diff(when, grid) == 3
+            pos += ticks
+        pos += 1  # rest
+
+
+def test_beat_clock_wraparound(sim):
+    sim.reset(start_ms=clock.PERIOD - 5000)
+    clk = m.BeatClock(bpm=120, ticks_per_beat=4, origin=clock.now)
+    assert clk.deadline(8) == clock.ticks_add(clock.now, 1000)
+    clock.advance_ms(10 * 60000 + 1250)
+    assert clk.tick_at() == 10 * 480 + 10
+    assert clk.beat_at() == 10 * 120 + 2
+    assert clock.ticks_diff(clk.deadline(10 * 480 + 12), clock.now) == 250
+
+
+def test_rgb_frames_follow_music_beat():
+    from Module.epyRGB_MutilMode import RGBModeDisplay
+    muz = m.Music(Timer(0), pin=Pin.epy.P9)
+    disp = RGBModeDisplay(num_leds=8)
+    disp.set_beat_clock(muz.clock, ticks_per_frame=16)  # one frame per beat
+    muz.play("T100 L4 C D E F G A B >C")
+    frames = []
+
+    def step():
+        before = disp.phase
+        disp.fill_if_due()
+        if disp.phase != before:
+            frames.append(clock.now)
+        return min(muz.update(), 1)
+
+    epysim.run(step, until=lambda: muz.getState() != 'START')
+    # 100 bpm: a frame exactly every 600 ms, on the note starts
+    assert frames[:8] == [i * 600 for i in range(8)]
+    assert frames[:8] == [t for t, _ in muz._timer.starts()]
+
+
+def test_note_queue_ring():
+    q = m.NoteQueue(3)
+    assert q.put(440, 100) and q.put(0, 5) and q.put(65535, 65535)
+    assert not q.put(1, 1)
+    assert len(q) == 3 and q.free() == 0
+    got = []
+    while q.pop():
+        got.append((q.freq, q.ms))
+    assert got == [(440, 100), (0, 5), (65535, 65535)]
+    q.put(1, 2)
+    q.clear()
+    assert not q.pop()
+
+
+def test_note_queue_splits_long_notes():
+    q = m.NoteQueue(4)
+    assert q.put(440, 150000)  # more than 2 * 65535 ms
+    assert len(q) == 3
+    # a note needing more entries than are free is not queued at all
+    assert not q.put(880, 70000)
+    assert len(q) == 3
+    got = []
+    while q.pop():
+        got.append((q.freq, q.ms))
+    assert got == [(440, 65535), (440, 65535), (440, 150000 - 2 * 65535)]
+    tim = Timer(0)
+    muz = m.Music(tim, pin=Pin.epy.P9)
+    assert muz.beep(1000, 70000)
+    run_thread_loop(muz, 70100)
+    # the second part follows the first one without a gap
+    assert tim.segments() == [(0, 65535, 2000), (65535, 70000, 2000)]
+
+
+def test_stop_does_not_block():
+    muz = m.Music(Timer(0), pin=Pin.epy.P9)
+    muz.play("T30 L1 C C C")
+    muz.update()
+    t0 = clock.now
+    muz.stop()
+    assert clock.now == t0
+    assert muz.getState() == 'STOP'
+    muz.update()
+    assert not muz._sounding and muz.music is None
+
+
+def test_beep_preempts_with_low_latency():
+    tim = Timer(0)
+    muz = m.Music(tim, pin=Pin.epy.P9)
+    muz.play("T30 L1 C D")  # two 8 s notes
+    run_thread_loop(muz, 1003)
+    t_beep = clock.now
+    assert muz.beep(2000, 40) and muz.beep(1000, 40)
+    run_thread_loop(muz, 200)
+    when, freq = tim.starts()[1]
+    assert freq == 4000
+    assert clock.ticks_diff(when, t_beep) < 10
+    # the second beep does not cut the first one short
+    second, freq = tim.starts()[2]
+    assert freq == 2000 and clock.ticks_diff(second, when) == 40
+    # the song resumes with its next note right after the beeps
+    when, freq = tim.starts()[3]
+    assert freq == tone(62)
+    assert clock.ticks_diff(when, t_beep) < 90
+
+
+def test_beeps_play_back_to_back():
+    tim = Timer(0)
+    muz = m.Music(tim, pin=Pin.epy.P9)
+    assert muz.beep(1000, 100) and muz.beep(2000, 100)
+    run_thread_loop(muz, 300)
+    assert tim.segments() == [(0, 100, 2000), (100, 200, 4000)]
+
+
+def test_play_replaces_song_with_low_latency():
+    tim = Timer(0)
+    muz = m.Music(tim, pin=Pin.epy.P9)
+    muz.play("T30 L1 C")
+    run_thread_loop(muz, 2001)
+    t_play = clock.now
+    muz.play("T120 A")
+    run_thread_loop(muz, 20)
+    when, freq = tim.starts()[-1]
+    assert freq == 880
+    assert clock.ticks_diff(when, t_play) < 10
+
+
+def test_enqueue_append_and_interrupt():
+    tim = Timer(0)
+    muz = m.Music(tim, pin=Pin.epy.P9)
+    assert muz.enqueue("T120 L8 C D") == 2
+    assert muz.enqueue("T120 L8 E") == 1
+    run_thread_loop(muz, 510)
+    assert [f for _, f in tim.starts()] == \
+        [2 * round(m.note_freq(n)) for n in (60, 62, 64)]
+    # queued notes chain on deadlines: 250 ms apart
+    assert clock.ticks_diff(tim.starts()[2][0], tim.starts()[0][0]) == 500
+    # G G G wait behind the sounding E; the interrupt drops them and
+    # cuts the E short
+    muz.enqueue("T120 L8 G G G")
+    run_thread_loop(muz, 100)
+    t_int = clock.now
+    muz.enqueue("T120 B", interrupt=True)
+    run_thread_loop(muz, 510)
+    freqs = [f for _, f in tim.starts()]
+    assert freqs[-2:] == [2 * round(m.note_freq(n)) for n in (64, 71)]
+    assert 2 * round(m.note_freq(67)) not in freqs
+    assert clock.ticks_diff(tim.starts()[-1][0], t_int) < 10
     assert muz.getState() == 'STOP'
 
 
+def test_enqueue_stops_when_full():
+    muz = m.Music(Timer(0), pin=Pin.epy.P9)
+    assert muz.enqueue("L16 " + "C" * 40) == m.QUEUE_SIZE
+
+
+def test_note_names_need_no_per_instance_table():
+    muz = m.Music(Timer(0), pin=Pin.epy.P9, thread=False)
+    assert not hasattr(muz, '_freq_cache')
+    assert m.Music.tone_idx is m.NOTE_OFFSETS
+    assert muz._get_freq_from_cache('A', 4) == 440.0
+    assert muz._get_freq_from_cache('C#', 5) == \
+        pytest.approx(554.365, abs=1e-3)
+    assert muz._get_freq_from_cache('R', 3) == 0
+    assert muz._get_freq_from_cache('H', 3) == 0
+
+
+def test_benchmarks_run():
+    import bench_epyBuzzerMusic as bench
+    results = bench.run(notes=200)
+    assert results['parse_mml_notes_per_s'] > 0
+    assert results['playback_virtual_ms'] > 0
+
+
 @pytest.mark.skipif(not (os.name == 'nt' and os.environ.get('ENABLE_AUDIO')),
                     reason='ENABLE_AUDIO not set or not on Windows')
 def test_play_with_audio():
@@ -158,7 +313,3 @@ def test_play_with_audio():
     # short beep (300ms) — winsound.Beep will block until finished
     muz.playFreq(440, 300)
     assert muz.getState() == 'STOP'
-
-
-# (removed manual debug beep — use the pytest audio test which runs when
-# ENABLE_AUDIO is set)
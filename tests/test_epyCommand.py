@@ -0,0 +1,125 @@
+import epysim
+from epysim import UART, Timer, clock
+from Module.epyAsync import command_poll, run_for
+from Module.epyBuzzerMusic import Music
+from Module.epyCommand import (CommandChannel, bind_leds, bind_music,
+                               bind_text, ints)
+from Module.epyRGB_MutilMode import RGBModeDisplay
+from Module.htu21d import crc8
+
+
+def binary(cmd, args=b'', seq=0):
+    frame = bytes([ord(cmd), seq, len(args)]) + args
+    return bytes([0xA5]) + frame + bytes([crc8(frame)])
+
+
+def make_channel(**kw):
+    uart = UART(1, 115200)
+    channel = CommandChannel(uart, **kw)
+    got = []
+    channel.register('A', lambda a: got.append(('A', bytes(a))))
+    channel.register(ord('b'), lambda a: got.append(('b', bytes(a))))
+    return uart, channel, got
+
+
+def test_text_commands():
+    uart, channel, got = make_channel()
+    uart.feed(b'A hello world\nb\r\n\nA  two\n')
+    clock.advance_ms(5)
+    assert channel.poll() == 3
+    assert got == [('A', b'hello world'), ('b', b''), ('A', b'two')]
+    assert channel.commands == 3 and channel.errors == 0
+    assert channel.poll() == 0
+
+
+def test_empty_poll_does_not_wait_for_the_uart_timeout():
+    uart, channel, got = make_channel()
+    assert uart.timeout == 2000
+    assert channel.poll() == 0 and clock.now == 0
+    # the UART itself would block for its timeout
+    assert uart.readinto(bytearray(4)) is None and clock.now == 2000
+
+
+def test_command_split_across_polls():
+    uart, channel, got = make_channel()
+    end = uart.feed(b'A 12 34\n')
+    clock.advance_us(4 * uart.byte_us())
+    assert channel.poll() == 0 and got == []
+    clock.advance_ms(end + 1 - clock.now)
+    assert channel.poll() == 1
+    assert got == [('A', b'12 34')]
+    assert ints(memoryview(b'12 -3')) == [12, -3]
+
+
+def test_binary_frames_and_crc():
+    uart, channel, got = make_channel()
+    bad = bytearray(binary('A', b'xyz', seq=1))
+    bad[5] ^= 1
+    uart.feed(binary('A', b'\x00\nraw') + bytes(bad) + binary('b') +
+              b'A text\n')
+    clock.advance_ms(5)
+    assert channel.poll() == 3
+    # binary args may hold any byte, newlines included
+    assert got == [('A', b'\x00\nraw'), ('b', b''), ('A', b'text')]
+    assert channel.dropped == 1
+
+
+def test_overlong_commands_are_dropped():
+    uart, channel, got = make_channel(max_len=8)
+    uart.feed(b'A 0123456789\nA 01234567\n')
+    uart.feed(binary('A', b'0123456789abc') + b'A ok\n')
+    clock.advance_ms(10)
+    channel.poll(max_reads=8)
+    assert got == [('A', b'01234567'), ('A', b'ok')]
+    assert channel.dropped == 2
+
+
+def test_unknown_commands_and_failing_handlers_ack():
+    uart, channel, got = make_channel(ack=True)
+    channel.register('Z', lambda a: 1 // 0)
+    uart.feed(b'A 1\nQ\nZ\n')
+    clock.advance_ms(5)
+    assert channel.poll() == 3
+    assert bytes(uart.tx) == b'OK\nERR\nERR\n'
+    assert channel.commands == 1 and channel.errors == 2
+    assert isinstance(channel.last_error, ZeroDivisionError)
+
+
+def test_bindings():
+    uart = UART(1, 115200)
+    channel = CommandChannel(uart)
+    leds = RGBModeDisplay(num_leds=8)
+    music = Music(Timer(0), thread=False)
+    shown = []
+    bind_leds(channel, leds)
+    bind_music(channel, music)
+    bind_text(channel, shown.append)
+    uart.feed(b'M fire\nS 5\nF 50\nL T120 C D E\nB 880 40\nT Hi 5\n')
+    clock.advance_ms(20)
+    assert channel.poll(max_reads=8) == 6 and channel.errors == 0
+    assert leds.mode == leds.fire_mode
+    assert leds.speed == 5 and leds.fill_interval_ms == 20
+    assert music.loop and music._state == 'START'
+    assert shown == ['Hi 5']
+    uart.feed(b'X\n')
+    clock.advance_ms(1)
+    channel.poll()
+    assert music._state == 'STOP'
+
+
+def test_command_poll_runs_on_the_event_loop():
+    uart, channel, got = make_channel()
+    uart.feed(b'A first\n', delay_ms=100)
+    uart.feed(b'A second\n', delay_ms=400)
+    epysim.run_async(run_for(1000, command_poll(channel, 10)))
+    assert got == [('A', b'first'), ('A', b'second')]
+
+
+def test_benchmark_runs():
+    import bench_epyCommand
+    naive = bench_epyCommand.run_readline(5000)
+    res = bench_epyCommand.run_async(5000)
+    assert res['commands'] == res['sent'] and res['errors'] == 0
+    assert res['latency_max_ms'] <= bench_epyCommand.POLL_MS
+    assert res['led_dropped'] == 0
+    assert naive['led_dropped'] > 10 * (res['led_dropped'] + 1)
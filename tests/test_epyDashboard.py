@@ -0,0 +1,108 @@
+import pytest
+
+import epysim
+from epysim import I2C, HTU21DDevice, WriteRecorder
+from Module.epyDashboard import (Dashboard, Deadband, Field, OledText,
+                                 Threshold, digits_temperature, fixed)
+from Module.ePy4Digit import FourDigit
+from Module.epySensorSampler import HTU21DSampler
+from Module.htu21d import HTU21D
+from Module.ssd1306 import SSD1306_I2C
+
+
+def test_deadband_quantises_with_hysteresis():
+    band = Deadband(step=10, hysteresis=3)
+    assert band.update(2344) and band.shown == 234
+    # noise around the 23.45 rounding boundary does not flip the digit
+    for v in (2345, 2346, 2347, 2344, 2347):
+        assert not band.update(v)
+    assert band.shown == 234
+    assert band.update(2348) and band.shown == 235
+    assert not band.update(2343)
+    assert band.update(2342) and band.shown == 234
+    # big jumps follow at once
+    assert band.update(-505) and band.shown == -50
+
+
+def test_threshold_hysteresis():
+    alarm = Threshold(3000, 2900)
+    assert alarm.update(2500) and alarm.shown == 0
+    assert not alarm.update(2999)
+    assert alarm.update(3000) and alarm.shown == 1
+    assert not alarm.update(2950)
+    assert alarm.update(2899) and alarm.shown == 0
+
+
+def test_fixed_format():
+    assert fixed(235, 1) == '23.5'
+    assert fixed(-5, 1) == '-0.5'
+    assert fixed(7, 2) == '0.07'
+    assert fixed(45, 0) == '45'
+
+
+def test_field_pushes_only_changes():
+    values = [None, 2300, 2301, 2312, 2312]
+    shown = []
+    field = Field(lambda: values.pop(0), Deadband(10, 3), shown.append)
+    assert not field.update()  # no reading yet
+    assert [field.update() for _ in range(4)] == [True, False, True, False]
+    assert shown == [230, 231]
+    assert field.pushes == 2 and field.skipped == 2
+    field.invalidate()
+    values.append(2312)
+    assert field.update() and shown[-1] == 231
+
+
+def make_dashboard(temperature=23.5, humidity=41.0):
+    i2c = I2C(0, I2C.MASTER, baudrate=400000)
+    sensor = i2c.attach(HTU21DDevice(temperature, humidity))
+    oled_dev = i2c.attach(WriteRecorder(0x3c))
+    digits_dev = i2c.attach(WriteRecorder(0x3d))
+    oled = SSD1306_I2C(128, 64, i2c)
+    digits = FourDigit(i2c, 0x3d)
+    oled_dev.clear()
+    sampler = HTU21DSampler(HTU21D(i2c), period_ms=1000)
+    dash = Dashboard(sampler)
+    text = OledText(oled, 0, 16, 'T {} C', 1, 10)
+    dash.add(Field(sampler.temperature.last, Deadband(10, 3),
+                   digits_temperature(digits), text))
+    return dash, sensor, oled, oled_dev, digits_dev, text
+
+
+def test_dashboard_writes_displays_only_on_change():
+    dash, sensor, oled, oled_dev, digits_dev, text = make_dashboard()
+    epysim.run(dash.update, max_ms=5000)
+    # first sample: 4 digits + colon, and one text area (page 2, 80 cols)
+    assert len(digits_dev.writes) == 5
+    cmds, data = oled_dev.payloads()
+    assert cmds == bytes([0x00, 0x21, 0, 79, 0x22, 2, 2])
+    assert len(data) == 81 and text.bytes_sent == 80
+    assert oled.framebuf.pixel(1, 16) == 1  # the T was drawn
+    # steady readings: nothing more on either display
+    digits_dev.clear()
+    oled_dev.clear()
+    sensor.temperature = 23.52
+    epysim.run(dash.update, max_ms=5000)
+    assert digits_dev.writes == [] and oled_dev.writes == []
+    # a change of the shown tenth rewrites only the tenths digit
+    sensor.temperature = 23.7
+    epysim.run(dash.update, max_ms=2000)
+    assert digits_dev.payloads() == [bytes([0x03, 3, 7])]
+    assert len(oled_dev.writes) == 2
+
+
+def test_dashboard_invalidate_redraws():
+    dash, sensor, oled, oled_dev, digits_dev, text = make_dashboard()
+    epysim.run(dash.update, max_ms=1500)
+    oled_dev.clear()
+    dash.invalidate()
+    epysim.run(dash.update, max_ms=1000)
+    assert len(oled_dev.writes) == 2
+
+
+def test_demo_runs():
+    import demo_dashboard
+    fixed_res = demo_dashboard.run_fixed(20000)
+    changes = demo_dashboard.run_changes(20000)
+    assert changes['samples'] == pytest.approx(20, abs=1)
+    assert changes['oled_bytes'] < fixed_res['oled_bytes'] // 10
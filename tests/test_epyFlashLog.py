@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from Module.epyFlashLog import HEADER_SIZE, FlashLog
+
+
+def make(tmp_path, **kwargs):
+    opts = dict(files=3, file_size=HEADER_SIZE + 8 * 20, block_size=64)
+    opts.update(kwargs)
+    return FlashLog(str(tmp_path / 'th'), **opts)
+
+
+def test_round_trip_with_negative_values(tmp_path):
+    log = make(tmp_path)
+    samples = [(1000 + i, [-4685 + 37 * i, 12500 - 91 * i]) for i in range(12)]
+    for ts, vals in samples:
+        log.append(ts, vals)
+    # 8 records per 64-byte block: one block on flash, 4 still buffered
+    assert log.writes == 2  # header + one block
+    assert os.path.getsize(str(tmp_path / 'th0.bin')) == HEADER_SIZE + 64
+    assert list(log.records()) == [(ts, a, b) for ts, (a, b) in samples]
+    log.close()
+    assert os.path.getsize(str(tmp_path / 'th0.bin')) == HEADER_SIZE + 96
+
+
+def test_writes_whole_blocks(tmp_path):
+    log = make(tmp_path, file_size=4096, block_size=512)
+    sizes = []
+    real_write = log._file.write
+    log._file.write = lambda data: sizes.append(len(data)) or real_write(data)
+    for i in range(200):
+        log.append(i, (i, -i))
+    assert sizes == [512, 512, 512]  # 64 records of 8 bytes per block
+    assert log.bytes_written == HEADER_SIZE + 3 * 512
+
+
+def test_rotation_keeps_bounded_files(tmp_path):
+    log = make(tmp_path)
+    for i in range(100):
+        log.append(i, (i, i))
+    log.close()
+    names = sorted(os.listdir(str(tmp_path)))
+    assert names == ['th0.bin', 'th1.bin', 'th2.bin']
+    assert all(os.path.getsize(str(tmp_path / n)) <= HEADER_SIZE + 160
+               for n in names)
+    # the newest 40..60 records survive, oldest first
+    got = [ts for ts, _, _ in make(tmp_path).records()]
+    assert got == list(range(got[0], 100))
+    assert 40 <= len(got) <= 60
+
+
+def test_resume_appends_to_newest_file(tmp_path):
+    log = make(tmp_path)
+    for i in range(30):
+        log.append(i, (1, 2))
+    log.close()
+    log = make(tmp_path)
+    for i in range(30, 45):
+        log.append(i, (1, 2))
+    log.close()
+    assert [r[0] for r in make(tmp_path).records()] == list(range(45))
+
+
+def test_torn_record_is_ignored(tmp_path):
+    log = make(tmp_path)
+    for i in range(5):
+        log.append(i, (7, 8))
+    log.close()
+    with open(str(tmp_path / 'th0.bin'), 'ab') as f:
+        f.write(b'\x05\x00\x00')  # power lost mid-record
+    log = make(tmp_path)
+    log.append(5, (7, 8))
+    assert [r[0] for r in log.records()] == list(range(6))
+    # continued in a fresh file rather than behind the torn bytes
+    assert log._index == 1
+
+
+def test_records_range(tmp_path):
+    log = make(tmp_path)
+    for i in range(55):
+        log.append(100 + 2 * i, (i, 0))
+    assert [r[1] for r in log.records(start=160, end=180)] == \
+        list(range(30, 40))
+    assert [r[1] for r in log.records(start=205)] == [53, 54]
+    assert list(log.records(end=100)) == []
+
+
+def test_rejects_file_smaller_than_block(tmp_path):
+    with pytest.raises(ValueError):
+        make(tmp_path, file_size=HEADER_SIZE + 16, block_size=64)
+
+
+def test_benchmark_runs(tmp_path):
+    import bench_epyFlashLog as bench
+    res = bench.run(500, str(tmp_path))
+    assert res['binary_write_amplification'] < \
+        res['text_write_amplification']
+    assert res['binary_records_per_s'] > 0
@@ -0,0 +1,112 @@
+import pytest
+
+from epysim import I2C, HTU21DDevice, WriteRecorder, clock
+# the drivers import the bus module by its device name
+from epyI2CBus import I2CBus, as_bus
+
+
+class PybOnly:
+    """ePy-style bus: send/recv/mem_read only."""
+
+    def __init__(self):
+        self.calls = []
+
+    def send(self, buf, addr):
+        self.calls.append(('send', addr, bytes(buf)))
+
+    def recv(self, buf, addr):
+        self.calls.append(('recv', addr, len(buf)))
+        buf[:] = bytes(range(len(buf)))
+
+    def mem_read(self, buf, addr, reg):
+        self.calls.append(('mem_read', addr, reg))
+        buf[:] = b'\x42' * len(buf)
+
+
+class MachineOnly:
+    def __init__(self):
+        self.calls = []
+
+    def writeto(self, addr, buf):
+        self.calls.append(('writeto', addr, buf))
+
+    def readfrom_into(self, addr, buf):
+        self.calls.append(('readfrom_into', addr, len(buf)))
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        self.calls.append(('readfrom_mem_into', addr, reg))
+
+
+def test_pyb_style_dispatch():
+    raw = PybOnly()
+    bus = I2CBus(raw)
+    bus.write(0x3D, b'\x04\x01')
+    buf = bytearray(3)
+    assert bus.readinto(0x40, buf) is buf and buf == b'\x00\x01\x02'
+    bus.read_mem_into(0x40, 0xE7, memoryview(buf)[:1])
+    assert buf[0] == 0x42
+    assert raw.calls == [('send', 0x3D, b'\x04\x01'), ('recv', 0x40, 3),
+                         ('mem_read', 0x40, 0xE7)]
+
+
+def test_machine_style_dispatch_is_zero_copy():
+    raw = MachineOnly()
+    bus = I2CBus(raw)
+    data = bytearray(b'\x01\x02\x03')
+    view = memoryview(data)[1:]
+    bus.write(0x10, view)
+    bus.readinto(0x10, data)
+    bus.read_mem_into(0x10, 7, data)
+    assert raw.calls[0][2] is view
+    assert [c[0] for c in raw.calls] == \
+        ['writeto', 'readfrom_into', 'readfrom_mem_into']
+
+
+def test_per_address_stats_and_errors():
+    i2c = I2C(0, timed=True)
+    rec = i2c.attach(WriteRecorder(0x3D))
+    bus = I2CBus(i2c)
+    bus.write(0x3D, b'\x03\x01\x02')
+    bus.write(0x3D, b'\x04\x00')
+    rec.fail = 1
+    with pytest.raises(OSError):
+        bus.write(0x3D, b'\x04\x01')
+    with pytest.raises(OSError):
+        bus.readinto(0x50, bytearray(2))  # nothing at 0x50
+    s = bus.stats(0x3D)
+    assert s['transactions'] == 3 and s['bytes'] == 5 and s['errors'] == 1
+    # the timed virtual bus advances ticks_us during the transfer
+    assert s['time_us'] == i2c.bus_us - 110 > 0
+    assert bus.stats()[0x50]['errors'] == 1
+    bus.reset_stats()
+    assert bus.stats() == {}
+
+
+def test_batch_combines_writes():
+    i2c = I2C(0)
+    rec = i2c.attach(WriteRecorder(0x3C))
+    bus = I2CBus(i2c)
+    batch = bus.batch(0x3C, control=0x00, size=4)
+    batch.extend((0xAE, 0x20, 0x00, 0x40, 0xA1))
+    batch.flush()
+    batch.flush()  # nothing pending: no transaction
+    assert rec.payloads() == [b'\x00\xae\x20\x00', b'\x00\x40\xa1']
+
+
+def test_drivers_share_one_bus():
+    from Module.ePy4Digit import FourDigit
+    from Module.htu21d import HTU21D
+    i2c = I2C(0)
+    i2c.attach(WriteRecorder(0x3D))
+    i2c.attach(HTU21DDevice())
+    bus = as_bus(i2c)
+    assert as_bus(bus) is bus
+    disp = FourDigit(bus)
+    sensor = HTU21D(bus)
+    disp.show4number(1234)
+    sensor.read_temperature()
+    stats = bus.stats()
+    assert stats[0x3D]['transactions'] == 5
+    assert stats[0x40]['transactions'] == 2
+    assert stats[0x40]['bytes'] == 1 + 3
+    assert clock.now == 50
@@ -0,0 +1,153 @@
+import pytest
+
+from epysim import I2C, HTU21DDevice, WriteRecorder, clock
+from Module import epyProfile
+from Module.epyProfile import BUCKETS, HIST, Profiler
+from Module.epyI2CBus import I2CBus
+import profile_report
+
+
+class Worker:
+    def work(self, ms):
+        clock.advance_ms(ms)
+        return ms
+
+    def fail(self):
+        clock.advance_ms(1)
+        raise OSError(5)
+
+    def pair(self, a, b):
+        return a + b
+
+
+@pytest.fixture
+def prof():
+    prof = Profiler()
+    yield prof
+    prof.uninstall()
+
+
+def test_record_fills_log2_buckets(prof):
+    slot = prof.probe('x')
+    for dt in (0, 1, 3, 1000, 1 << 20):
+        t0 = clock.ticks_us()
+        clock.us += dt
+        prof.record(slot, t0)
+    rec = prof._probes[slot]
+    assert rec[epyProfile.COUNT] == 5
+    assert rec[epyProfile.TOTAL_MS] * 1000 + rec[epyProfile.REM_US] == \
+        1 + 3 + 1000 + (1 << 20)
+    assert rec[epyProfile.MAX_US] == 1 << 20
+    hist = list(rec[HIST:])
+    assert len(hist) == BUCKETS
+    # 0 us, 1 us (bucket 1), 3 us (2..3), 1000 us (512..1023), overflow
+    assert hist[0] == hist[1] == hist[2] == hist[10] == hist[-1] == 1
+    assert prof.probe('x') == slot
+
+
+def test_instrument_wraps_and_uninstall_restores(prof):
+    orig = Worker.work
+    prof.instrument(Worker, 'work', 'w.work', 1)
+    prof.instrument(Worker, 'fail', 'w.fail')
+    prof.instrument(Worker, 'pair', 'w.pair', 2)
+    w = Worker()
+    assert w.work(3) == 3 and w.work(2) == 2
+    with pytest.raises(OSError):
+        w.fail()
+    assert w.pair(1, 2) == 3
+    dump = profile_report.parse(prof.lines())
+    assert dump['probes']['w.work']['count'] == 2
+    assert dump['probes']['w.work']['us'] == 5000
+    # a raising call is still recorded
+    assert dump['probes']['w.fail']['max_us'] == 1000
+    assert dump['probes']['w.pair']['count'] == 1
+    prof.uninstall()
+    assert Worker.work is orig and Worker.work.__name__ == 'work'
+
+
+def test_install_patches_loaded_driver_modules(prof):
+    # drivers import each other by top-level name, as on the device
+    import htu21d
+    orig = htu21d.HTU21D.read_temperature
+    n = prof.install()
+    assert n >= 3
+    i2c = I2C(0, I2C.MASTER, baudrate=100000)
+    i2c.attach(HTU21DDevice(23.5, 41.0))
+    sensor = htu21d.HTU21D(i2c)
+    sensor.read_temperature()
+    dump = profile_report.parse(prof.lines())
+    p = dump['probes']['sensor.read_temperature']
+    assert p['count'] == 1 and p['us'] >= 50000
+    prof.uninstall()
+    assert htu21d.HTU21D.read_temperature is orig
+
+
+def test_install_skips_modules_not_imported(prof):
+    probes = (('no_such_module', 'X', 'y', 'none.y', 0),)
+    assert prof.install(probes) == 0
+    assert next(prof.lines()) == 'T 0'
+
+
+def test_dump_round_trip_with_bus_and_counters(prof):
+    i2c = I2C(0, baudrate=400000, timed=True)
+    i2c.attach(WriteRecorder(0x3c))
+    bus = I2CBus(i2c)
+    prof.add_bus(bus, {0x3c: 'display'})
+    prof.instrument(Worker, 'work', 'display.work', 1)
+    c = prof.counter('frames')
+    prof.count(c, 3)
+    bus.write(0x3c, bytes(100))
+    Worker().work(4)
+    lines = []
+    prof.dump(lines.append)
+    dump = profile_report.parse(lines)
+    assert dump['ms'] == clock.now
+    assert dump['counters'] == {'frames': 3}
+    (b,) = dump['buses']
+    assert b['name'] == 'display' and b['addr'] == 0x3c
+    assert b['bytes'] == 100 and b['transactions'] == 1
+    prof.reset()
+    dump = profile_report.parse(prof.lines())
+    assert dump['ms'] == 0 and dump['counters'] == {'frames': 0}
+    assert dump['probes']['display.work']['count'] == 0
+    assert dump['buses'] == []
+
+
+def test_report_splits_bus_and_cpu_time():
+    dump = profile_report.parse([
+        'T 1000',
+        'P display.show 4 100 0 30000 ' + ','.join(
+            ['0'] * 15 + ['4']),
+        'P sensor.update 10 0 500 90 ' + ','.join(
+            ['0'] * 7 + ['10'] + ['0'] * 8),
+        'B display 60 4 4100 0 80000',
+    ])
+    rows = {r['name']: r for r in profile_report.report(dump)}
+    assert rows['display']['span_ms'] == 100
+    assert rows['display']['bus_ms'] == 80
+    assert rows['display']['cpu_ms'] == 20
+    assert rows['display']['share'] == pytest.approx(0.1)
+    assert rows['display']['p99_us'] == 30000  # capped at the maximum
+    assert rows['sensor']['p50_us'] == 90
+    assert profile_report.percentile([0, 0, 3, 1], 0.5) == 3
+    assert [r['name'] for r in profile_report.report(dump)] == \
+        ['display', 'sensor']
+
+
+def test_report_demo_runs():
+    lines = profile_report.demo_dump(ms=1000)
+    text = list(profile_report.format_report(profile_report.parse(lines)))
+    assert text[0] == '1000 ms profiled'
+    assert any(line.startswith('display') for line in text)
+
+
+@pytest.mark.parametrize('args, code', [
+    (['--help'], 0), (['-x'], 2), (['a.txt', 'b.txt'], 2),
+])
+def test_report_main_prints_usage(monkeypatch, capsys, args, code):
+    monkeypatch.setattr('sys.argv', ['profile_report.py'] + args)
+    with pytest.raises(SystemExit) as exc:
+        profile_report.main()
+    assert exc.value.code == code
+    assert capsys.readouterr().out == \
+        'usage: python tests/profile_report.py [dump.txt | -]\n'
@@ -0,0 +1,47 @@
+import sys
+
+from Module import epyRGB_MutilMode as rgb
+from Module.epyRGB_MutilMode import RGBModeDisplay
+
+
+def test_palette_is_shared_and_matches_wheel():
+    a = RGBModeDisplay(num_leds=8)
+    b = RGBModeDisplay(num_leds=8)
+    assert a.palette is b.palette is rgb.palette()
+    assert len(a.palette) == 256
+    assert a.palette[0] == (0, 255, 0) == a.wheel(0)
+    assert a.palette[100] == rgb.wheel(100) == (210, 0, 45)
+
+
+def test_set_mode_by_name():
+    disp = RGBModeDisplay(num_leds=8)
+    for name, method in rgb.MODES:
+        disp.set_mode(name)
+        assert disp.mode == getattr(disp, method)
+        disp.render()
+    disp.set_mode('no_such_mode')
+    assert disp.mode == disp.rainbow_mode
+    disp.set_mode(disp.fire_mode)
+    assert disp.mode == disp.fire_mode
+
+
+def test_counters_are_bytes():
+    disp = RGBModeDisplay(num_leds=8)
+    disp.confetti_decay = 1000
+    disp.set_mode('confetti')
+    for _ in range(50):
+        disp.render()
+    # capped at 255 instead of failing over to the rainbow fallback
+    assert 200 < max(disp.sparkle_counters) <= 255
+    assert isinstance(disp.fire_heat, bytearray)
+
+
+def test_startup_benchmark_runs():
+    import bench_startup
+    import epyI2CBus
+    rows = bench_startup.imports(('epyBeatClock', 'epyI2CBus'))
+    assert [r[0] for r in rows] == ['epyBeatClock', 'epyI2CBus']
+    assert all(r[2] > 0 for r in rows)
+    # modules that were loaded are put back
+    assert sys.modules['epyI2CBus'] is epyI2CBus
+    assert len(bench_startup.objects()) == 5
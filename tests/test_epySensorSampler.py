@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from epysim import I2C, HTU21DDevice, clock
+from Module.epySensorSampler import HTU21DSampler, RingStats
+from Module.htu21d import HTU21D
+
+
+def brute(window):
+    n = len(window)
+    mean = sum(window) / n
+    return {
+        'mean': mean,
+        'var': sum((v - mean) ** 2 for v in window) / n,
+        'min': min(window),
+        'max': max(window),
+    }
+
+
+def test_ring_stats_match_brute_force():
+    rng = random.Random(7)
+    ring = RingStats(16)
+    history = []
+    for i in range(500):
+        v = rng.randint(-4000, 9000) if i % 50 else 32767 - i
+        ring.push(v)
+        history.append(v)
+        window = history[-16:]
+        ref = brute(window)
+        assert len(ring) == len(window)
+        assert ring.min() == ref['min']
+        assert ring.max() == ref['max']
+        assert abs(ring.mean() - ref['mean']) <= 0.5
+        assert abs(ring.variance() - ref['var']) <= 1
+        assert ring.last() == v
+        assert ring.sum_last(5) == sum(window[-5:])
+
+
+def test_ring_stats_monotonic_runs_keep_window_extremes():
+    ring = RingStats(4)
+    for v in range(10):
+        ring.push(v)
+    assert (ring.min(), ring.max()) == (6, 9)
+    for v in range(10, 0, -1):
+        ring.push(v)
+    assert (ring.min(), ring.max()) == (1, 4)
+
+
+def test_ring_stats_ema_converges():
+    ring = RingStats(8, ema_shift=2)
+    ring.push(1000)
+    assert ring.ema() == 1000
+    for _ in range(60):
+        ring.push(2000)
+    assert ring.ema() == 2000
+    assert ring.variance() == 0
+
+
+def test_segments_are_views_oldest_first():
+    ring = RingStats(5)
+    assert ring.mean() is None and ring.min() is None
+    for v in (1, 2, 3):
+        ring.push(v)
+    assert [list(s) for s in ring.segments()] == [[1, 2, 3], []]
+    for v in (4, 5, 6, 7):
+        ring.push(v)
+    a, b = ring.segments()
+    assert list(a) + list(b) == [3, 4, 5, 6, 7]
+    assert a.obj is ring.buf
+    assert ring.get(4) == 3
+    with pytest.raises(IndexError):
+        ring.get(5)
+
+
+def test_sampler_reads_at_fixed_rate():
+    i2c = I2C(0)
+    dev = i2c.attach(HTU21DDevice(21.37, 55.5))
+    sampler = HTU21DSampler(HTU21D(i2c), period_ms=500, size=10)
+    starts = []
+    while clock.now < 10000:
+        before = len(dev.commands)
+        wait = sampler.update()
+        if len(dev.commands) > before and dev.commands[-1] == 0xF3:
+            starts.append(clock.now)
+        clock.advance_ms(max(1, wait))
+    # one pair every period on the grid, despite the 66 ms conversion
+    assert starts == [i * 500 for i in range(20)]
+    assert sampler.samples == 20 and sampler.missed == 0
+    assert len(sampler.temperature) == 10
+    assert sampler.temperature.mean() == pytest.approx(2137, abs=2)
+    assert sampler.humidity.max() == pytest.approx(5550, abs=2)
+
+
+def test_sampler_skips_missed_periods():
+    i2c = I2C(0)
+    i2c.attach(HTU21DDevice())
+    sampler = HTU21DSampler(HTU21D(i2c), period_ms=100)
+    while not sampler.samples:
+        clock.advance_ms(sampler.update())
+    assert clock.now == 100
+    clock.advance_ms(1000)  # stalled: slots 100..1100 are all due
+    sampler.update()
+    assert sampler.missed == 10
+    # back on the original grid
+    assert clock.ticks_diff(sampler._next, clock.now) == 100
+
+
+def test_sampler_survives_a_nacked_trigger():
+    import epysim
+    from Module.epyAsync import run_for, sensor_sampling
+    i2c = I2C(0)
+    dev = i2c.attach(HTU21DDevice(21.0, 40.0))
+    sampler = HTU21DSampler(HTU21D(i2c), period_ms=500)
+    dev.fail = 1  # the first temperature trigger is lost
+    epysim.run_async(run_for(2900, sensor_sampling(sampler)))
+    assert dev.nacked == 1 and sampler.errors == 1
+    # the sampler kept its grid: every later slot produced a pair
+    assert sampler.samples == 5
+    assert sampler.temperature.last() == pytest.approx(2100, abs=2)
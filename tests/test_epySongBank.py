@@ -0,0 +1,138 @@
+import io
+import subprocess
+import sys
+import os
+
+import pytest
+
+import epySongBank as sb
+
+
+def test_legacy_list_matches_original_parser():
+    blob = sb.compile_notes(["E4:2", "E", "F", "A3:4", "D4:2", "R:1", "C#"],
+                            ticks=4, bpm=120)
+    ticks, bpm, notes = sb.decode(blob)
+    assert (ticks, bpm) == (4, 120)
+    # octave carries over, missing duration is one tick
+    assert notes == [(64, 2), (64, 1), (65, 1), (57, 4), (62, 2), (0, 1),
+                     (61, 1)]
+    assert len(blob) == sb.HEADER_SIZE + 2 * len(notes)
+
+
+def test_note_freq_matches_music_table():
+    assert sb.note_freq(69) == pytest.approx(440.0)
+    assert sb.note_freq(sb.note_number('C', 4)) == pytest.approx(261.6256, 1e-4)
+    assert sb.note_freq(sb.note_number('B', 4)) == pytest.approx(493.8833, 1e-4)
+    assert sb.note_freq(0) == 0
+
+
+def test_rtttl_compile():
+    name, blob = sb.compile_rtttl(
+        "Beep:d=4,o=5,b=100:8e6,8d#6,p,c.,2a#4,16g.5,h")
+    ticks, bpm, notes = sb.decode(blob)
+    assert name == 'Beep'
+    assert (ticks, bpm) == (sb.TEXT_TICKS, 100)
+    assert notes == [(88, 8), (87, 8), (0, 16), (72, 24), (70, 32),
+                     (79, 6), (83, 16)]
+
+
+def test_rtttl_rejects_garbage():
+    with pytest.raises(ValueError):
+        sb.compile_rtttl("x:d=4:8q")
+    with pytest.raises(ValueError):
+        sb.compile_rtttl("no settings")
+
+
+def test_mml_compile_and_tempo_change():
+    blob = sb.compile_mml("T120 L8 O4 C D+ E-4. R <B >C&C T60 C")
+    ticks, bpm, notes = sb.decode(blob)
+    assert bpm == 120
+    assert notes == [(60, 8), (63, 8), (63, 24), (0, 8), (59, 8), (60, 16),
+                     (60, 16)]
+
+
+def test_long_notes_are_split():
+    blob = sb.compile_mml("T60 L1 C&C&C&C&C")
+    _, _, notes = sb.decode(blob)
+    assert sum(t for _, t in notes) == 5 * 64
+    assert all(n == 60 for n, _ in notes)
+
+
+@pytest.mark.parametrize('text', [
+    "T140 L16 O5 E E R E R C E R G4 R4 <G4",
+    "T97 O3 A8. B16 >C+4&C+16 D-2 R32 E1",
+])
+def test_mml_round_trip(text):
+    blob = sb.compile_mml(text)
+    assert sb.compile_mml(sb.to_mml(blob)) == blob
+
+
+def test_legacy_round_trip_keeps_timing():
+    blob = sb.compile_notes(["C4:3", "D", "R:5", "G5:1"], ticks=4, bpm=90)
+    again = sb.compile_mml(sb.to_mml(blob))
+    assert sb.SongReader(again).duration_ms() == \
+        sb.SongReader(blob).duration_ms()
+    assert [n for n, _ in sb.decode(again)[2]] == \
+        [n for n, _ in sb.decode(blob)[2]]
+
+
+def test_round_trip_carries_ticks_mml_cannot_split():
+    # 6 ticks per beat: a tick is 2.67 of the 16 text ticks
+    blob = sb.compile_notes(["C4:1"] * 7 + ["R:5", "E4:1"], ticks=6, bpm=90)
+    again = sb.compile_mml(sb.to_mml(blob))
+    notes = sb.decode(again)[2]
+    assert [n for n, _ in notes] == [n for n, _ in sb.decode(blob)[2]]
+    # 13 song ticks are 34.67 text ticks: the song loses less than one
+    assert sum(t for _, t in notes) == 13 * 16 // 6
+    assert abs(sb.SongReader(again).duration_ms() -
+               sb.SongReader(blob).duration_ms()) < 60000 // (90 * 16)
+    with pytest.raises(ValueError):
+        sb.to_mml(sb.compile_notes(["C4:1", "D4:1"], ticks=48))
+
+
+def test_stream_from_file_matches_bytes():
+    blob = sb.compile_mml("T120 L16 " + "C D E F G A B >C <" * 20)
+    f = io.BytesIO(b'pad' + blob)
+    from_file = list(sb.SongReader(f, offset=3))
+    assert from_file == list(sb.SongReader(blob))
+    assert len(from_file) == 160
+
+
+def test_reader_read_and_rewind():
+    r = sb.SongReader(sb.compile_mml("C D"))
+    assert r.read() == (60 << 8) | 16
+    assert r.read() == (62 << 8) | 16
+    assert r.read() == -1
+    r.rewind()
+    assert r.read() == (60 << 8) | 16
+
+
+def test_bank_bytes_and_file():
+    a = sb.compile_mml("C D E")
+    b = sb.compile_rtttl("b:d=8,o=5,b=160:c,d")[1]
+    bank = sb.build_bank([('intro', a), ('theme', b)])
+    for src in (bank, io.BytesIO(bank)):
+        sbank = sb.SongBank(src)
+        assert sbank.names() == ['intro', 'theme']
+        assert list(sbank.song('theme')) == list(sb.SongReader(b))
+        assert list(sbank.song('intro')) == list(sb.SongReader(a))
+
+
+def test_bad_blobs():
+    with pytest.raises(ValueError):
+        sb.SongReader(b'xx\x01\x04\x78\x00\x00\x00')
+    with pytest.raises(ValueError):
+        sb.SongBank(b'eS\x01\x00')
+
+
+def test_host_converter(tmp_path):
+    (tmp_path / 'one.rtttl').write_text("One:d=4,o=5,b=120:c,d,e")
+    (tmp_path / 'two.mml').write_text("T100 L8 G A B")
+    out = tmp_path / 'bank.bin'
+    script = os.path.join(os.path.dirname(sb.__file__), 'epySongBank.py')
+    subprocess.run([sys.executable, script, '-o', str(out),
+                    str(tmp_path / 'one.rtttl'), str(tmp_path / 'two.mml')],
+                   check=True, capture_output=True)
+    bank = sb.SongBank(out.read_bytes())
+    assert bank.names() == ['One', 'two']
+    assert bank.song('two').bpm == 100
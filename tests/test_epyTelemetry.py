@@ -0,0 +1,151 @@
+import pytest
+
+from epysim import UART, clock
+from Module import epyTelemetry as tm
+from Module.epyTelemetry import FrameDecoder, Telemetry
+from Module.htu21d import crc8
+
+
+def test_frame_layout_and_crc():
+    uart = UART(1)
+    tel = Telemetry(uart, size=64)
+    clock.advance_ms(1000)
+    tel.sample(2345, 4100)
+    clock.advance_ms(250)
+    tel.sample(-512, 9999)
+    assert uart.writes == []
+    assert tel.flush() == 4 + 4 + 2 * 6 + 1
+    frame = bytes(uart.tx)
+    assert frame[:4] == bytes([0xA5, tm.SAMPLES, 0, 16])
+    assert frame[4:8] == (1000).to_bytes(4, 'little')
+    assert frame[8:14] == bytes([0, 0, 0x29, 0x09, 0x04, 0x10])
+    assert frame[14:16] == (250).to_bytes(2, 'little')
+    assert frame[16:18] == (-512 & 0xFFFF).to_bytes(2, 'little')
+    assert frame[-1] == crc8(frame[1:-1])
+
+
+def test_writes_are_bounded_by_the_buffer():
+    uart = UART(1)
+    tel = Telemetry(uart, size=40)
+    for i in range(30):
+        clock.advance_ms(100)
+        tel.sample(i, i)
+        if i % 10 == 0:
+            tel.stat(tm.STAT_FREE, 1000 * i)
+    tel.flush()
+    assert all(n <= 40 for _, n in uart.writes)
+    assert sum(n for _, n in uart.writes) == len(uart.tx) == tel.bytes_sent
+    records = FrameDecoder().feed(bytes(uart.tx))
+    assert [r[3] for r in records if r[0] == 'sample'] == list(range(30))
+    assert [r[3] for r in records if r[0] == 'stat'] == [0, 10000, 20000]
+    # timestamps survive the per-frame base + delta encoding
+    assert [r[2] for r in records if r[0] == 'sample'] == \
+        [100 * (i + 1) for i in range(30)]
+
+
+def test_update_flushes_after_max_delay():
+    uart = UART(1)
+    tel = Telemetry(uart, size=128, max_delay_ms=500)
+    tel.sample(1, 2)
+    assert tel.update() == 500 and uart.writes == []
+    clock.advance_ms(300)
+    assert tel.update() == 200
+    clock.advance_ms(200)
+    assert tel.update() == 500
+    assert uart.writes == [(500, 4 + 4 + 6 + 1)]
+    assert tel.pending() == 0
+
+
+def test_long_gaps_and_full_frames_start_new_frames():
+    uart = UART(1)
+    tel = Telemetry(uart, size=255)
+    tel.sample(1, 1)
+    clock.advance_ms(70000)  # dt no longer fits 16 bits
+    tel.sample(2, 2)
+    for i in range(tm.MAX_SAMPLES):
+        tel.sample(3, 3)
+    tel.flush()
+    dec = FrameDecoder()
+    records = dec.feed(bytes(uart.tx))
+    assert len(records) == 2 + tm.MAX_SAMPLES
+    assert dec.frames == 3  # the 42nd sample after the gap opens a third
+    assert records[1][2] == 70000
+
+
+def test_decoder_resyncs_and_counts_losses():
+    uart = UART(1)
+    tel = Telemetry(uart, size=16)
+    for i in range(6):
+        tel.stat(i, -i)
+    tel.flush()
+    data = bytearray(uart.tx)
+    # frames are 10 bytes: corrupt frame 1, drop frame 3, add line noise
+    data[15] ^= 0xFF
+    data = b'\x00\xa5\x13' + bytes(data[:30]) + bytes(data[40:])
+    dec = FrameDecoder()
+    records = []
+    for i in range(0, len(data), 7):
+        records.extend(dec.feed(data[i:i + 7]))
+    assert [r[2:] for r in records] == [(0, 0), (2, -2), (4, -4), (5, -5)]
+    assert dec.crc_errors >= 1
+    assert dec.lost == 2
+
+
+class SlowUART(UART):
+    """Takes at most the next of `room` bytes per write(); 0 times out."""
+
+    def __init__(self, room):
+        super().__init__(1)
+        self.room = list(room)
+
+    def write(self, buf):
+        n = min(len(buf), self.room.pop(0) if self.room else len(buf))
+        if not n:
+            return None
+        return super().write(bytes(buf[:n]))
+
+
+def test_short_writes_keep_the_rest_buffered():
+    uart = SlowUART([0, 5])
+    tel = Telemetry(uart, size=32, max_delay_ms=500)
+    tel.stat(1, 100)
+    tel.stat(2, 200)
+    assert tel.flush() == 0  # timed out
+    assert tel.pending() == 20 and tel.short_writes == 1
+    assert tel.flush() == 5
+    assert tel.pending() == 15 and tel.short_writes == 2
+    # the rest goes out max_delay_ms after the short write
+    assert tel.update() == 500
+    clock.advance_ms(500)
+    tel.update()
+    assert tel.pending() == 0 and tel.short_writes == 2
+    assert tel.bytes_sent == len(uart.tx) == 20
+    records = FrameDecoder().feed(bytes(uart.tx))
+    assert [r[2:] for r in records] == [(1, 100), (2, 200)]
+
+
+def test_stalled_link_drops_what_does_not_fit():
+    uart = SlowUART([0] * 4)
+    tel = Telemetry(uart, size=16)
+    tel.stat(1, 100)
+    tel.stat(2, 200)  # no room and nothing sent: frame 1 is dropped
+    assert tel.short_writes == 1 and tel.errors == 1
+    assert tel.pending() == 10
+    uart.room = []
+    tel.flush()
+    assert [r[2:] for r in FrameDecoder().feed(bytes(uart.tx))] == \
+        [(2, 200)]
+
+
+def test_size_check():
+    with pytest.raises(ValueError):
+        Telemetry(UART(1), size=8)
+
+
+def test_benchmark_runs():
+    import bench_epyTelemetry as bench
+    res = bench.run(n=300)
+    assert res['binary']['decoded_ok']
+    assert res['binary']['bytes_per_sample'] < \
+        res['text']['bytes_per_sample'] / 2
+    assert res['binary']['writes_per_sample'] < 0.2
@@ -0,0 +1,154 @@
+import pytest
+
+import epysim
+from epysim import Timer, clock
+from Module.epyTimerWheel import TimerWheel
+
+
+def make(tick_ms=10, slots=64):
+    timer = Timer(1)
+    wheel = TimerWheel(timer, tick_ms=tick_ms, slots=slots)
+    wheel.start()
+    return timer, wheel
+
+
+def ticks(timer, n, run=True):
+    """Let `n` timer interrupts happen, running scheduled work after each."""
+    for _ in range(n):
+        clock.advance_ms(10)
+        timer.fire()
+        if run:
+            epysim.run_scheduled()
+
+
+def recorder():
+    calls = []
+    return calls, lambda arg: calls.append((clock.now, arg))
+
+
+def test_start_uses_one_timer():
+    timer, wheel = make()
+    assert timer.starts() == [(0, 100)]
+    wheel.stop()
+    assert timer.cb is None
+    with pytest.raises(ValueError):
+        TimerWheel(timer, tick_ms=30)
+    with pytest.raises(ValueError):
+        TimerWheel(timer, slots=48)
+
+
+def test_one_shot_and_periodic():
+    timer, wheel = make()
+    calls, cb = recorder()
+    wheel.after(25, cb, 'once')
+    job = wheel.every(50, cb, 'tick')
+    ticks(timer, 20)
+    assert calls == [(30, 'once'), (50, 'tick'), (100, 'tick'),
+                     (150, 'tick'), (200, 'tick')]
+    assert job.runs == 4 and job.active()
+    assert wheel.jobs == 1
+
+
+def test_period_not_multiple_of_tick_keeps_rate():
+    timer, wheel = make()
+    calls, cb = recorder()
+    wheel.every(33, cb)
+    ticks(timer, 330)
+    times = [t for t, _ in calls]
+    # each run is on the first tick at or after k * 33 ms
+    assert times[:5] == [40, 70, 100, 140, 170]
+    assert len(times) == 100
+    assert all(0 <= t - 33 * (k + 1) < 10 for k, t in enumerate(times))
+
+
+def test_delays_longer_than_the_wheel():
+    timer, wheel = make(slots=8)
+    calls, cb = recorder()
+    wheel.after(1000, cb, 'a')
+    wheel.after(80, cb, 'b')  # exactly one turn
+    wheel.every(250, cb, 'c')
+    ticks(timer, 100)
+    assert calls == [(80, 'b'), (250, 'c'), (500, 'c'), (750, 'c'),
+                     (1000, 'a'), (1000, 'c')]
+
+
+def test_cancel_including_from_callbacks():
+    timer, wheel = make()
+    calls, cb = recorder()
+    a = wheel.after(50, cb, 'a')
+    b = wheel.after(50, cb, 'b')
+    wheel.cancel(a)
+    wheel.cancel(a)  # no-op
+    # b runs first (added first) and cancels c due in the same tick
+    c = wheel.after(50, cb, 'c')
+    b.callback = lambda arg: (calls.append((clock.now, arg)),
+                              wheel.cancel(c))
+    periodic = wheel.every(20, lambda _: wheel.cancel(periodic))
+    ticks(timer, 10)
+    assert calls == [(50, 'b')]
+    assert periodic.runs == 1 and not periodic.active()
+    assert wheel.jobs == 0
+
+
+def test_irq_only_schedules_and_latency_is_measured():
+    timer, wheel = make()
+    calls, cb = recorder()
+    wheel.after(10, cb, 'a')
+    wheel.every(20, cb, 'b')
+    ticks(timer, 3, run=False)
+    # nothing ran in interrupt context; one pending schedule() request
+    assert calls == [] and len(epysim._scheduled) == 1
+    epysim.run_scheduled()
+    assert calls == [(30, 'a'), (30, 'b')]
+    assert wheel.overruns == 2
+    stats = wheel.stats()
+    assert stats['latency_max_us'] == 20000
+    assert stats['latency_avg_us'] == (20000 + 10000) // 2
+    ticks(timer, 1)
+    assert calls[-1] == (40, 'b')
+
+
+def test_schedule_queue_full_catches_up():
+    timer, wheel = make()
+    calls, cb = recorder()
+    wheel.every(10, cb)
+    for _ in range(8):
+        epysim.schedule(lambda _: None, 0)
+    ticks(timer, 2, run=False)
+    assert wheel.schedule_full == 2
+    epysim.run_scheduled()
+    assert calls == []  # the filler callbacks ran, the wheel did not
+    ticks(timer, 1)
+    assert [t for t, _ in calls] == [30, 30, 30]
+    assert wheel.overruns == 2
+
+
+def test_callback_errors_are_counted():
+    timer, wheel = make()
+    calls, cb = recorder()
+    wheel.every(10, lambda _: 1 // 0)
+    wheel.every(10, cb)
+    ticks(timer, 3)
+    assert wheel.errors == 3
+    assert isinstance(wheel.last_error, ZeroDivisionError)
+    assert len(calls) == 3
+
+
+def test_polling_without_timer():
+    wheel = TimerWheel(tick_ms=10)
+    calls, cb = recorder()
+    wheel.every(100, cb)
+    elapsed = epysim.run(wheel.update, max_ms=1000)
+    assert elapsed == 1000
+    assert [t for t, _ in calls] == [100 * (i + 1) for i in range(10)]
+    assert wheel.stats()['latency_max_us'] == 0
+
+
+def test_many_jobs():
+    timer, wheel = make(slots=16)
+    jobs = [wheel.every(10 * (i % 37 + 1), lambda _: None)
+            for i in range(500)]
+    ticks(timer, 370)
+    assert all(job.runs == 370 // (i % 37 + 1)
+               for i, job in enumerate(jobs))
+    assert wheel.jobs == 500 and wheel.errors == 0
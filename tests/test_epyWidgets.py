@@ -0,0 +1,141 @@
+"""epyWidgets tests; frames are checked against golden images like the
+SSD1306 driver tests (UPDATE_GOLDEN=1 rewrites them)."""
+
+import pytest
+
+from oledsim import (LINK_OFF, LINK_ON, check_golden, dashboard, gddram,
+                     make_oled, sent_frame)
+from simframebuf import FrameBuffer1, to_text
+from Module.epyWidgets import Bar, Icon, Label, Number, Screen
+
+
+def make_screen():
+    oled, dev = make_oled()
+    scr, temp, hum, bar, link = dashboard(oled)
+    temp.set(231)
+    hum.set(45)
+    bar.set(45)
+    return oled, dev, scr, temp, hum, bar, link
+
+
+def test_first_show_sends_the_whole_frame():
+    oled, dev, scr, temp, hum, bar, link = make_screen()
+    assert scr.update() == 5
+    assert scr.show() == 1024
+    cmds, frame = dev.payloads()
+    assert cmds == bytes([0x00, 0x21, 0, 127, 0x22, 0, 7])
+    check_golden('widgets_dashboard', sent_frame(oled, dev))
+
+
+def test_one_changed_value_sends_one_widget():
+    oled, dev, scr, temp, hum, bar, link = make_screen()
+    scr.refresh()
+    ram = gddram(128, 8, dev.payloads())
+    dev.clear()
+    # unchanged values: nothing is drawn or sent
+    assert not temp.set(231) and not hum.set(45)
+    assert scr.refresh() == 0 and dev.writes == []
+    assert temp.set(232)
+    assert scr.update() == 1
+    assert scr.show() == 80
+    cmds, data = dev.payloads()
+    assert cmds == bytes([0x00, 0x21, 0, 79, 0x22, 2, 2])
+    assert len(data) == 81
+    gddram(128, 8, dev.payloads(), ram)
+    assert bytes(ram) == bytes(oled.buffer[1:])
+    check_golden('widgets_updated', to_text(FrameBuffer1(ram, 128, 64)))
+
+
+def test_bar_redraws_only_when_its_fill_changes():
+    oled, dev, scr, temp, hum, bar, link = make_screen()
+    scr.refresh()
+    dev.clear()
+    assert bar.filled == 45 * 126 // 100
+    # in tenths of a percent, 45.1 % fills as many of the 126 columns
+    # as 45 % did
+    bar.lo, bar.hi = 0, 1000
+    assert not bar.set(451)
+    assert bar.set(460)
+    assert scr.refresh() == 2 * 128  # rows 44..51: pages 5 and 6
+    assert oled.framebuf.pixel(bar.x + bar.filled, bar.y + 3) == 1
+    assert oled.framebuf.pixel(bar.x + bar.filled + 1, bar.y + 3) == 0
+
+
+def test_regions_merge_per_page_and_beyond_the_limit():
+    oled, dev = make_oled()
+    scr = Screen(oled, max_regions=2)
+    a = scr.add(Label(0, 0, 'ab'))
+    b = scr.add(Label(16, 4, 'cd'))  # shares page 0 and touches a
+    c = scr.add(Label(64, 24, 'ef'))
+    d = scr.add(Label(100, 56, 'gh'))
+    scr.refresh()
+    dev.clear()
+    a.set('AB')
+    b.set('CD')
+    scr.update()
+    assert scr._regions == [[0, 0, 32, 12]]
+    c.set('EF')
+    d.set('GH')
+    scr.update()
+    # a third region does not fit: everything becomes one box
+    assert scr._regions == [[0, 0, 116, 64]]
+    assert scr.show() == 116 * 8
+
+
+def test_merged_regions_never_overlap():
+    oled, dev = make_oled()
+    scr = Screen(oled)
+    a = scr.add(Label(0, 0, 'ab'))    # page 0
+    b = scr.add(Label(0, 12, 'c'))    # pages 1-2, apart from a
+    c = scr.add(Label(16, 4, 'defg'))  # pages 0-1, touches a
+    scr.refresh()
+    a.set('AB')
+    b.set('C')
+    scr.update()
+    assert scr._regions == [[0, 0, 16, 8], [0, 12, 8, 20]]
+    # a grown by c reaches b's page 1: all three are one region
+    c.set('DEFG')
+    scr.update()
+    assert scr._regions == [[0, 0, 48, 20]]
+    dev.clear()
+    assert scr.show() == 48 * 3
+
+
+def test_bar_needs_a_range():
+    with pytest.raises(ValueError):
+        Bar(0, 0, 64, 8, 10, 10)
+
+
+def test_invalidate_redraws_everything():
+    oled, dev, scr, temp, hum, bar, link = make_screen()
+    scr.refresh()
+    oled.fill(1)  # something else drew over the screen
+    dev.clear()
+    scr.invalidate()
+    assert scr.update() == 5
+    assert scr.show() == 1024
+    check_golden('widgets_dashboard', sent_frame(oled, dev))
+
+
+def test_text_is_cut_to_the_box_and_icons_switch():
+    oled, dev = make_oled()
+    scr = Screen(oled)
+    label = scr.add(Label(0, 0, 'x', chars=2))
+    num = scr.add(Number(0, 8, '{}', 2, chars=3))
+    icon = scr.add(Icon(112, 0, 16, 8, (LINK_OFF, LINK_ON)))
+    label.set('long text')
+    num.set(12345)
+    scr.refresh()
+    fb = oled.framebuf
+    assert not any(fb.pixel(x, y) for x in range(24, 100) for y in range(16))
+    assert icon.set(1) and not icon.set(1)
+    dev.clear()
+    assert scr.refresh() == 16
+    assert fb.pixel(127, 7) == 1  # LINK_ON's last column
+
+
+def test_benchmark_runs():
+    import bench_epyWidgets
+    res = bench_epyWidgets.run(30)
+    assert res['full']['bytes'] > 1024
+    assert res['widgets']['bytes'] < res['full']['bytes'] / 4
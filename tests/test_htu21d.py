@@ -0,0 +1,304 @@
+import math
+
+import pytest
+
+from epysim import I2C, HTU21DDevice, clock
+from Module import htu21d
+from Module.htu21d import HTU21D
+
+
+def make(temperature=23.5, humidity=41.0, **kwargs):
+    i2c = I2C(0, I2C.MASTER, baudrate=100000)
+    dev = i2c.attach(HTU21DDevice(temperature, humidity))
+    return i2c, dev, HTU21D(i2c, **kwargs)
+
+
+def test_blocking_reads_use_no_hold_commands():
+    i2c, dev, sensor = make()
+    assert sensor.read_temperature() == pytest.approx(23.5, abs=0.02)
+    assert sensor.read_humidity() == pytest.approx(41.0, abs=0.01)
+    assert dev.commands == [0xF3, 0xF5]
+    # waited exactly the datasheet conversion times
+    assert clock.now == 50 + 16
+
+
+def test_update_never_blocks_and_pipelines():
+    i2c, dev, sensor = make()
+    assert sensor.update() is False
+    assert dev.commands == [0xF3]
+    assert clock.now == 0
+    # polling before the conversion is due does not touch the bus
+    clock.advance_ms(49)
+    assert sensor.update() is False
+    assert len(i2c.log) == 1
+    clock.advance_ms(1)
+    assert sensor.update() is False
+    assert sensor.state == HTU21D.MEASURE_HUMD
+    assert sensor.temperature == pytest.approx(23.5, abs=0.02)
+    assert dev.commands == [0xF3, 0xF5]
+    clock.advance_ms(sensor.time_until_ready())
+    assert sensor.update() is True
+    assert sensor.humidity == pytest.approx(41.0, abs=0.01)
+    assert sensor.state == HTU21D.IDLE
+    # two 1-byte writes and two 3-byte reads for the pair
+    assert [(k, n) for _, _, k, n in i2c.log] == \
+        [('w', 1), ('r', 3), ('w', 1), ('r', 3)]
+    assert clock.now == 66
+
+
+def test_fetch_before_conversion_is_nack():
+    i2c, dev, sensor = make()
+    sensor.start(HTU21D.TRIGGER_TEMP_MEASURE_NOHOLD)
+    assert not sensor.ready()
+    assert sensor.fetch() is None
+    clock.advance_ms(50)
+    assert sensor.ready()
+    assert sensor.fetch() is not None
+
+
+def test_conversion_time_follows_resolution():
+    i2c, dev, sensor = make()
+    assert sensor.conversion_ms(HTU21D.TRIGGER_TEMP_MEASURE_NOHOLD) == 50
+    sensor.write_user_register(0x03)  # RH 8 bit / T 12 bit
+    assert sensor.conversion_ms(HTU21D.TRIGGER_TEMP_MEASURE_NOHOLD) == 13
+    assert sensor.conversion_ms(HTU21D.TRIGGER_HUMD_MEASURE_NOHOLD) == 3
+    sensor.read_temperature()
+    assert clock.now == 13
+    dev.user_reg = 0x83  # RH 11 bit / T 11 bit
+    sensor.read_user_register()
+    assert sensor.conversion_ms(HTU21D.TRIGGER_TEMP_MEASURE_NOHOLD) == 7
+
+
+@pytest.mark.parametrize('pair, reg_bits, total_ms', [
+    ((12, 14), 0x00, 66),
+    ((8, 12), 0x01, 16),
+    ((10, 13), 0x80, 30),
+    ((11, 11), 0x81, 15),
+])
+def test_set_resolution(pair, reg_bits, total_ms):
+    i2c, dev, sensor = make()
+    dev.user_reg = 0x46  # heater on, battery flag set: must be preserved
+    sensor.set_resolution(*pair)
+    assert dev.user_reg == 0x46 & 0x7E | reg_bits
+    assert sensor.resolution() == pair
+    assert sensor.measurement_ms() == total_ms
+    t0 = clock.now
+    while not sensor.update():
+        clock.advance_ms(sensor.time_until_ready())
+    assert clock.now - t0 == total_ms
+
+
+def test_resolution_in_constructor_and_reset():
+    i2c, dev, sensor = make(resolution=(8, 12))
+    assert dev.user_reg & 0x81 == 0x01
+    sensor.reset()
+    assert sensor.resolution() == (12, 14)
+    with pytest.raises(ValueError):
+        sensor.set_resolution(12, 12)
+
+
+def test_backward_compatible_names():
+    i2c, dev, sensor = make(temperature=-5.0, humidity=88.0)
+    assert sensor.readTemperatureData() == pytest.approx(-5.0, abs=0.02)
+    assert sensor.readHumidityData() == pytest.approx(88.0, abs=0.01)
+
+
+def test_crc8_table_matches_bitwise_reference():
+    from epysim import crc8 as reference
+    for a in range(256):
+        for b in (0, 1, 0x3A, 0x85, 0xFF, a):
+            assert htu21d.crc8(bytes([a, b])) == reference(bytes([a, b]))
+    # datasheet examples
+    assert htu21d.crc8(b'\x68\x3a') == 0x7C
+    assert htu21d.crc8(b'\x4e\x85') == 0x6B
+    assert htu21d.crc8(b'\xdc') == 0x79
+
+
+def test_reads_reuse_preallocated_buffer():
+    seen = []
+
+    class SpyI2C(I2C):
+        def readfrom_into(self, addr, buf, stop=True):
+            seen.append(buf)
+            super().readfrom_into(addr, buf)
+
+    i2c = SpyI2C(0)
+    i2c.attach(HTU21DDevice())
+    sensor = HTU21D(i2c)
+    for _ in range(3):
+        sensor.read_temperature()
+    assert len(seen) == 3
+    assert all(buf is sensor._buf for buf in seen)
+
+
+def test_nack_when_due_backs_off_one_ms():
+    i2c, dev, sensor = make()
+    dev.latency_ms = (16, 53)  # slower than the datasheet maximum
+    sensor.update()
+    polls = 0
+    while sensor.temperature_centi is None:
+        clock.advance_ms(sensor.time_until_ready())
+        sensor.update()
+        polls += 1
+    assert clock.now == 53
+    assert i2c.nacks == 3 and polls == 4
+
+
+def test_crc_errors_retry_then_raise():
+    i2c = I2C(0)
+    dev = i2c.attach(HTU21DDevice(crc_error_rate=1.0))
+    sensor = HTU21D(i2c, retries=2, delay_ms=10)
+    with pytest.raises(ValueError):
+        sensor.read_temperature()
+    assert dev.commands == [0xF3] * 3 and dev.corrupted == 3
+    assert clock.now == 3 * 50 + 2 * 10
+    sensor.update()
+    with pytest.raises(ValueError):
+        for _ in range(3):
+            clock.advance_ms(sensor.time_until_ready())
+            sensor.update()
+    assert sensor.state == HTU21D.IDLE
+    assert dev.commands.count(0xF3) == 6
+
+
+def test_unanswered_conversions_time_out():
+    i2c = I2C(0)
+    dev = i2c.attach(HTU21DDevice(nack_rate=1.0))
+    sensor = HTU21D(i2c, retries=1, delay_ms=10)
+    with pytest.raises(OSError) as exc:
+        sensor.read_temperature()
+    assert exc.value.args[0] == htu21d.ETIMEDOUT
+    assert dev.commands == [0xF3] * 2
+    # every attempt polls for another conversion time
+    assert clock.now == 2 * 100 + 10
+    sensor.update()
+    polls = 0
+    with pytest.raises(OSError):
+        while polls < 1000:
+            clock.advance_ms(sensor.time_until_ready())
+            sensor.update()
+            polls += 1
+    assert polls < 1000 and sensor.state == HTU21D.IDLE
+    assert dev.commands.count(0xF3) == 4
+    # a later update() starts a fresh cycle
+    sensor.update()
+    assert sensor.state == HTU21D.MEASURE_TEMP
+
+
+def test_injected_faults_are_reproducible():
+    results = []
+    for _ in range(2):
+        i2c = I2C(0)
+        dev = i2c.attach(HTU21DDevice(crc_error_rate=0.2, nack_rate=0.2,
+                                      seed=5))
+        sensor = HTU21D(i2c, delay_ms=0)
+        for _ in range(20):
+            try:
+                sensor.read_humidity()
+            except (OSError, ValueError):
+                pass
+        results.append((dev.corrupted, dev.nacked, list(dev.commands)))
+    assert results[0] == results[1]
+    assert results[0][0] and results[0][1]
+
+
+def test_timed_bus_counts_wire_time():
+    i2c = I2C(0, baudrate=100000, timed=True)
+    i2c.attach(HTU21DDevice())
+    i2c.writeto(0x40, b'\xf3')
+    # address + 1 byte at 9 bits + start/stop = 20 bits at 10 us each
+    assert i2c.bus_us == 200 and clock.us == 200
+    with pytest.raises(OSError):
+        i2c.readfrom(0x40, 3)  # still converting
+    assert i2c.nacks == 1 and i2c.bus_us == 310
+
+
+def test_fault_benchmark_runs():
+    import bench_htu21d
+    clean = bench_htu21d.run_faults(20)
+    faulty = bench_htu21d.run_faults(20, crc_error_rate=0.2, nack_rate=0.2)
+    assert clean['retries_per_reading'] == 0
+    assert faulty['retries_per_reading'] > 0
+    assert faulty['readings_per_s'] < clean['readings_per_s']
+    pairs = bench_htu21d.run_faults(10, mode='update')
+    assert pairs['bus_ms_per_reading'] > clean['bus_ms_per_reading']
+    # readings lost to NACK timeouts are reported, not raised
+    lost = bench_htu21d.run_faults(20, mode='update', nack_rate=0.9)
+    assert lost['failed'] > 0
+    lost = bench_htu21d.run_faults(5, nack_rate=1.0)
+    assert lost['failed'] == 5
+
+
+def test_integer_conversions_match_float():
+    for raw in range(0, 0x10000, 4):
+        t = -46.85 + 175.72 * raw / 65536
+        h = -6.0 + 125.0 * raw / 65536
+        assert abs(htu21d.temperature_centi(raw) - t * 100) <= 0.501
+        # status bits in the two low bits are ignored
+        assert abs(htu21d.humidity_centi(raw | 2) - h * 100) <= 0.501
+
+
+def test_update_keeps_centi_ints():
+    i2c, dev, sensor = make(temperature=31.25, humidity=62.5)
+    while not sensor.update():
+        clock.advance_ms(sensor.time_until_ready())
+    assert isinstance(sensor.temperature_centi, int)
+    assert sensor.temperature_centi == pytest.approx(3125, abs=1)
+    assert sensor.humidity_centi == pytest.approx(6250, abs=1)
+    assert sensor.temperature == sensor.temperature_centi / 100
+    assert sensor.heat_index_centi() == \
+        htu21d.heat_index_centi(sensor.temperature_centi,
+                                sensor.humidity_centi)
+
+
+def test_compensated_humidity():
+    assert htu21d.compensated_humidity_centi(5000, 2500) == 5000
+    assert htu21d.compensated_humidity_centi(5000, 4500) == 5300
+    assert htu21d.compensated_humidity_centi(5000, 500) == 4700
+    assert htu21d.compensated_humidity_centi(9950, 6000) == 10000
+
+
+def test_dew_point_matches_magnus():
+    for t_c in range(-3000, 6001, 250):
+        for rh_c in (100, 1000, 3300, 5000, 7500, 10000):
+            t, rh = t_c / 100, rh_c / 100
+            g = math.log(rh / 100) + 17.62 * t / (243.12 + t)
+            ref = 243.12 * g / (17.62 - g)
+            assert abs(htu21d.dew_point_centi(t_c, rh_c) - ref * 100) <= 5
+
+
+def _heat_index_ref(t, rh):
+    f = t * 1.8 + 32
+    hi = 0.5 * (f + 61 + (f - 68) * 1.2 + rh * 0.094)
+    if (hi + f) / 2 >= 80:
+        hi = (-42.379 + 2.04901523 * f + 10.14333127 * rh
+              - 0.22475541 * f * rh - 0.00683783 * f * f
+              - 0.05481717 * rh * rh + 0.00122874 * f * f * rh
+              + 0.00085282 * f * rh * rh - 0.00000199 * f * f * rh * rh)
+        if rh < 13 and 80 <= f <= 112:
+            hi -= (13 - rh) / 4 * math.sqrt((17 - abs(f - 95)) / 17)
+        elif rh > 85 and 80 <= f <= 87:
+            hi += (rh - 85) / 10 * (87 - f) / 5
+    return (hi - 32) / 1.8
+
+
+@pytest.mark.parametrize('t_c', range(-1000, 5001, 300))
+def test_heat_index_matches_nws(t_c):
+    for rh_c in range(0, 10001, 500):
+        ref = _heat_index_ref(t_c / 100, rh_c / 100)
+        got = htu21d.heat_index_centi(t_c, rh_c)
+        assert abs(got - ref * 100) <= 15, (t_c, rh_c)
+
+
+def test_heat_index_nws_table():
+    # 90 degF / 60 % -> 100 degF, 100 degF / 40 % -> 109 degF
+    assert round(htu21d.heat_index_centi(3222, 6000) * 0.018 + 32) == 100
+    assert round(htu21d.heat_index_centi(3778, 4000) * 0.018 + 32) == 109
+
+
+def test_benchmark_runs():
+    import bench_htu21d
+    res = bench_htu21d.run(200)
+    assert res['crc_after_per_s'] > 0
+    assert res['heap_bytes_after_per_read'] < \
+        res['heap_bytes_before_per_read']
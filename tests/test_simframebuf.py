@@ -0,0 +1,145 @@
+import random
+
+import pytest
+
+import simframebuf as fb
+from simframebuf import FrameBuffer, MONO_HLSB, MONO_HMSB, MONO_VLSB
+
+FORMATS = (MONO_VLSB, MONO_HLSB, MONO_HMSB)
+
+
+def make(w=24, h=13, fmt=MONO_VLSB, use_numpy=True):
+    size = (h + 7) // 8 * w if fmt == MONO_VLSB else (w + 7) // 8 * h
+    buf = bytearray(size)
+    return buf, FrameBuffer(buf, w, h, fmt, use_numpy=use_numpy)
+
+
+def test_mono_vlsb_layout():
+    buf, f = make(16, 16)
+    f.pixel(3, 0, 1)
+    f.pixel(3, 7, 1)
+    f.pixel(5, 9, 1)
+    assert buf[3] == 0x81 and buf[16 + 5] == 0x02
+    assert f.pixel(5, 9) == 1 and f.pixel(5, 8) == 0
+    assert f.pixel(16, 0) is None
+    f.hline(0, 15, 16, 1)
+    assert buf[16:32] == bytes([0x80] * 5 + [0x82] + [0x80] * 10)
+
+
+def test_horizontal_layouts():
+    buf, f = make(10, 2, MONO_HLSB)  # stride rounds up to 16
+    f.pixel(0, 0, 1)
+    f.pixel(9, 1, 1)
+    assert buf == bytearray([0x80, 0, 0, 0x40])
+    buf, f = make(10, 2, MONO_HMSB)
+    f.pixel(0, 0, 1)
+    f.pixel(9, 1, 1)
+    assert buf == bytearray([0x01, 0, 0, 0x02])
+
+
+def test_constructor_checks():
+    with pytest.raises(ValueError):
+        FrameBuffer(bytearray(10), 8, 16, MONO_VLSB)
+    with pytest.raises(ValueError):
+        FrameBuffer(bytearray(100), 8, 8, fb.RGB565)
+    # a memoryview window, as ssd1306 passes it, is written in place
+    buf = bytearray(9)
+    f = fb.FrameBuffer1(memoryview(buf)[1:], 8, 8)
+    f.fill(1)
+    assert buf == bytearray([0]) + b'\xff' * 8
+
+
+def test_line_follows_firmware_bresenham():
+    buf, f = make(8, 8)
+    assert f._line_points(0, 0, 5, 2) == \
+        [(0, 0), (1, 0), (2, 1), (3, 1), (4, 2), (5, 2)]
+    assert f._line_points(1, 6, 2, 1) == \
+        [(1, 6), (1, 5), (1, 4), (2, 3), (2, 2), (2, 1)]
+    # points off the buffer are skipped, the rest still drawn
+    assert f._line_points(-2, 3, 2, 3) == [(0, 3), (1, 3), (2, 3)]
+
+
+def test_scroll_leaves_vacated_area():
+    buf, f = make(4, 8)
+    f.pixel(0, 0, 1)
+    f.pixel(3, 7, 1)
+    f.scroll(1, 2)
+    on = {(x, y) for y in range(8) for x in range(4) if f.pixel(x, y)}
+    # moved copy of (0, 0); the originals outside the target stay
+    assert on == {(0, 0), (1, 2)}
+
+
+def test_blit_key_and_palette():
+    _, dst = make(8, 8)
+    _, src = make(3, 3)
+    src.fill(1)
+    src.pixel(1, 1, 0)
+    dst.fill(0)
+    dst.fill_rect(2, 2, 3, 3, 1)
+    _, pal = make(2, 1)
+    pal.pixel(0, 0, 1)  # 0 -> 1, 1 -> 0: inverted
+    dst.blit(src, 2, 2, 1, pal)  # key applies after the palette
+    assert [dst.pixel(x, 2) for x in range(2, 5)] == [0, 0, 0]
+    assert dst.pixel(3, 3) == 1  # the key colour (1) was skipped
+
+
+def test_text_cells_and_clipping():
+    _, f = make(24, 13)
+    f.text('Hi', 0, 0)
+    assert f.pixel(0, 0) == 0  # blank first column of each cell
+    assert [f.pixel(1, y) for y in range(7)] == [1] * 7  # H stem
+    f.fill(0)
+    f.text('°', -4, 9)  # two UTF-8 bytes: two DEL boxes, clipped
+    assert f.pixel(0, 9) == 1 and f.pixel(5, 12) == 1
+    assert f.pixel(2, 9) == 0 and f.pixel(4, 9) == 0
+
+
+def _random_ops(f, other, rng):
+    w, h = f.width, f.height
+    for _ in range(60):
+        op = rng.randrange(8)
+        c = rng.randrange(2)
+        x, y = rng.randrange(-5, w + 5), rng.randrange(-5, h + 5)
+        if op == 0:
+            f.fill_rect(x, y, rng.randrange(-1, 20), rng.randrange(-1, 20),
+                        c)
+        elif op == 1:
+            f.line(x, y, rng.randrange(-5, w + 5), rng.randrange(-5, h + 5),
+                   c)
+        elif op == 2:
+            f.scroll(rng.randrange(-w - 1, w + 2),
+                     rng.randrange(-h - 1, h + 2))
+        elif op == 3:
+            f.text(''.join(chr(rng.randrange(20, 130)) for _ in range(3)),
+                   x, y, c)
+        elif op == 4:
+            f.blit(other, x, y, rng.choice((-1, 0, 1)))
+        elif op == 5:
+            f.rect(x, y, rng.randrange(1, 12), rng.randrange(1, 12), c,
+                   rng.randrange(2))
+        elif op == 6:
+            f.pixel(x, y, c)
+        else:
+            f.fill(c)
+
+
+@pytest.mark.skipif(fb.np is None, reason='NumPy not installed')
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('seed', range(8))
+def test_numpy_path_is_bit_exact(fmt, seed):
+    results = []
+    for use_numpy in (True, False):
+        rng = random.Random(seed)
+        buf, f = make(21, 19, fmt, use_numpy)
+        _, other = make(7, 9, rng.choice(FORMATS), use_numpy)
+        for i in range(7 * 9):
+            other.pixel(i % 7, i // 7, rng.randrange(2))
+        _random_ops(f, other, rng)
+        results.append(bytes(buf))
+    assert results[0] == results[1]
+
+
+def test_benchmark_runs():
+    import bench_framebuf
+    res = bench_framebuf.run(frames=5)
+    assert res['frames_per_s'] > 0
@@ -0,0 +1,95 @@
+"""SSD1306 driver tests with golden images.
+
+Frames are decoded from the bytes the driver sends on the simulated bus
+and compared with the text images in tests/golden ('#' = pixel on). Run
+with UPDATE_GOLDEN=1 to rewrite the images after an intended change and
+review the diff.
+"""
+
+from oledsim import check_golden, gddram, make_oled, sent_frame
+from simframebuf import FrameBuffer, MONO_HLSB
+
+
+def test_show_sends_address_window_and_frame():
+    oled, dev = make_oled()
+    oled.show()
+    cmds, frame = dev.payloads()
+    assert cmds == bytes([0x00, 0x21, 0, 127, 0x22, 0, 7])
+    assert len(frame) == 1 + 128 * 64 // 8
+
+
+def test_golden_text():
+    oled, dev = make_oled()
+    oled.fill(0)
+    oled.rect(0, 0, 128, 64, 1)
+    oled.text('ePy SSD1306', 4, 4, 1)
+    oled.text('T 23.45 C', 4, 20, 1)
+    oled.text('RH 41.0 %', 4, 30, 1)
+    oled.text('clipped text here', 60, 52, 1)
+    oled.show()
+    check_golden('ssd1306_text', sent_frame(oled, dev))
+
+
+def test_golden_shapes():
+    oled, dev = make_oled()
+    oled.fill(0)
+    oled.line(0, 0, 127, 63, 1)
+    oled.line(0, 63, 127, 0, 1)
+    oled.line(10, 5, 12, 60, 1)
+    oled.fill_rect(20, 10, 30, 13, 1)
+    oled.fill_rect(25, 13, 10, 5, 0)
+    oled.rect(70, 3, 50, 20, 1)
+    oled.pixel(64, 32, 0)
+    oled.fill_rect(100, 40, 40, 40, 1)  # clipped at the corner
+    oled.show()
+    check_golden('ssd1306_shapes', sent_frame(oled, dev))
+
+
+def test_golden_blit_and_scroll():
+    oled, dev = make_oled()
+    icon = FrameBuffer(bytearray(b'\x3c\x42\xa5\x81\xa5\x99\x42\x3c'),
+                       8, 8, MONO_HLSB)
+    oled.fill(0)
+    for i in range(6):
+        oled.blit(icon, i * 20, i * 9)
+    oled.text('scroll', 0, 56, 1)
+    oled.scroll(3, -2)
+    oled.blit(icon, -4, -4)
+    oled.show()
+    check_golden('ssd1306_blit_scroll', sent_frame(oled, dev))
+
+
+def test_golden_64x48_is_shifted_by_32_columns():
+    oled, dev = make_oled(64, 48)
+    oled.fill(0)
+    oled.rect(0, 0, 64, 48, 1)
+    oled.text('64x48', 12, 20, 1)
+    oled.show()
+    assert dev.payloads()[0] == bytes([0x00, 0x21, 32, 95, 0x22, 0, 5])
+    check_golden('ssd1306_64x48', sent_frame(oled, dev))
+
+
+def test_show_region_sends_only_covered_pages():
+    oled, dev = make_oled()
+    oled.fill(0)
+    oled.show()
+    ram = gddram(128, 8, dev.payloads())
+    dev.clear()
+    oled.fill_rect(40, 10, 30, 12, 1)
+    oled.text('42', 44, 12, 0)
+    assert oled.show_region(40, 10, 30, 12) == 30 * 2  # pages 1 and 2
+    cmds, page1, page2 = dev.payloads()
+    assert cmds == bytes([0x00, 0x21, 40, 69, 0x22, 1, 2])
+    assert len(page1) == len(page2) == 31
+    gddram(128, 8, dev.payloads(), ram)
+    # the control byte borrowed from the buffer was put back
+    assert oled.buffer[0] == 0x40
+    assert bytes(ram) == bytes(oled.buffer[1:])
+
+
+def test_show_region_clips_and_shifts_64_wide():
+    oled, dev = make_oled(64, 48)
+    assert oled.show_region(70, 0, 10, 10) == 0
+    assert oled.show_region(-5, 40, 20, 20) == 15
+    assert dev.payloads()[0] == bytes([0x00, 0x21, 32, 46, 0x22, 5, 5])
+    assert dev.payloads()[1] == b'\x40' + bytes(oled.buffer[321:336])
@@ -0,0 +1,210 @@
+"""Host replay and comparison of epyBusTrace traces.
+
+Run: python tests/trace_replay.py [trace.trc [baseline.trc]]
+
+Prints per-device transactions, bytes and errors of a trace, with the
+writes split by their first payload byte ("ops": the SSD1306 control
+byte 0x00 for commands and 0x40 for data, the HTU21D command, the
+FourDigit register), then replays the I2C transactions at their
+recorded times against the emulated devices of epysim and reports the
+bus time at 400 kHz and any transaction whose outcome differs from the
+recording (e.g. an HTU21D read now NACKed because it comes too early).
+With a baseline, every figure that changed is listed and the ones that
+grew by more than TOLERANCE are marked as regressions.
+
+Without arguments the two dashboard scenarios of demo_dashboard are
+traced for a minute and compared, "fixed" as the baseline.
+"""
+
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+for path in (here, os.path.join(os.path.dirname(here), 'Module')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import epysim  # noqa: E402
+
+epysim.install()
+
+from epyBusTrace import SPI_WRITE, BusTrace, parse  # noqa: E402
+from epyI2CBus import READ, READ_MEM, WRITE  # noqa: E402
+
+SENSOR_ADDR = 0x40
+FIELDS = ('transactions', 'bytes', 'errors')
+# growth ignored by format_compare(): traces of one scenario may differ
+# by a sample at either end
+TOLERANCE = 0.05
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return list(parse(f.read()))
+
+
+def device(kind, addr):
+    return ('spi {}' if kind == SPI_WRITE else 'i2c 0x{:02x}').format(addr)
+
+
+def op(kind, dc, head):
+    """Label of a transaction for the per-device op counts."""
+    if kind == SPI_WRITE:
+        return 'data' if dc else 'cmd'
+    if kind == READ:
+        return 'read'
+    name = 'mem' if kind == READ_MEM else 'w'
+    return '{} 0x{:02x}'.format(name, head[0]) if head else name
+
+
+def summary(records):
+    """{device: {'transactions', 'bytes', 'errors', 'ops': {op: n}}}"""
+    out = {}
+    for t, kind, addr, n, ok, dc, head in records:
+        s = out.setdefault(device(kind, addr), {
+            'transactions': 0, 'bytes': 0, 'errors': 0, 'ops': {}})
+        s['transactions'] += 1
+        if ok:
+            s['bytes'] += n
+        else:
+            s['errors'] += 1
+        key = op(kind, dc, head)
+        s['ops'][key] = s['ops'].get(key, 0) + 1
+    return out
+
+
+def _default_device(addr):
+    if addr == SENSOR_ADDR:
+        return epysim.HTU21DDevice(24.0, 45.0)
+    return epysim.WriteRecorder(addr)
+
+
+def replay(records, devices=None, baudrate=400000):
+    """Issue the I2C transactions again at their recorded times.
+
+    devices: {addr: emulated device}; addresses not given get an
+             HTU21DDevice (0x40) or a WriteRecorder
+    Write payloads are the recorded head bytes padded with zeros. Returns
+    {device: {'transactions', 'bytes', 'errors', 'bus_us', 'mismatches'}}
+    where mismatches counts outcomes that differ from the trace. SPI
+    records have no emulated device and are skipped.
+    """
+    epysim.reset()
+    clock = epysim.clock
+    i2c = epysim.I2C(0, epysim.I2C.MASTER, baudrate=baudrate)
+    for addr, dev in (devices or {}).items():
+        dev.address = addr
+        i2c.attach(dev)
+    out = {}
+    for t, kind, addr, n, ok, dc, head in records:
+        if kind == SPI_WRITE:
+            continue
+        if addr not in i2c.devices:
+            i2c.attach(_default_device(addr))
+        if t > clock.us:
+            clock.advance_us(t - clock.us)
+        r = out.setdefault(device(kind, addr), {
+            'transactions': 0, 'bytes': 0, 'errors': 0, 'bus_us': 0,
+            'mismatches': 0})
+        bus_us = i2c.bus_us
+        try:
+            if kind == WRITE:
+                i2c.writeto(addr, head + bytes(n - len(head)))
+            elif kind == READ:
+                i2c.readfrom(addr, n)
+            else:
+                i2c.readfrom_mem(addr, head[0], n)
+            good = True
+        except OSError:
+            good = False
+        r['transactions'] += 1
+        if good:
+            r['bytes'] += n
+        else:
+            r['errors'] += 1
+        r['bus_us'] += i2c.bus_us - bus_us
+        if good != ok:
+            r['mismatches'] += 1
+    return out
+
+
+def compare(base, new, tolerance=0.0):
+    """Rows (device, figure, old, new, regression) for every figure of
+    two summaries that differs; a regression grew by more than
+    `tolerance` (a fraction of the old value)."""
+    rows = []
+    for dev in sorted(set(base) | set(new)):
+        b = base.get(dev, {})
+        n = new.get(dev, {})
+        figures = [(f, b.get(f, 0), n.get(f, 0)) for f in FIELDS]
+        ops = b.get('ops', {}), n.get('ops', {})
+        for key in sorted(set(ops[0]) | set(ops[1])):
+            figures.append(('op ' + key, ops[0].get(key, 0),
+                            ops[1].get(key, 0)))
+        for name, old, value in figures:
+            if old != value:
+                rows.append((dev, name, old, value,
+                             value > old * (1 + tolerance)))
+    return rows
+
+
+def format_summary(records):
+    span = records[-1][0] // 1000 if records else 0
+    yield '{} transactions in {} ms'.format(len(records), span)
+    played = replay(records)
+    yield '{:10} {:>7} {:>8} {:>6} {:>8} {:>5}  ops'.format(
+        'device', 'tx', 'bytes', 'errors', 'bus_ms', 'diff')
+    for dev, s in sorted(summary(records).items()):
+        p = played.get(dev, {'bus_us': 0, 'mismatches': 0})
+        yield '{:10} {:7} {:8} {:6} {:8.1f} {:5}  {}'.format(
+            dev, s['transactions'], s['bytes'], s['errors'],
+            p['bus_us'] / 1000, p['mismatches'],
+            ' '.join('{}={}'.format(k, v)
+                     for k, v in sorted(s['ops'].items())))
+
+
+def format_compare(base, new, tolerance=TOLERANCE):
+    rows = compare(summary(base), summary(new), tolerance)
+    if not rows:
+        yield 'no change'
+    for dev, name, old, value, worse in rows:
+        yield '{:10} {:14} {:8} -> {:8}{}'.format(
+            dev, name, old, value, '  REGRESSION' if worse else '')
+
+
+def demo_trace(scenario='changes', ms=60000, size=65536):
+    """Trace a demo_dashboard scenario; returns the trace bytes."""
+    import demo_dashboard
+    trace = BusTrace(size)
+    getattr(demo_dashboard, 'run_' + scenario)(ms, trace)
+    return bytes(trace.data())
+
+
+def usage():
+    """The "Run:" line of the module docstring."""
+    for line in __doc__.splitlines():
+        if line.startswith('Run: '):
+            return 'usage: ' + line[5:]
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) > 2 or any(a.startswith('-') for a in args):
+        print(usage())
+        sys.exit(0 if args[0] in ('-h', '--help') else 2)
+    if len(sys.argv) > 1:
+        new = load(sys.argv[1])
+        base = load(sys.argv[2]) if len(sys.argv) > 2 else None
+    else:
+        base = list(parse(demo_trace('fixed')))
+        new = list(parse(demo_trace('changes')))
+    for line in format_summary(new):
+        print(line)
+    if base is not None:
+        print('against the baseline:')
+        for line in format_compare(base, new):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()